@@ -2,26 +2,56 @@
 from __future__ import annotations
 
 import json
+import re
+import threading
 import time
 import uuid
+from collections import OrderedDict
 from pathlib import Path
-from typing import Literal, Optional
+from typing import Any, Literal, Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, Response, UploadFile, status
 from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 
 from app.api.dependencies import authenticate, get_limit_checker
-from app.api.schemas import IngestRequest, ProcessingOptions, TaskResponse, UserMetadata
+from app.api.schemas import (
+    IngestBatchRequest,
+    IngestBatchResponse,
+    IngestRequest,
+    ProcessingOptions,
+    TaskResponse,
+    UserMetadata,
+)
 from app.core.errors import APIError, get_error
 from app.core.limits import LimitChecker
 from app.core.security import Credential
 from app.core.tracking import new_context
-from app.pipeline.celery_tasks import enqueue_pipeline
+from app.pipeline.celery_tasks import enqueue_pipeline, enqueue_pipelines
 from app.services import storage
 from app.tasks import task_store
+from app.utils.ids import is_valid_task_id
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
 
 router = APIRouter(tags=["ingest"])
 
+_RECENT_TASK_IDS_SIZE = 4096
+_recent_task_ids: "OrderedDict[str, None]" = OrderedDict()
+_recent_task_ids_lock = threading.Lock()
+# Client-computed upload fingerprints look like ``xxh3_128:<hex>``.
+_CONTENT_HASH_PATTERN = re.compile(r"[a-z0-9_]{1,16}:[0-9a-f]{16,128}")
+# Tasks in these states did not ingest anything, so the same upload may be sent again.
+_FAILED_STATES = frozenset({"failure", "revoked"})
+
+
+def _loads(text: str) -> Any:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch either.
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
 
 def _serialize_processing_options(options: Optional[ProcessingOptions]) -> dict:
     return options.model_dump() if options else {}
@@ -38,28 +68,53 @@ def _as_megabytes(path: Path) -> float:
     return path.stat().st_size / (1024 * 1024)
 
 
-@router.post("/ingest", response_model=TaskResponse)
-def ingest(
-    request: IngestRequest,
-    credential: Credential = Depends(authenticate),
-    checker: LimitChecker = Depends(get_limit_checker),
-) -> TaskResponse:
-    task_id = request.metadata.document_id or str(uuid.uuid4())
-    source_path = Path(request.source_path)
-    if not source_path.exists():
-        raise HTTPException(status_code=404, detail="source_path not found")
+def _task_location(task_id: str) -> str:
+    return f"/tasks/{task_id}"
+
+
+def _resolve_task_id(*candidates: Optional[Any]) -> str:
+    """Return the first client-supplied id, or a fresh uuid4 when none was given."""
+    for candidate in candidates:
+        if candidate is None:
+            continue
+        if not is_valid_task_id(candidate):
+            raise HTTPException(
+                status_code=400, detail="Task ids (Idempotency-Key, document_id) must match [A-Za-z0-9_-]{1,64}"
+            )
+        return candidate
+    return str(uuid.uuid4())
+
+
+def _claim_task_id(task_id: str) -> None:
+    """Reject a resubmission of a task this worker accepted recently and that is still running."""
+    with _recent_task_ids_lock:
+        seen = task_id in _recent_task_ids
+        _recent_task_ids[task_id] = None
+        _recent_task_ids.move_to_end(task_id)
+        while len(_recent_task_ids) > _RECENT_TASK_IDS_SIZE:
+            _recent_task_ids.popitem(last=False)
+    if not seen:
+        return
+    record = task_store.get(task_id)
+    if record is not None and record.celery_id and not record.final:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Task already submitted",
+            headers={"Location": _task_location(task_id)},
+        )
 
-    checker.assert_batch(1, _as_megabytes(source_path))
-    checker.assert_file_size(request.media_type, source_path)
 
+async def _prepare_path_ingest(request: IngestRequest, task_id: str, credential: Credential) -> dict:
+    """Copy ``request.source_path`` into raw storage and build the pipeline context."""
     task_store.create(task_id)
     new_context(task_id=task_id, app_id=credential.app_id)
 
-    raw_copy = storage.save_raw_path(source_path, task_id)
+    # The copy is a kernel-side copy_file_range/sendfile; run it off the event loop.
+    raw_copy = await run_in_threadpool(storage.save_raw_path, Path(request.source_path), task_id)
     metadata = _dump_metadata(request.metadata)
     metadata.setdefault("document_id", task_id)
 
-    context = {
+    return {
         "document_id": task_id,
         "media_type": request.media_type,
         "source_path": str(raw_copy),
@@ -68,38 +123,113 @@ def ingest(
         "started_at": time.time(),
         "app_id": credential.app_id,
     }
-    async_result = enqueue_pipeline(context)
+
+
+@router.post("/ingest", response_model=TaskResponse, status_code=status.HTTP_202_ACCEPTED)
+async def ingest(
+    request: IngestRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    credential: Credential = Depends(authenticate),
+    checker: LimitChecker = Depends(get_limit_checker),
+) -> TaskResponse:
+    task_id = _resolve_task_id(idempotency_key or None, request.metadata.document_id or None)
+    _claim_task_id(task_id)
+    source_path = Path(request.source_path)
+    if not source_path.exists():
+        raise HTTPException(status_code=404, detail="source_path not found")
+
+    checker.assert_batch(1, _as_megabytes(source_path))
+    checker.assert_file_size(request.media_type, source_path)
+
+    context = await _prepare_path_ingest(request, task_id, credential)
+    async_result = await run_in_threadpool(enqueue_pipeline, context)
     task_store.attach_celery(task_id, async_result.id)
     task_store.update(task_id, "queued")
+    response.headers["Location"] = _task_location(task_id)
     return TaskResponse(task_id=task_id, status="queued")
 
 
-@router.post("/ingest/upload", response_model=TaskResponse)
-def ingest_upload(
+@router.post("/ingest/batch", response_model=IngestBatchResponse, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_batch(
+    batch: IngestBatchRequest,
+    credential: Credential = Depends(authenticate),
+    checker: LimitChecker = Depends(get_limit_checker),
+) -> IngestBatchResponse:
+    source_paths = [Path(item.source_path) for item in batch.items]
+    missing = [str(path) for path in source_paths if not path.exists()]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"source_path not found: {', '.join(missing)}")
+
+    checker.assert_batch(len(source_paths), sum(_as_megabytes(path) for path in source_paths))
+    for item, path in zip(batch.items, source_paths):
+        checker.assert_file_size(item.media_type, path)
+
+    task_ids = [_resolve_task_id(item.metadata.document_id or None) for item in batch.items]
+    if len(set(task_ids)) != len(task_ids):
+        raise HTTPException(status_code=400, detail="Duplicate document_id in batch")
+    for task_id in task_ids:
+        _claim_task_id(task_id)
+
+    contexts = [
+        await _prepare_path_ingest(item, task_id, credential) for item, task_id in zip(batch.items, task_ids)
+    ]
+    # One pooled producer publishes every pipeline instead of a broker round-trip per task.
+    async_results = await run_in_threadpool(enqueue_pipelines, contexts)
+    for task_id, async_result in zip(task_ids, async_results):
+        task_store.attach_celery(task_id, async_result.id)
+        task_store.update(task_id, "queued")
+    return IngestBatchResponse(tasks=[TaskResponse(task_id=task_id, status="queued") for task_id in task_ids])
+
+
+@router.get("/ingest/exists", response_model=TaskResponse)
+def ingest_exists(
+    content_hash: str = Query(..., alias="hash"),
+    credential: Credential = Depends(authenticate),
+) -> TaskResponse:
+    """Look up a previous upload by the fingerprint sent as ``content_hash`` with ``/ingest/upload``."""
+    if not _CONTENT_HASH_PATTERN.fullmatch(content_hash):
+        raise HTTPException(status_code=400, detail="Invalid content hash")
+    task_id = task_store.find_by_content(content_hash)
+    record = task_store.get(task_id) if task_id else None
+    if record is None or record.status in _FAILED_STATES:
+        raise HTTPException(status_code=404, detail="No task for this content")
+    return TaskResponse(task_id=task_id, status=record.status, detail=record.detail)
+
+
+@router.post("/ingest/upload", response_model=TaskResponse, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_upload(
+    response: Response,
     media_type: Literal["audio", "video", "pdf"] = Form(...),
     metadata: str = Form("{}"),
     file: UploadFile = File(...),
     processing_options: Optional[str] = Form(None),
+    content_hash: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None),
     credential: Credential = Depends(authenticate),
     checker: LimitChecker = Depends(get_limit_checker),
 ) -> TaskResponse:
     if media_type not in {"audio", "video", "pdf"}:
         raise APIError(get_error("ERR_MEDIA_UNSUPPORTED"))
     try:
-        metadata_dict = json.loads(metadata)
+        metadata_dict = _loads(metadata)
     except json.JSONDecodeError as exc:
         raise HTTPException(status_code=400, detail="Invalid metadata JSON") from exc
 
     try:
-        options_dict = json.loads(processing_options) if processing_options else None
+        options_dict = _loads(processing_options) if processing_options else None
     except json.JSONDecodeError as exc:
         raise HTTPException(status_code=400, detail="Invalid processing_options JSON") from exc
 
-    task_id = metadata_dict.get("document_id") or str(uuid.uuid4())
+    if content_hash is not None and not _CONTENT_HASH_PATTERN.fullmatch(content_hash):
+        raise HTTPException(status_code=400, detail="Invalid content hash")
+
+    task_id = _resolve_task_id(idempotency_key or None, metadata_dict.get("document_id") or None)
     try:
         metadata_model = UserMetadata(**metadata_dict)
     except ValidationError as exc:
         raise HTTPException(status_code=400, detail="Invalid metadata schema") from exc
+    _claim_task_id(task_id)
     task_store.create(task_id)
     new_context(task_id=task_id, app_id=credential.app_id)
 
@@ -110,7 +240,7 @@ def ingest_upload(
     file.file.seek(current_pos)
     checker.assert_batch(1, size_bytes / (1024 * 1024))
 
-    raw_path = storage.save_raw_upload(file, task_id)
+    raw_path = await storage.save_raw_upload(file, task_id)
     checker.assert_file_size(media_type, raw_path)
 
     metadata_dump = _dump_metadata(metadata_model, fallback_title=file.filename)
@@ -130,7 +260,11 @@ def ingest_upload(
         "started_at": time.time(),
         "app_id": credential.app_id,
     }
-    async_result = enqueue_pipeline(context)
+    # Publishing to the broker is blocking I/O; keep it off the event loop.
+    async_result = await run_in_threadpool(enqueue_pipeline, context)
     task_store.attach_celery(task_id, async_result.id)
     task_store.update(task_id, "queued")
+    if content_hash:
+        task_store.remember_content(content_hash, task_id)
+    response.headers["Location"] = _task_location(task_id)
     return TaskResponse(task_id=task_id, status="queued")
\ No newline at end of file
@@ -1,11 +1,18 @@
 """Task detail and log retrieval endpoints."""
 from __future__ import annotations
 
-from collections import deque
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import time
 from pathlib import Path
-from typing import Deque, List
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from app.api.dependencies import authenticate
 from app.api.schemas import TaskResponse
@@ -15,25 +22,153 @@ from app.tasks import task_store
 
 router = APIRouter(tags=["logs"])
 
+# How often the events stream re-reads the task store, and how long it may stay silent.
+_EVENTS_POLL_SECONDS = 0.5
+_EVENTS_KEEPALIVE_SECONDS = 15.0
 
-def _tail_log(path: Path, lines: int) -> List[str]:
-    if not path.exists():
-        raise FileNotFoundError(path)
-    buffer: Deque[str] = deque(maxlen=max(1, lines))
-    with path.open("r", encoding="utf-8", errors="replace") as handle:
-        for row in handle:
-            buffer.append(row.rstrip("\n"))
-    return list(buffer)
+
+def _iter_line_spans_reverse(view: mmap.mmap, end: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+    """Yield ``(start, end)`` offsets of the lines in ``view[:end]``, newest first."""
+    end = len(view) if end is None else min(end, len(view))
+    if end and view[end - 1] == ord("\n"):
+        end -= 1
+    while True:
+        newline = view.rfind(b"\n", 0, end)
+        yield newline + 1, end
+        if newline < 0:
+            return
+        end = newline
+
+
+def _tail_log(
+    path: Path,
+    lines: int,
+    contains: Optional[str] = None,
+    scan_limit: Optional[int] = None,
+    end_offset: Optional[int] = None,
+) -> List[str]:
+    """Return the last ``lines`` lines of ``path`` (optionally only those containing ``contains``).
+
+    ``scan_limit`` caps how many trailing lines are inspected when filtering, and
+    ``end_offset`` ignores everything from that byte offset on.
+    Lines are located in an mmap of the file and only the returned ones are decoded.
+    """
+    wanted = max(1, lines)
+    needle = contains.encode("utf-8") if contains is not None else None
+    with path.open("rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0 or end_offset == 0:
+            return []
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            spans: List[Tuple[int, int]] = []
+            for scanned, (start, end) in enumerate(_iter_line_spans_reverse(view, end_offset), start=1):
+                if needle is None or view.find(needle, start, end) != -1:
+                    spans.append((start, end))
+                    if len(spans) >= wanted:
+                        break
+                if scan_limit is not None and scanned >= scan_limit:
+                    break
+            return [view[start:end].decode("utf-8", errors="replace").rstrip("\r") for start, end in reversed(spans)]
+
+
+def _task_etag(task_id: str, status: str, updated_at: float) -> str:
+    digest = hashlib.blake2b(f"{task_id}|{status}|{updated_at!r}".encode("utf-8"), digest_size=8).hexdigest()
+    return f'"{digest}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
 
 
 @router.get("/tasks/{task_id}", response_model=TaskResponse)
-def get_task(task_id: str, credential: Credential = Depends(authenticate)) -> TaskResponse:
+def get_task(
+    task_id: str,
+    request: Request,
+    response: Response,
+    credential: Credential = Depends(authenticate),
+):
     task = task_store.get(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    # Pollers resend the ETag and get an empty 304 until the task changes.
+    etag = _task_etag(task_id, task.status, task.updated_at)
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return TaskResponse(task_id=task_id, status=task.status, detail=task.detail, result=task.result)
 
 
+@router.get("/tasks/{task_id}/result")
+def get_task_result(task_id: str, credential: Credential = Depends(authenticate)) -> Response:
+    # Served as stored JSON bytes; /tasks/{task_id} re-validates through TaskResponse.
+    payload = task_store.get_result_json(task_id)
+    if payload is None:
+        if task_store.get(task_id) is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        raise HTTPException(status_code=404, detail="Task result not available")
+    return Response(content=payload, media_type="application/json")
+
+
+@router.get("/tasks/{task_id}/poll")
+def poll_task(task_id: str, log_lines: int = 200, credential: Credential = Depends(authenticate)):
+    # Status, result and the task's log lines in one round trip for UI pollers.
+    task = task_store.get(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    logs: List[str] = []
+    if log_lines > 0:
+        try:
+            log_path = settings.logs_dir / "pipeline.log"
+            logs = _tail_log(log_path, log_lines, contains=task_id, scan_limit=3 * max(1, log_lines))
+        except FileNotFoundError:
+            pass
+    return {
+        "task_id": task_id,
+        "status": task.status,
+        "detail": task.detail,
+        "result": task.result,
+        # Changes with every state change; lets pollers skip re-rendering an unchanged task.
+        "updated_at": task.updated_at,
+        "logs": logs,
+    }
+
+
+async def _task_events(task_id: str, request: Request) -> AsyncIterator[str]:
+    """Yield an SSE ``status`` event whenever the task changes, until it finishes."""
+    last_update: Optional[float] = None
+    last_sent = time.monotonic()
+    while not await request.is_disconnected():
+        record = await run_in_threadpool(task_store.get, task_id)
+        if record is None:
+            return
+        if record.updated_at != last_update:
+            last_update = record.updated_at
+            last_sent = time.monotonic()
+            data = json.dumps({"task_id": task_id, "status": record.status, "detail": record.detail}, ensure_ascii=False)
+            yield f"event: status\ndata: {data}\n\n"
+            if record.done:
+                return
+        elif time.monotonic() - last_sent >= _EVENTS_KEEPALIVE_SECONDS:
+            last_sent = time.monotonic()
+            yield ": keepalive\n\n"
+        await asyncio.sleep(_EVENTS_POLL_SECONDS)
+
+
+@router.get("/tasks/{task_id}/events")
+async def task_events(task_id: str, request: Request, credential: Credential = Depends(authenticate)):
+    # One long-lived stream instead of client-side polling; the result itself
+    # stays on /tasks/{task_id}/result.
+    if await run_in_threadpool(task_store.get, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return StreamingResponse(
+        _task_events(task_id, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/logs/tail")
 def tail_logs(lines: int = 200, credential: Credential = Depends(authenticate)):
     log_path = settings.logs_dir / "pipeline.log"
@@ -43,16 +178,90 @@ def tail_logs(lines: int = 200, credential: Credential = Depends(authenticate)):
         raise HTTPException(status_code=404, detail="Log file not found")
 
 
+def _read_from(path: Path, offset: int) -> bytes:
+    with path.open("rb") as handle:
+        handle.seek(offset)
+        return handle.read()
+
+
+def _complete_lines_size(path: Path) -> int:
+    """Byte offset just past the last complete line of ``path``."""
+    with path.open("rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            return view.rfind(b"\n") + 1
+
+
+def _task_log_backlog(task_id: str, log_path: Path) -> Tuple[List[str], int]:
+    # Fix the offset first and tail only up to it: the follow loop then starts
+    # exactly where the backlog ends, so no line is skipped or sent twice.
+    try:
+        offset = _complete_lines_size(log_path)
+        return _tail_log(log_path, 200, task_id, 600, end_offset=offset), offset
+    except FileNotFoundError:  # rotated away since the route checked it
+        return [], 0
+
+
+async def _follow_task_log(task_id: str, log_path: Path, request: Request) -> AsyncIterator[str]:
+    """Yield the task's recent log lines, then only newly appended ones, as SSE ``data`` events."""
+    needle = task_id.encode("utf-8")
+    backlog, offset = await run_in_threadpool(_task_log_backlog, task_id, log_path)
+    for row in backlog:
+        yield f"data: {row}\n\n"
+    pending = b""
+    finished = False
+    last_sent = time.monotonic()
+    while not finished and not await request.is_disconnected():
+        record = await run_in_threadpool(task_store.get, task_id)
+        # Read once more after the task finished so its last lines are delivered.
+        finished = record is None or record.done
+        try:
+            size = log_path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size < offset:  # rotated or truncated
+            offset, pending = 0, b""
+        if size > offset:
+            chunk = pending + await run_in_threadpool(_read_from, log_path, offset)
+            offset += len(chunk) - len(pending)
+            rows = chunk.split(b"\n")
+            pending = rows.pop()
+            for row in rows:
+                if needle in row:
+                    last_sent = time.monotonic()
+                    yield f"data: {row.decode('utf-8', errors='replace').rstrip()}\n\n"
+        if time.monotonic() - last_sent >= _EVENTS_KEEPALIVE_SECONDS:
+            last_sent = time.monotonic()
+            yield ": keepalive\n\n"
+        if not finished:
+            await asyncio.sleep(_EVENTS_POLL_SECONDS)
+
+
+@router.get("/logs/{task_id}/stream")
+async def task_log_stream(task_id: str, request: Request, credential: Credential = Depends(authenticate)):
+    # Pushes only new lines instead of re-sending the whole tail on every poll.
+    log_path = settings.logs_dir / "pipeline.log"
+    if not log_path.exists():
+        raise HTTPException(status_code=404, detail="Log file not found")
+    if await run_in_threadpool(task_store.get, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return StreamingResponse(
+        _follow_task_log(task_id, log_path, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/logs/{task_id}")
 def task_log(task_id: str, credential: Credential = Depends(authenticate)):
     log_path = settings.logs_dir / "pipeline.log"
     try:
-        lines = _tail_log(log_path, 600)
+        scoped = _tail_log(log_path, 200, contains=task_id, scan_limit=600)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Log file not found")
-    scoped = [line for line in lines if task_id in line]
     if not scoped:
         record = task_store.get(task_id)
         if record is None:
             raise HTTPException(status_code=404, detail="Task not found")
-    return {"task_id": task_id, "lines": scoped[-200:]}
\ No newline at end of file
+    return {"task_id": task_id, "lines": scoped}
\ No newline at end of file
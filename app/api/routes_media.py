@@ -0,0 +1,84 @@
+"""Cacheable media endpoints for browser-facing previews."""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import re
+import secrets
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from app.api.routes_logs import _etag_matches
+from app.config import settings
+from app.logging_utils import get_pipeline_logger
+
+logger = get_pipeline_logger("pipeline.media")
+
+router = APIRouter(tags=["media"])
+
+_THUMBNAIL_NAME = re.compile(r"frame_\d+\.jpg")
+_THUMBNAIL_ROUTE = "/media/thumb"
+
+
+def _load_signing_key() -> bytes:
+    if settings.media_signing_key:
+        return settings.media_signing_key.encode("utf-8")
+    # A per-process key only verifies links issued by the same API worker.
+    logger.warning("MEDIA_SIGNING_KEY is not set; thumbnail links are signed with a per-process key")
+    return secrets.token_bytes(32)
+
+
+_SIGNING_KEY = _load_signing_key()
+
+
+def _thumbnail_signature(document_id: str, name: str, expires: int) -> str:
+    message = f"{document_id}/{name}:{expires}".encode("utf-8")
+    return hmac.new(_SIGNING_KEY, message, hashlib.sha256).hexdigest()
+
+
+def thumbnail_url(path: Optional[str]) -> Optional[str]:
+    """Map a keyframe path under the video intermediate dir to a signed, expiring ``/media/thumb`` URL."""
+    if not path:
+        return None
+    try:
+        relative = Path(path).resolve().relative_to(settings.video_intermediate_dir.resolve())
+    except (OSError, ValueError):
+        return None
+    if len(relative.parts) != 2 or not _THUMBNAIL_NAME.fullmatch(relative.name):
+        return None
+    document_id, name = relative.parts[0], relative.name
+    # Expiry is rounded up to a whole TTL window so repeated queries yield the same
+    # URL (and browser cache entry); each link stays valid for one to two TTLs.
+    ttl = max(1, settings.media_url_ttl_seconds)
+    expires = (int(time.time()) // ttl + 2) * ttl
+    query = urlencode({"expires": expires, "sig": _thumbnail_signature(document_id, name, expires)})
+    return f"{_THUMBNAIL_ROUTE}/{document_id}/{name}?{query}"
+
+
+@router.get(_THUMBNAIL_ROUTE + "/{document_id}/{name}")
+def get_thumbnail(document_id: str, name: str, request: Request, expires: int = 0, sig: str = "") -> Response:
+    # Loaded by <img> tags, which cannot send X-Appid/X-Key; the HMAC issued with
+    # the authenticated /query response stands in for them. Document ids can be
+    # chosen by clients, so they are never treated as secret.
+    now = int(time.time())
+    if expires <= now or not hmac.compare_digest(sig, _thumbnail_signature(document_id, name, expires)):
+        raise HTTPException(status_code=403, detail="Invalid or expired thumbnail link")
+    if document_id in {".", ".."} or not _THUMBNAIL_NAME.fullmatch(name):
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    path = settings.video_intermediate_dir / document_id / name
+    try:
+        stat = path.stat()
+    except OSError:
+        raise HTTPException(status_code=404, detail="Thumbnail not found") from None
+    # Frames are rewritten in place on re-ingest, so validate by mtime/size rather than marking immutable.
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    max_age = min(settings.media_cache_max_age, expires - now)
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={max_age}"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="image/jpeg", headers=headers, stat_result=stat)
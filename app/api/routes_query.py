@@ -2,11 +2,13 @@
 from __future__ import annotations
 
 import datetime as dt
-from typing import Dict
+from typing import Any, Dict, Iterator
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 
 from app.api.dependencies import authenticate
+from app.api.routes_media import thumbnail_url
 from app.api.schemas import QueryHit, QueryRequest, QueryResponse
 from app.core.security import Credential
 from app.core.tracking import new_context
@@ -15,6 +17,13 @@ from app.services.search_client import search_client
 router = APIRouter(tags=["query"])
 
 
+def _to_hit(hit: Dict[str, Any]) -> QueryHit:
+    normalized = QueryHit(**hit)
+    if normalized.thumbnail_url is None:
+        normalized.thumbnail_url = thumbnail_url(normalized.thumbnail)
+    return normalized
+
+
 @router.post("/query", response_model=QueryResponse)
 def query(
     request: QueryRequest,
@@ -23,5 +32,21 @@ def query(
     new_context(app_id=credential.app_id)
     issued_at = dt.datetime.utcnow().isoformat()
     hits = search_client.search(request.query, request.top_k)
-    normalized = [QueryHit(**hit) for hit in hits]
-    return QueryResponse(issued_at=issued_at, query=request.query, hits=normalized)
\ No newline at end of file
+    normalized = [_to_hit(hit) for hit in hits]
+    return QueryResponse(issued_at=issued_at, query=request.query, hits=normalized)
+
+
+@router.post("/query/stream")
+def query_stream(
+    request: QueryRequest,
+    credential: Credential = Depends(authenticate),
+) -> StreamingResponse:
+    """Same search as ``/query``, written as NDJSON (one ``QueryHit`` per line) as hits are found."""
+    new_context(app_id=credential.app_id)
+    hits = search_client.iter_search(request.query, request.top_k)
+
+    def lines() -> Iterator[bytes]:
+        for hit in hits:
+            yield _to_hit(hit).model_dump_json().encode("utf-8") + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
\ No newline at end of file
@@ -1,7 +1,7 @@
 """Shared API schemas aligning with the new engine contract."""
 from __future__ import annotations
 
-from typing import Any, Dict, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -94,6 +94,17 @@ class IngestRequest(BaseModel):
     )
 
 
+class IngestBatchRequest(BaseModel):
+    items: List[IngestRequest] = Field(
+        min_length=1,
+        description="批量提交的 ingest 请求，共用一个 broker 连接发布任务；数量受批量限额约束。",
+    )
+
+
+class IngestBatchResponse(BaseModel):
+    tasks: List[TaskResponse]
+
+
 class QueryHit(BaseModel):
     model_config = ConfigDict(extra="allow")
     chunk_id: Optional[str] = None
@@ -103,6 +114,7 @@ class QueryHit(BaseModel):
     content: Any = None
     media_type: Optional[str] = None
     thumbnail: Optional[str] = None
+    thumbnail_url: Optional[str] = None
     video_path: Optional[str] = None
     audio_path: Optional[str] = None
 
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from celery import Celery
+from celery.signals import worker_process_shutdown
 
 from app.config import settings
 
@@ -20,6 +21,19 @@ celery_app.conf.update(
         "pipeline.index_document": {"queue": settings.celery_cpu_queue},
     },
     worker_hijack_root_logger=False,
+    # Long OCR/transcription stages must not hoard queued messages on one worker.
+    worker_prefetch_multiplier=settings.celery_prefetch_multiplier,
+    task_serializer=settings.celery_task_serializer,
+    result_serializer=settings.celery_task_serializer,
+    task_compression=settings.celery_task_compression or None,
+    accept_content=sorted({"json", settings.celery_task_serializer}),
 )
 
 celery_app.autodiscover_tasks(["app.pipeline"], related_name="celery_tasks")
+
+
+@worker_process_shutdown.connect
+def _flush_storage_uploads(**_: object) -> None:
+    from app.services import storage  # local import keeps worker boot light
+
+    storage.flush_minio_uploads()
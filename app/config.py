@@ -21,6 +21,7 @@ class Settings(BaseSettings):
     chunk_max_duration: float = 30.0
     frame_interval_seconds: float = 2.0
     embedding_dimension: int = 1024
+    embedding_quantized: bool = Field(False, env="EMBEDDING_QUANTIZED")
     pipeline_version: str = "v0.1.0"
     whisper_model: str = Field("base", env="WHISPER_MODEL")
     asr_language: str | None = Field(None, env="ASR_LANGUAGE")
@@ -35,6 +36,7 @@ class Settings(BaseSettings):
     ollama_base_url: str = Field("http://localhost:11434", env="OLLAMA_BASE_URL")
     ollama_embedding_model: str = Field("nomic-embed-text", env="OLLAMA_EMBEDDING_MODEL")
     ollama_timeout: int = Field(60, env="OLLAMA_TIMEOUT")
+    ollama_concurrency: int = Field(8, env="OLLAMA_CONCURRENCY")
 
     api_auth_required: bool = Field(True, env="API_AUTH_REQUIRED")
     api_secrets_path: str | None = Field("app_secrets.json", env="API_SECRETS_PATH")
@@ -51,26 +53,44 @@ class Settings(BaseSettings):
     celery_default_queue: str = Field("ingest_cpu", env="CELERY_DEFAULT_QUEUE")
     celery_io_queue: str = Field("ingest_io", env="CELERY_IO_QUEUE")
     celery_cpu_queue: str = Field("ingest_cpu", env="CELERY_CPU_QUEUE")
+    celery_video_queue: str | None = Field(None, env="CELERY_VIDEO_QUEUE")
+    celery_prefetch_multiplier: int = Field(1, env="CELERY_PREFETCH_MULTIPLIER")
+    celery_task_serializer: str = Field("json", env="CELERY_TASK_SERIALIZER")
+    celery_task_compression: str | None = Field(None, env="CELERY_TASK_COMPRESSION")
+    task_store_redis_url: str | None = Field(None, env="TASK_STORE_REDIS_URL")
+    task_store_ttl_seconds: int = Field(86_400, env="TASK_STORE_TTL_SECONDS")
+    media_cache_max_age: int = Field(3600, env="MEDIA_CACHE_MAX_AGE")
+    media_signing_key: str | None = Field(None, env="MEDIA_SIGNING_KEY")
+    media_url_ttl_seconds: int = Field(3600, env="MEDIA_URL_TTL_SECONDS")
     flower_address: str = Field("0.0.0.0", env="FLOWER_ADDRESS")
     flower_port: int = Field(5555, env="FLOWER_PORT")
     flower_health_retries: int = Field(30, env="FLOWER_HEALTH_RETRIES")
     flower_strict: bool = Field(False, env="FLOWER_STRICT")
 
+    raw_copy_buffer_bytes: int = Field(1_048_576, env="RAW_COPY_BUFFER_BYTES")
+    raw_storage_mode: str = Field("copy", env="RAW_STORAGE_MODE")
+    intermediate_format: str = Field("json", env="INTERMEDIATE_FORMAT")
+
     minio_enabled: bool = Field(False, env="MINIO_ENABLED")
     minio_endpoint: str = Field("http://localhost:9000", env="MINIO_ENDPOINT")
     minio_access_key: str | None = Field("minioadmin", env="MINIO_ACCESS_KEY")
     minio_secret_key: str | None = Field("minioadmin", env="MINIO_SECRET_KEY")
     minio_bucket: str = Field("mm-rag", env="MINIO_BUCKET")
+    minio_upload_workers: int = Field(8, env="MINIO_UPLOAD_WORKERS")
+    minio_assume_bucket_exists: bool = Field(False, env="MINIO_ASSUME_BUCKET_EXISTS")
 
     mineru_api_base: str | None = Field("http://127.0.0.1:8000", env="MINERU_API_BASE")
     mineru_api_key: str | None = Field(None, env="MINERU_API_KEY")
     mineru_timeout: int = Field(1200, env="MINERU_TIMEOUT")
+    mineru_concurrency: int = Field(4, env="MINERU_CONCURRENCY")
+    mineru_cache_enabled: bool = Field(False, env="MINERU_CACHE_ENABLED")
     mineru_callback_url: str | None = Field(None, env="MINERU_CALLBACK_URL")
     mineru_parse_path: str = Field("/file_parse", env="MINERU_PARSE_PATH")
     mineru_health_check: bool = Field(True, env="MINERU_HEALTH_CHECK")
     mineru_health_path: str = Field("/docs", env="MINERU_HEALTH_PATH")
     mineru_strict: bool = Field(False, env="MINERU_STRICT")
     pdf_parser: str = Field("mineru", env="PDF_PARSER")
+    use_pymupdf: bool = Field(True, env="USE_PYMUPDF")
 
     data_root: Path = DATA_DIR
     raw_storage_dir: Path = BASE_DIR / "data" / "raw"
@@ -0,0 +1,123 @@
+"""Transparent decompression of request bodies and selective compression of responses."""
+from __future__ import annotations
+
+import re
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None  # type: ignore
+
+
+class _GzipDecoder:
+    def __init__(self) -> None:
+        self._inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        # Bounding the output keeps a small bomb chunk from expanding in memory.
+        return self._inflater.decompress(data, max_length)
+
+    def flush(self) -> bytes:
+        return self._inflater.flush()
+
+
+class _ZstdDecoder:
+    def __init__(self) -> None:
+        self._inflater = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data: bytes, max_length: int) -> bytes:  # noqa: ARG002 - zstd has no output bound
+        return self._inflater.decompress(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+_DECODERS: Dict[str, Callable[[], Any]] = {"gzip": _GzipDecoder}
+if zstandard is not None:
+    _DECODERS["zstd"] = _ZstdDecoder
+
+
+class RequestDecompressionMiddleware:
+    """Inflate request bodies sent with ``Content-Encoding: gzip`` (or ``zstd`` with zstandard installed).
+
+    The body is decoded chunk by chunk as the route reads it, so multipart
+    uploads still spool to disk without being buffered whole. Decoded bodies
+    larger than ``max_body_bytes`` are rejected.
+    """
+
+    def __init__(self, app: Any, max_body_bytes: int) -> None:
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding: Optional[str] = None
+        headers = []
+        for name, value in scope["headers"]:
+            if name == b"content-encoding":
+                encoding = value.decode("latin-1").strip().lower()
+            elif name != b"content-length":
+                headers.append((name, value))
+        if encoding is None or encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+        if encoding not in _DECODERS:
+            # Raised here, an HTTPException would bypass FastAPI's handlers; answer directly.
+            response = JSONResponse({"detail": f"Unsupported Content-Encoding: {encoding}"}, status_code=415)
+            await response(scope, receive, send)
+            return
+
+        decoder = _DECODERS[encoding]()
+        limit = self.max_body_bytes
+        received = 0
+
+        async def inflate() -> Dict[str, Any]:
+            nonlocal received
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+            more_body = message.get("more_body", False)
+            try:
+                body = decoder.decompress(message.get("body", b""), limit - received + 1)
+                if not more_body:
+                    body += decoder.flush()
+            except Exception as exc:  # zlib.error / zstandard.ZstdError
+                raise HTTPException(status_code=400, detail=f"Malformed {encoding} request body") from exc
+            received += len(body)
+            if received > limit:
+                # HTTPException passes through FastAPI's body parsing; other errors become a generic 400.
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Decompressed request body exceeds {limit / (1024 * 1024):.0f}MB",
+                )
+            return {"type": "http.request", "body": body, "more_body": more_body}
+
+        await self.app(dict(scope, headers=headers), inflate, send)
+
+
+class ResponseCompressionMiddleware:
+    """GZip responses, except on the routes matching ``uncompressed_paths``.
+
+    Meant for the NDJSON / SSE streams: gzip holds their lines back until the
+    compressor flushes, and only newer Starlette releases skip
+    ``text/event-stream`` (none skip ``application/x-ndjson``) on their own.
+    """
+
+    def __init__(self, app: Any, minimum_size: int, uncompressed_paths: str) -> None:
+        self.app = app
+        self._gzip = GZipMiddleware(app, minimum_size=minimum_size)
+        self._uncompressed_paths = re.compile(uncompressed_paths)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] == "http" and self._uncompressed_paths.fullmatch(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        await self._gzip(scope, receive, send)
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, List
+from typing import Any, Dict, Iterable, List, Optional
 
 from celery import chain
 
 from app.celery_app import celery_app
+from app.config import settings
 from app.logging_utils import get_pipeline_logger
 from app.pipeline.stages.base import Stage
 from app.pipeline.stages.chunks import ChunkStage
@@ -63,6 +64,23 @@ STAGES: List[Stage] = _build_stage_instances()
 TASKS: List[Any] = [_as_task_signature(stage) for stage in STAGES]
 
 
-def enqueue_pipeline(context: Dict[str, Any]):
-    workflow = chain(TASKS[0].s(context), *(sig.s() for sig in TASKS[1:]))
-    return workflow.apply_async(task_id=context["document_id"])
+def _pipeline_signatures(context: Dict[str, Any]) -> List[Any]:
+    signatures = [task.s(context) if idx == 0 else task.s() for idx, task in enumerate(TASKS)]
+    if context.get("media_type") == "video" and settings.celery_video_queue:
+        # Video chunking (frame extraction, ASR) runs on a dedicated queue whose
+        # worker concurrency caps how many videos are processed at once.
+        for idx, stage in enumerate(STAGES):
+            if stage.name == ChunkStage.name:
+                signatures[idx] = signatures[idx].set(queue=settings.celery_video_queue)
+    return signatures
+
+
+def enqueue_pipeline(context: Dict[str, Any], producer: Optional[Any] = None):
+    workflow = chain(*_pipeline_signatures(context))
+    return workflow.apply_async(task_id=context["document_id"], producer=producer)
+
+
+def enqueue_pipelines(contexts: Iterable[Dict[str, Any]]) -> List[Any]:
+    """Publish several pipelines over one pooled broker producer."""
+    with celery_app.producer_pool.acquire(block=True) as producer:
+        return [enqueue_pipeline(context, producer=producer) for context in contexts]
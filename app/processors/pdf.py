@@ -80,7 +80,12 @@ def build_pdf_chunks(
     extras = extras or {}
     parser_name = (extras.get("parser") or parser.__class__.__name__).lower()
     artifact_category = f"pdf_{parser_name}"
-    artifact_path = storage.persist_auxiliary_json(document_id, payload, category=artifact_category)
+    if settings.intermediate_format == "msgpack":
+        artifact_path = storage.persist_intermediate_obj(
+            payload, settings.data_root / "intermediate" / artifact_category, document_id
+        )
+    else:
+        artifact_path = storage.persist_auxiliary_json(document_id, payload, category=artifact_category)
     extras.setdefault("artifacts", {})["pdf_payload_path"] = str(artifact_path)
     pages = _normalize_pages(payload)
 
@@ -1,7 +1,10 @@
 """MinerU PDF parser plugin."""
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
+import os
 import shutil
 from io import BytesIO
 from pathlib import Path
@@ -10,12 +13,29 @@ import zipfile
 
 import requests
 
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None  # type: ignore
+
+try:
+    from requests_toolbelt import MultipartEncoder
+except ImportError:  # pragma: no cover - optional dependency
+    MultipartEncoder = None  # type: ignore
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover - optional dependency
+    xxhash = None  # type: ignore
+
 from app.config import settings
 from app.logging_utils import get_pipeline_logger
 from app.services import storage
 
 logger = get_pipeline_logger("pdf_parser.mineru")
 
+_HASH_CHUNK_BYTES = 1 << 20
+
 
 class MinerUPdfParser:
     name = "mineru"
@@ -40,16 +60,13 @@ class MinerUPdfParser:
 
     @staticmethod
     def _normalize_langs(raw: Any) -> List[str]:
-        if raw is None:
-            return []
         if isinstance(raw, str):
-            candidates: Sequence[str] = [raw]
-        elif isinstance(raw, Sequence):
-            candidates = raw
-        else:
+            text = raw.strip()
+            return [text] if text else []
+        if raw is None or not isinstance(raw, Sequence):
             return []
         langs: List[str] = []
-        for item in candidates:
+        for item in raw:
             text = str(item).strip()
             if text:
                 langs.append(text)
@@ -216,7 +233,11 @@ class MinerUPdfParser:
                     shutil.rmtree(artifacts_dir)
                 artifacts_dir.mkdir(parents=True, exist_ok=True)
             original_target = artifacts_dir / "original_pdf.pdf"
-            shutil.copy(pdf_path, original_target)
+            try:
+                # Hardlink when raw storage and the asset dir share a filesystem.
+                os.link(pdf_path, original_target)
+            except OSError:
+                shutil.copyfile(pdf_path, original_target)
             if layout_pdf is None:
                 layout_pdf = original_target
         bundle_path: Optional[Path] = None
@@ -264,16 +285,7 @@ class MinerUPdfParser:
             artifacts_preview or "(none)",
         )
 
-    def parse(
-        self,
-        pdf_path: Path,
-        document_id: str,
-        options: Dict[str, Any] | None = None,
-    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
-        if not self.enabled or not self.base_url:
-            raise RuntimeError("MinerU base URL is not configured")
-
-        opts = options or {}
+    def _build_form_entries(self, document_id: str, opts: Dict[str, Any]) -> List[Tuple[str, Any]]:
         backend = str(opts.get("backend") or "pipeline")
         parse_method = str(opts.get("parse_method") or "auto")
         langs = self._normalize_langs(opts.get("lang_list")) or ["ch"]
@@ -313,41 +325,39 @@ class MinerUPdfParser:
             page_value = self._int_value(opts.get(page_key))
             if page_value is not None:
                 form_entries.append((page_key, page_value))
+        return form_entries
 
-        endpoint = f"{self.base_url}{self.parse_path}"
-        with pdf_path.open("rb") as handler:
-            files = [("files", (pdf_path.name, handler, "application/pdf"))]
-            logger.info("Submitting %s to MinerU endpoint %s", pdf_path.name, endpoint)
-            response = requests.post(
-                endpoint,
-                headers=self._headers(),
-                data=form_entries,
-                files=files,
-                timeout=settings.mineru_timeout,
-            )
-        try:
-            response.raise_for_status()
-        except requests.HTTPError as exc:  # type: ignore[attr-defined]
-            detail = response.text.strip()
-            logger.error(
-                "MinerU parse request failed with status %s: %s",
-                response.status_code,
-                detail or "(empty response)",
-            )
-            raise requests.HTTPError(
-                f"MinerU error {response.status_code}: {detail or exc}", response=response
-            ) from exc
+    @staticmethod
+    def _form_mapping(form_entries: List[Tuple[str, Any]]) -> Dict[str, Any]:
+        """Group form entries by name for httpx, which sends list values as repeated fields.
 
+        httpx reads a list of tuples as raw request content, which an AsyncClient
+        rejects; requests and MultipartEncoder keep taking the entries as-is.
+        """
+        mapping: Dict[str, Any] = {}
+        for key, value in form_entries:
+            if key in mapping:
+                previous = mapping[key]
+                mapping[key] = [*previous, value] if isinstance(previous, list) else [previous, value]
+            else:
+                mapping[key] = value
+        return mapping
+
+    def _finalize_response(
+        self,
+        pdf_path: Path,
+        document_id: str,
+        endpoint: str,
+        content_type: str,
+        raw_bytes: bytes,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         payload: Dict[str, Any]
         artifacts: Dict[str, Any] = {}
         try:
-            payload = response.json()
+            payload = json.loads(raw_bytes)
             self._log_payload_overview(document_id, payload, "json")
-        except requests.exceptions.JSONDecodeError:
-            content_type = (response.headers.get("Content-Type") or "").lower()
-            raw_bytes = response.content or b""
-            if not raw_bytes:
-                raw_bytes = (response.text or "").encode("utf-8")
+        except ValueError:
+            content_type = (content_type or "").lower()
             if "zip" in content_type or raw_bytes.startswith(b"PK"):
                 artifact_path = storage.persist_auxiliary_bytes(
                     document_id,
@@ -412,3 +422,176 @@ class MinerUPdfParser:
             )
             extras.setdefault("artifacts", {}).update(artifacts)
         return payload.get("result") or payload, extras
+
+    @staticmethod
+    def _cache_key(pdf_path: Path, endpoint: str, form_entries: List[Tuple[str, Any]]) -> str:
+        """Content-addressed key for a MinerU response; not used for integrity checks."""
+
+        hasher = xxhash.xxh3_64() if xxhash is not None else hashlib.blake2b(digest_size=16)
+        with pdf_path.open("rb") as handler:
+            for chunk in iter(lambda: handler.read(_HASH_CHUNK_BYTES), b""):
+                hasher.update(chunk)
+        # document_id differs per upload and does not influence the parse output.
+        canon_opts = sorted((key, str(value)) for key, value in form_entries if key != "document_id")
+        hasher.update(json.dumps([endpoint, canon_opts]).encode("utf-8"))
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _cache_dir() -> Path:
+        return settings.data_root / "intermediate" / "mineru_cache"
+
+    def _load_cached_response(self, cache_key: str) -> Optional[Tuple[str, bytes]]:
+        for suffix, content_type in ((".zip", "application/zip"), (".json", "application/json")):
+            candidate = self._cache_dir() / f"{cache_key}{suffix}"
+            if candidate.exists():
+                logger.info("MinerU cache hit %s", candidate.name)
+                return content_type, candidate.read_bytes()
+        return None
+
+    def _store_cached_response(self, cache_key: str, content_type: str, raw_bytes: bytes) -> None:
+        if "zip" in (content_type or "").lower() or raw_bytes.startswith(b"PK"):
+            suffix = ".zip"
+        elif raw_bytes.lstrip()[:1] in (b"{", b"["):
+            suffix = ".json"
+        else:
+            return
+        cache_dir = self._cache_dir()
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_dir / f"{cache_key}{suffix}.tmp"
+            tmp_path.write_bytes(raw_bytes)
+            tmp_path.replace(cache_dir / f"{cache_key}{suffix}")
+        except OSError as exc:  # pragma: no cover - disk failure
+            logger.warning("Failed to store MinerU cache entry %s: %s", cache_key, exc)
+
+    def parse(
+        self,
+        pdf_path: Path,
+        document_id: str,
+        options: Dict[str, Any] | None = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        if not self.enabled or not self.base_url:
+            raise RuntimeError("MinerU base URL is not configured")
+
+        form_entries = self._build_form_entries(document_id, options or {})
+        endpoint = f"{self.base_url}{self.parse_path}"
+        cache_key: Optional[str] = None
+        if settings.mineru_cache_enabled:
+            cache_key = self._cache_key(pdf_path, endpoint, form_entries)
+            cached = self._load_cached_response(cache_key)
+            if cached is not None:
+                return self._finalize_response(pdf_path, document_id, endpoint, *cached)
+        with pdf_path.open("rb") as handler:
+            logger.info("Submitting %s to MinerU endpoint %s", pdf_path.name, endpoint)
+            if MultipartEncoder is not None:
+                # Stream the PDF from disk instead of buffering the whole multipart body.
+                encoder = MultipartEncoder(
+                    fields=[*form_entries, ("files", (pdf_path.name, handler, "application/pdf"))]
+                )
+                response = requests.post(
+                    endpoint,
+                    headers=self._headers(encoder.content_type),
+                    data=encoder,
+                    timeout=settings.mineru_timeout,
+                )
+            else:
+                files = [("files", (pdf_path.name, handler, "application/pdf"))]
+                response = requests.post(
+                    endpoint,
+                    headers=self._headers(),
+                    data=form_entries,
+                    files=files,
+                    timeout=settings.mineru_timeout,
+                )
+        try:
+            response.raise_for_status()
+        except requests.HTTPError as exc:  # type: ignore[attr-defined]
+            detail = response.text.strip()
+            logger.error(
+                "MinerU parse request failed with status %s: %s",
+                response.status_code,
+                detail or "(empty response)",
+            )
+            raise requests.HTTPError(
+                f"MinerU error {response.status_code}: {detail or exc}", response=response
+            ) from exc
+
+        raw_bytes = response.content or b""
+        if not raw_bytes:
+            raw_bytes = (response.text or "").encode("utf-8")
+        content_type = response.headers.get("Content-Type") or ""
+        if cache_key is not None:
+            self._store_cached_response(cache_key, content_type, raw_bytes)
+        return self._finalize_response(pdf_path, document_id, endpoint, content_type, raw_bytes)
+
+    async def _parse_async(
+        self,
+        client: Any,
+        semaphore: asyncio.Semaphore,
+        pdf_path: Path,
+        document_id: str,
+        options: Dict[str, Any] | None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        form_entries = self._build_form_entries(document_id, options or {})
+        endpoint = f"{self.base_url}{self.parse_path}"
+        async with semaphore:
+            with pdf_path.open("rb") as handler:
+                files = [("files", (pdf_path.name, handler, "application/pdf"))]
+                logger.info("Submitting %s to MinerU endpoint %s (async)", pdf_path.name, endpoint)
+                response = await client.post(
+                    endpoint,
+                    headers=self._headers(),
+                    data=self._form_mapping(form_entries),
+                    files=files,
+                )
+        if response.is_error:
+            detail = response.text.strip()
+            logger.error(
+                "MinerU parse request failed with status %s: %s",
+                response.status_code,
+                detail or "(empty response)",
+            )
+            raise RuntimeError(f"MinerU error {response.status_code}: {detail or '(empty response)'}")
+        # ZIP decoding and asset persistence are blocking; keep them off the event loop.
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            self._finalize_response,
+            pdf_path,
+            document_id,
+            endpoint,
+            response.headers.get("Content-Type") or "",
+            response.content or b"",
+        )
+
+    async def parse_many(
+        self,
+        pdf_paths: Sequence[Path],
+        document_ids: Sequence[str] | None = None,
+        options: Dict[str, Any] | None = None,
+    ) -> List[Tuple[Dict[str, Any], Dict[str, Any]] | BaseException]:
+        """Submit several PDFs to MinerU concurrently.
+
+        Results are returned in input order; failed submissions yield the raised
+        exception in place of the ``(payload, extras)`` tuple.
+        """
+
+        if not self.enabled or not self.base_url:
+            raise RuntimeError("MinerU base URL is not configured")
+        if httpx is None:
+            raise RuntimeError("httpx is required for concurrent MinerU submissions")
+        paths = [Path(path) for path in pdf_paths]
+        ids = list(document_ids) if document_ids is not None else [path.stem for path in paths]
+        if len(ids) != len(paths):
+            raise ValueError("document_ids must match pdf_paths in length")
+        concurrency = max(1, settings.mineru_concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(timeout=settings.mineru_timeout, limits=limits) as client:
+            return await asyncio.gather(
+                *(
+                    self._parse_async(client, semaphore, path, doc_id, options)
+                    for path, doc_id in zip(paths, ids)
+                ),
+                return_exceptions=True,
+            )
@@ -1,19 +1,178 @@
 from __future__ import annotations
 
+import atexit
+import datetime as dt
+import mmap
 import os
-from typing import Any, Dict, List, Optional
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
 
 # Force the official client to send compatibility headers supported by ES 8.x
 # before the transport is imported or instantiated.
 os.environ.setdefault("ELASTIC_CLIENT_APIVERSIONING", "true")
 
 from app.config import settings
+from app.logging_utils import get_pipeline_logger
 
 try:
     from elasticsearch import Elasticsearch
 except ImportError:
     Elasticsearch = None  # type: ignore
 
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None  # type: ignore
+
+logger = get_pipeline_logger("pipeline.search")
+
+_DOCUMENT_FIELDS_CACHE_SIZE = 128
+
+
+class _DocumentFields(NamedTuple):
+    """Per-document values shared by every chunk of that document."""
+
+    document_id: Optional[str]
+    title: Optional[str]
+    path: Optional[str]
+    description: Optional[str]
+    has_metadata: bool
+
+
+def _plain(value: Any) -> Any:
+    """Reduce ``value`` to msgpack/JSON-native types, the same way on every path.
+
+    Tuples become lists, numpy values their Python equivalents, dates ISO
+    strings and anything else ``str``; so a record reads back identically
+    whether it was spilled or kept in the list.
+    """
+    if value is None or isinstance(value, (str, bool, int, float, bytes)):
+        return value
+    if isinstance(value, dict):
+        return {str(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, (dt.date, dt.time)):
+        return value.isoformat()
+    tolist = getattr(value, "tolist", None)  # numpy scalars and arrays
+    if callable(tolist):
+        return _plain(tolist())
+    return str(value)
+
+
+class _MemoryIndex:
+    """Append-only fallback index that spills records to a msgpack file.
+
+    Only ``(offset, length)`` pairs stay in RAM; records are decoded from an
+    mmap of the spill file while searching. The file is created on the first
+    append and removed by :meth:`close` (or at exit). Without ``msgpack``
+    installed, or with ``spill=False``, the records are kept in a plain list.
+    """
+
+    def __init__(self, spill: bool = True) -> None:
+        self._lock = threading.Lock()
+        self._records: List[Dict[str, Any]] = []
+        self._offsets: List[Tuple[int, int]] = []
+        self._spill = None
+        self._spill_path = None
+        self._spill_size = 0
+        self._spill_enabled = spill and msgpack is not None
+        if self._spill_enabled:
+            _SPILLING_INDEXES.add(self)
+
+    def _open_spill(self) -> None:
+        # Caller holds the lock; the name is taken at first use so a forked child gets its own file.
+        spill_path = settings.data_root / f"memidx-{os.getpid()}.msgpack"
+        try:
+            spill_path.parent.mkdir(parents=True, exist_ok=True)
+            self._spill = spill_path.open("wb+")
+            self._spill_path = spill_path
+        except OSError:  # pragma: no cover - read-only data root
+            self._spill_enabled = False
+
+    def append(self, record: Dict[str, Any]) -> None:
+        record = _plain(record)
+        if not self._spill_enabled:
+            self._records.append(record)
+            return
+        packed = msgpack.packb(record, use_bin_type=True)
+        with self._lock:
+            if self._spill is None:
+                self._open_spill()
+                if self._spill is None:
+                    self._records.append(record)
+                    return
+            self._spill.write(packed)
+            self._offsets.append((self._spill_size, len(packed)))
+            self._spill_size += len(packed)
+
+    def __len__(self) -> int:
+        return len(self._offsets) + len(self._records)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            records = list(self._records)
+            offsets = list(self._offsets)
+            spill = self._spill
+            if spill is not None:
+                spill.flush()
+        yield from records
+        if not offsets:
+            return
+        with mmap.mmap(spill.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            for offset, length in offsets:
+                yield msgpack.unpackb(view[offset : offset + length], raw=False)
+
+    def close(self) -> None:
+        """Close and delete the spill file; the records in it are dropped."""
+        with self._lock:
+            spill, spill_path = self._spill, self._spill_path
+            self._spill = self._spill_path = None
+            self._offsets = []
+            self._spill_size = 0
+        if spill is not None:
+            spill.close()
+        if spill_path is not None:
+            spill_path.unlink(missing_ok=True)
+
+    def _before_fork(self) -> None:
+        # Held across fork() so no append is mid-write, and flushed so the child's
+        # copy of the handle has nothing buffered to write into our file.
+        self._lock.acquire()
+        if self._spill is not None:
+            self._spill.flush()
+
+    def _after_fork_in_parent(self) -> None:
+        self._lock.release()
+
+    def _reset_after_fork(self) -> None:
+        # The child must neither append to nor delete the parent's file; it starts a file of its own.
+        self._lock = threading.Lock()
+        if self._spill is not None:
+            self._spill.close()
+        self._spill = self._spill_path = None
+        self._offsets = []
+        self._spill_size = 0
+
+
+_SPILLING_INDEXES: "weakref.WeakSet[_MemoryIndex]" = weakref.WeakSet()
+
+
+def _close_spilling_indexes() -> None:
+    for index in list(_SPILLING_INDEXES):
+        index.close()
+
+
+atexit.register(_close_spilling_indexes)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(
+        before=lambda: [index._before_fork() for index in list(_SPILLING_INDEXES)],
+        after_in_parent=lambda: [index._after_fork_in_parent() for index in list(_SPILLING_INDEXES)],
+        after_in_child=lambda: [index._reset_after_fork() for index in list(_SPILLING_INDEXES)],
+    )
+
 
 class SearchClient:
     """Thin wrapper that falls back to in-memory indexing when ES is unavailable."""
@@ -21,9 +180,13 @@ class SearchClient:
     def __init__(self) -> None:
         self.segments_index = settings.es_index
         self.documents_index = f"{settings.es_index}-docs"
+        self._document_fields: "OrderedDict[str, _DocumentFields]" = OrderedDict()
+        self._segments_mapping_ready = False
+        # Cleared if the segments index already stores float vectors.
+        self._quantize_vectors = settings.embedding_quantized
         if (Elasticsearch is None) or (not settings.es_enabled):
             self.client = None
-            self._memory_index: List[Dict[str, Any]] = []
+            self._memory_index = _MemoryIndex()
         else:
             auth = None
             if settings.es_user and settings.es_password:
@@ -42,12 +205,40 @@ class SearchClient:
                 self.client = base_client.options(headers=compat_headers)
             except Exception:  # pragma: no cover - fallback path
                 self.client = None
-            self._memory_index = []
+            # Only searched when the client could not be built; otherwise it just
+            # holds writes ES rejected, so it never needs a spill file.
+            self._memory_index = _MemoryIndex(spill=self.client is None)
 
-    def _format_chunk_document(self, chunk: Dict[str, Any], document: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    @staticmethod
+    def _extract_document_fields(document: Optional[Dict[str, Any]]) -> _DocumentFields:
         metadata = (document or {}).get("document_metadata", {})
-        source_info = metadata.get("source_info", {}) if isinstance(metadata, dict) else {}
+        if not isinstance(metadata, dict):
+            return _DocumentFields((document or {}).get("document_id"), None, None, None, False)
+        source_info = metadata.get("source_info") or {}
+        return _DocumentFields(
+            document_id=(document or {}).get("document_id"),
+            title=metadata.get("title"),
+            path=source_info.get("file_path") if isinstance(source_info, dict) else None,
+            description=metadata.get("description"),
+            has_metadata=True,
+        )
 
+    def _document_fixed_fields(self, document: Optional[Dict[str, Any]]) -> _DocumentFields:
+        document_id = (document or {}).get("document_id")
+        if not document_id:
+            return self._extract_document_fields(document)
+        cached = self._document_fields.get(document_id)
+        if cached is not None:
+            self._document_fields.move_to_end(document_id)
+            return cached
+        fields = self._extract_document_fields(document)
+        self._document_fields[document_id] = fields
+        if len(self._document_fields) > _DOCUMENT_FIELDS_CACHE_SIZE:
+            self._document_fields.popitem(last=False)
+        return fields
+
+    @staticmethod
+    def _chunk_dynamic_fields(chunk: Dict[str, Any]) -> Dict[str, Any]:
         content_text = ""
         chunk_content = chunk.get("content")
         audio_path = None
@@ -59,17 +250,14 @@ class SearchClient:
                 content_text = text_blob.get("full_text") or ""
                 if not content_text:
                     segments = text_blob.get("segments") or []
-                    for segment in segments:
-                        text = segment.get("text")
-                        if text:
-                            content_text += (text + " ")
-            frame_desc = " ".join(
-                frame.get("description")
+                    content_text = " ".join(segment["text"] for segment in segments if segment.get("text"))
+            descriptions = [
+                frame["description"]
                 for frame in chunk_content.get("keyframes") or []
                 if isinstance(frame, dict) and frame.get("description")
-            )
-            if frame_desc:
-                content_text = (content_text + "\n" + frame_desc).strip()
+            ]
+            if descriptions:
+                content_text = "\n".join(filter(None, (content_text, " ".join(descriptions)))).strip()
             audio_info = chunk_content.get("audio")
             if isinstance(audio_info, dict):
                 audio_path = audio_info.get("url")
@@ -82,10 +270,6 @@ class SearchClient:
                     thumbnail_url = frame.get("thumbnail_url")
                     break
 
-        if not content_text:
-            fallback = metadata.get("description") if isinstance(metadata, dict) else None
-            content_text = fallback or chunk.get("chunk_id", "")
-
         vector_payload: List[float] = []
         vector_info = chunk.get("vector")
         if isinstance(vector_info, dict):
@@ -97,25 +281,104 @@ class SearchClient:
             elif len(vector_payload) < target_dim:
                 vector_payload = vector_payload + [0.0] * (target_dim - len(vector_payload))
 
-        es_doc = {
+        return {
             "chunk_id": chunk.get("chunk_id"),
-            "document_id": (document or {}).get("document_id"),
-            "title": metadata.get("title") if isinstance(metadata, dict) else chunk.get("chunk_id"),
-            "path": source_info.get("file_path"),
             "content": content_text,
             "vector": vector_payload,
             "media_type": chunk.get("media_type"),
             "temporal": chunk.get("temporal"),
             "thumbnail": thumbnail_url,
-            "video_path": video_path or source_info.get("file_path"),
+            "video_path": video_path,
             "audio_path": audio_path,
         }
+
+    def _format_chunk_document(self, chunk: Dict[str, Any], document: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        fixed = self._document_fixed_fields(document)
+        es_doc = self._chunk_dynamic_fields(chunk)
+        if not es_doc["content"]:
+            es_doc["content"] = fixed.description or chunk.get("chunk_id", "")
+        es_doc["document_id"] = fixed.document_id
+        es_doc["title"] = fixed.title if fixed.has_metadata else chunk.get("chunk_id")
+        es_doc["path"] = fixed.path
+        es_doc["video_path"] = es_doc["video_path"] or fixed.path
+        # Only once the index is known to hold byte vectors (see _ensure_segments_mapping).
+        if self._quantize_vectors and self._segments_mapping_ready:
+            quantized, scale = self._quantize_vector(es_doc.pop("vector"))
+            if quantized:
+                es_doc["vector"] = quantized
+                es_doc["vector_scale"] = scale
         return es_doc
 
+    @staticmethod
+    def _quantize_vector(vector: List[float]) -> Tuple[List[int], float]:
+        """Scale a float embedding into the int8 range used by byte dense_vectors."""
+
+        peak = max((abs(value) for value in vector), default=0.0)
+        if not peak:
+            # ES rejects zero-magnitude vectors under cosine similarity.
+            return [], 0.0
+        scale = 127.0 / peak
+        return [max(-128, min(127, round(value * scale))) for value in vector], scale
+
+    @staticmethod
+    def _quantized_vector_properties() -> Dict[str, Any]:
+        return {
+            "vector": {
+                "type": "dense_vector",
+                "dims": settings.embedding_dimension,
+                "element_type": "byte",
+                "index": True,
+                "similarity": "cosine",
+            },
+            "vector_scale": {"type": "float", "index": False},
+        }
+
+    def _vector_element_type(self) -> Optional[str]:
+        """``element_type`` of the existing ``vector`` field (``float`` if unset), or None if unmapped."""
+        response = self.client.indices.get_mapping(index=self.segments_index)
+        for body in getattr(response, "body", response).values():
+            vector = body.get("mappings", {}).get("properties", {}).get("vector")
+            if vector:
+                if vector.get("type") != "dense_vector":
+                    return vector.get("type")
+                return vector.get("element_type", "float")
+        return None
+
+    def _ensure_segments_mapping(self) -> None:
+        if self._segments_mapping_ready or self.client is None:
+            return
+        try:
+            if not self.client.indices.exists(index=self.segments_index):
+                self.client.indices.create(
+                    index=self.segments_index,
+                    mappings={"properties": self._quantized_vector_properties()},
+                )
+            else:
+                element_type = self._vector_element_type()
+                if element_type is None:
+                    # Otherwise the first int8 vector would be dynamically mapped as long.
+                    self.client.indices.put_mapping(
+                        index=self.segments_index, properties=self._quantized_vector_properties()
+                    )
+                elif element_type != "byte":
+                    logger.error(
+                        "Index %s maps 'vector' as %s, not a byte dense_vector; ignoring EMBEDDING_QUANTIZED "
+                        "and writing float vectors. Reindex into a byte-mapped index to enable quantization.",
+                        self.segments_index,
+                        element_type,
+                    )
+                    self._quantize_vectors = False
+            self._segments_mapping_ready = True
+        except Exception as exc:  # pragma: no cover - fallback path
+            # Left unset so the next chunk retries; vectors stay float until then.
+            logger.warning("Could not prepare the quantized vector mapping on %s: %s", self.segments_index, exc)
+
     def index_chunk(self, chunk: Dict[str, Any], document: Optional[Dict[str, Any]] = None) -> None:
         if self.client is None:
             self._memory_index.append(chunk)
             return
+        if self._quantize_vectors:
+            self._ensure_segments_mapping()
         payload = self._format_chunk_document(chunk, document)
         try:
             self.client.index(index=self.segments_index, id=chunk["chunk_id"], document=payload)
@@ -123,6 +386,7 @@ class SearchClient:
             self._memory_index.append(chunk)
 
     def index_document(self, document: Dict[str, Any]) -> None:
+        self._document_fields.pop(document.get("document_id"), None)
         if self.client is None:
             self._memory_index.append(document)
             return
@@ -146,8 +410,24 @@ class SearchClient:
         )
         return [hit["_source"] for hit in response["hits"]["hits"]]
 
+    def iter_search(self, query: str, top_k: int = 5) -> Iterator[Dict[str, Any]]:
+        """Like :meth:`search`, but the in-memory fallback yields hits as it finds them.
+
+        The Elasticsearch request is made before returning, so its errors surface
+        to the caller rather than midway through iteration.
+        """
+        if self.client is None:
+            return self._iter_memory_search(query, top_k)
+        return iter(self.search(query, top_k))
+
     def _memory_search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
-        hits: List[Dict[str, Any]] = []
+        return list(self._iter_memory_search(query, top_k))
+
+    def _iter_memory_search(self, query: str, top_k: int) -> Iterator[Dict[str, Any]]:
+        if top_k <= 0:
+            return
+        needle = query.lower()
+        found = 0
         for doc in self._memory_index:
             content = doc.get("content", {})
             text_blob = ""
@@ -155,11 +435,11 @@ class SearchClient:
                 text = content.get("text")
                 if isinstance(text, dict):
                     text_blob = text.get("full_text", "")
-            if query.lower() in text_blob.lower():
-                hits.append(doc)
-            if len(hits) >= top_k:
-                break
-        return hits
+            if needle in text_blob.lower():
+                yield doc
+                found += 1
+                if found >= top_k:
+                    return
 
 
 search_client = SearchClient()
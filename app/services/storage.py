@@ -1,26 +1,52 @@
 from __future__ import annotations
 
+import atexit
 import json
+import os
 import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from io import BytesIO
 from pathlib import Path
-from typing import Any, BinaryIO, Optional
+from typing import Any, BinaryIO, Optional, Set
 from urllib.parse import urlparse
 
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 
 from app.config import settings
 from app.logging_utils import get_pipeline_logger, log_timing
+from app.utils.ids import RAW_BY_ID_DIR, is_valid_task_id
+from app.utils.io_uring_writer import write_batch
 
 try:
     from minio import Minio
 except ImportError:  # pragma: no cover - optional dependency
     Minio = None  # type: ignore
 
+try:
+    import aiofiles
+except ImportError:  # pragma: no cover - optional dependency
+    aiofiles = None  # type: ignore
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None  # type: ignore
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
 logger = get_pipeline_logger("pipeline.storage")
 
 _minio_client: Optional[Any] = None
 _minio_bucket_ready = False
+_minio_lock = threading.Lock()
+_upload_executor: Optional[ThreadPoolExecutor] = None
+_upload_lock = threading.Lock()
+_pending_uploads: Set[Future] = set()
 
 
 def _relative_to_data_root(path: Path) -> Optional[str]:
@@ -42,6 +68,24 @@ def _minio_endpoint_parts(endpoint: str) -> tuple[str, bool]:
     return host, secure
 
 
+def _minio_http_client() -> Optional[Any]:
+    """Connection pool sized for the upload workers (minio's default holds 10)."""
+
+    try:
+        import certifi
+        import urllib3
+    except ImportError:  # pragma: no cover - both ship with minio
+        return None
+    timeout = 300  # minio's default connect/read timeout
+    return urllib3.PoolManager(
+        maxsize=max(10, settings.minio_upload_workers),
+        timeout=urllib3.Timeout(connect=timeout, read=timeout),
+        cert_reqs="CERT_REQUIRED",
+        ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+        retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+    )
+
+
 def _get_minio_client() -> Optional[Any]:
     global _minio_client  # pylint: disable=global-statement
     if not settings.minio_enabled:
@@ -55,18 +99,22 @@ def _get_minio_client() -> Optional[Any]:
         return None
     if _minio_client is not None:
         return _minio_client
-    host, secure = _minio_endpoint_parts(settings.minio_endpoint)
-    try:
-        _minio_client = Minio(
-            host,
-            access_key=settings.minio_access_key,
-            secret_key=settings.minio_secret_key,
-            secure=secure,
-        )
-        logger.info("Initialized MinIO client for %s (secure=%s)", host, secure)
-    except Exception as exc:  # pragma: no cover - network failure
-        logger.error("Failed to initialize MinIO client: %s", exc)
-        _minio_client = None
+    with _minio_lock:
+        if _minio_client is not None:
+            return _minio_client
+        host, secure = _minio_endpoint_parts(settings.minio_endpoint)
+        try:
+            _minio_client = Minio(
+                host,
+                access_key=settings.minio_access_key,
+                secret_key=settings.minio_secret_key,
+                secure=secure,
+                http_client=_minio_http_client(),
+            )
+            logger.info("Initialized MinIO client for %s (secure=%s)", host, secure)
+        except Exception as exc:  # pragma: no cover - network failure
+            logger.error("Failed to initialize MinIO client: %s", exc)
+            _minio_client = None
     return _minio_client
 
 
@@ -74,18 +122,25 @@ def _ensure_bucket(client: Any) -> bool:
     global _minio_bucket_ready  # pylint: disable=global-statement
     if _minio_bucket_ready:
         return True
+    if settings.minio_assume_bucket_exists:
+        _minio_bucket_ready = True
+        return True
     bucket = settings.minio_bucket
-    try:
-        if client.bucket_exists(bucket):
+    # One bucket check per process, even when many artifacts sync at once.
+    with _minio_lock:
+        if _minio_bucket_ready:
+            return True
+        try:
+            if client.bucket_exists(bucket):
+                _minio_bucket_ready = True
+                return True
+            client.make_bucket(bucket)
             _minio_bucket_ready = True
+            logger.info("Created MinIO bucket %s", bucket)
             return True
-        client.make_bucket(bucket)
-        _minio_bucket_ready = True
-        logger.info("Created MinIO bucket %s", bucket)
-        return True
-    except Exception as exc:  # pragma: no cover - network failure
-        logger.error("Failed to ensure MinIO bucket %s: %s", bucket, exc)
-        return False
+        except Exception as exc:  # pragma: no cover - network failure
+            logger.error("Failed to ensure MinIO bucket %s: %s", bucket, exc)
+            return False
 
 
 def _object_name_for(path: Path, fallback_prefix: str) -> str:
@@ -96,6 +151,24 @@ def _object_name_for(path: Path, fallback_prefix: str) -> str:
     return f"{prefix}/{path.name}" if prefix else path.name
 
 
+def _upload_to_minio(client: Any, local_path: Path, object_name: str) -> None:
+    try:
+        client.fput_object(settings.minio_bucket, object_name, str(local_path))
+        logger.info("Synced %s to MinIO as %s", local_path, object_name)
+    except Exception as exc:  # pragma: no cover - network failure
+        logger.warning("Failed to sync %s to MinIO: %s", local_path, exc)
+
+
+def _get_upload_executor() -> ThreadPoolExecutor:
+    global _upload_executor  # pylint: disable=global-statement
+    if _upload_executor is None:
+        _upload_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.minio_upload_workers),
+            thread_name_prefix="minio-upload",
+        )
+    return _upload_executor
+
+
 def _sync_to_minio(local_path: Path, fallback_prefix: str) -> None:
     client = _get_minio_client()
     if client is None:
@@ -103,11 +176,72 @@ def _sync_to_minio(local_path: Path, fallback_prefix: str) -> None:
     if not _ensure_bucket(client):
         return
     object_name = _object_name_for(local_path, fallback_prefix)
-    try:
-        client.fput_object(settings.minio_bucket, object_name, str(local_path))
-        logger.info("Synced %s to MinIO as %s", local_path, object_name)
-    except Exception as exc:  # pragma: no cover - network failure
-        logger.warning("Failed to sync %s to MinIO: %s", local_path, exc)
+    with _upload_lock:
+        future = _get_upload_executor().submit(_upload_to_minio, client, local_path, object_name)
+        _pending_uploads.add(future)
+    future.add_done_callback(_forget_upload)
+
+
+def _forget_upload(future: Future) -> None:
+    with _upload_lock:
+        _pending_uploads.discard(future)
+
+
+def flush_minio_uploads(timeout: Optional[float] = None) -> None:
+    """Block until queued MinIO uploads have finished (or ``timeout`` elapses)."""
+
+    with _upload_lock:
+        pending = list(_pending_uploads)
+    if not pending:
+        return
+    logger.info("Waiting for %d pending MinIO uploads", len(pending))
+    _, not_done = wait(pending, timeout=timeout)
+    if not_done:
+        logger.warning("%d MinIO uploads still pending after flush timeout", len(not_done))
+
+
+def _reset_upload_state_after_fork() -> None:
+    global _upload_executor, _upload_lock, _minio_client, _minio_lock  # pylint: disable=global-statement
+    _upload_executor = None
+    _upload_lock = threading.Lock()
+    # Pooled connections must not be shared with the parent process.
+    _minio_client = None
+    _minio_lock = threading.Lock()
+    _pending_uploads.clear()
+
+
+atexit.register(flush_minio_uploads)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_upload_state_after_fork)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Path):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dump_json_bytes(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(
+            payload,
+            default=_json_default,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+    return json.dumps(payload, ensure_ascii=False, indent=2, default=_json_default).encode("utf-8")
+
+
+def _write_json(target: Path, payload: Any) -> None:
+    """Serialize ``payload`` straight into ``target`` without an intermediate str."""
+
+    if orjson is not None:
+        with target.open("wb") as handle:
+            handle.write(_dump_json_bytes(payload))
+        return
+    with target.open("w", encoding="utf-8", buffering=settings.raw_copy_buffer_bytes) as handle:
+        json.dump(payload, handle, ensure_ascii=False, indent=2, default=_json_default)
 
 
 def _ensure_dir(path: Path) -> Path:
@@ -124,26 +258,123 @@ def sync_artifact(local_path: Path, fallback_prefix: str = "intermediate") -> No
     _sync_to_minio(local_path, fallback_prefix)
 
 
-def save_raw_upload(upload: UploadFile, document_id: str) -> Path:
-    """Persist the original user upload to raw storage."""
+def _kernel_copy(src_fd: int, dst_fd: int, size: int) -> None:
+    remaining = size
+    if hasattr(os, "copy_file_range"):
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(src_fd, dst_fd, remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            # Cross-device copies or filesystems without support; continue
+            # from the current offsets with sendfile.
+            pass
+    while remaining > 0:
+        copied = os.sendfile(dst_fd, src_fd, None, remaining)
+        if copied == 0:
+            break
+        remaining -= copied
+    if remaining > 0:
+        raise OSError(f"short copy: {remaining} bytes not copied")
+
+
+def _fast_copy(src: Path, dst: Path) -> None:
+    """Copy ``src`` to ``dst`` in the kernel where possible.
+
+    Uses ``copy_file_range`` (reflink/CoW on XFS and Btrfs) and falls back to
+    ``sendfile`` and finally ``shutil.copy``.
+    """
+
+    if not hasattr(os, "copy_file_range") and not hasattr(os, "sendfile"):
+        shutil.copy(src, dst)
+        return
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            _kernel_copy(fsrc.fileno(), fdst.fileno(), os.fstat(fsrc.fileno()).st_size)
+        shutil.copymode(src, dst)
+    except OSError as exc:
+        logger.debug("Kernel copy of %s failed (%s); falling back to shutil.copy", src, exc)
+        shutil.copy(src, dst)
+
+
+def _copy_stream(source: BinaryIO, destination: Path) -> None:
+    with destination.open("wb", buffering=settings.raw_copy_buffer_bytes) as buffer:
+        shutil.copyfileobj(source, buffer, length=settings.raw_copy_buffer_bytes)
+
 
-    destination = _ensure_dir(settings.raw_storage_dir) / f"{document_id}_{upload.filename}"
+async def save_raw_upload(upload: UploadFile, document_id: str) -> Path:
+    """Persist the original user upload to raw storage without blocking the event loop."""
+
+    # Only the final component of the client's file name; it may carry directories.
+    destination = _ensure_dir(settings.raw_storage_dir) / f"{document_id}_{Path(upload.filename or 'upload').name}"
+    chunk_size = settings.raw_copy_buffer_bytes
     with log_timing(logger, f"Saving raw upload for {document_id}"):
-        with destination.open("wb") as buffer:
-            shutil.copyfileobj(upload.file, buffer)
-    upload.file.seek(0)
+        if aiofiles is not None:
+            async with aiofiles.open(destination, "wb") as buffer:
+                while chunk := await upload.read(chunk_size):
+                    await buffer.write(chunk)
+        else:
+            await run_in_threadpool(_copy_stream, upload.file, destination)
+    await upload.seek(0)
     logger.info("Stored raw upload for %s at %s", document_id, destination)
+    _link_raw_by_id(destination, document_id)
     _sync_to_minio(destination, "raw")
     return destination
 
 
+def _link_raw_by_id(destination: Path, document_id: str) -> None:
+    """Point ``raw/by_id/{document_id}{suffix}`` at ``destination`` so lookups skip a directory scan."""
+
+    # An existing link is unlinked and replaced, so the id must not be able to leave by_id.
+    if not is_valid_task_id(document_id):
+        logger.warning("Not linking raw file for unsafe document id %r", document_id)
+        return
+    link = _ensure_dir(destination.parent / RAW_BY_ID_DIR) / f"{document_id}{destination.suffix}"
+    try:
+        link.unlink(missing_ok=True)
+        os.symlink(os.path.join(os.pardir, destination.name), link)
+    except OSError as exc:
+        # Lookups fall back to globbing the raw directory.
+        logger.debug("Cannot link %s to %s: %s", link, destination, exc)
+
+
+def _place_raw_file(src_path: Path, destination: Path) -> str:
+    """Materialize ``src_path`` at ``destination`` per RAW_STORAGE_MODE; return the mode used."""
+
+    mode = (settings.raw_storage_mode or "copy").lower()
+    if os.path.realpath(src_path) == os.path.realpath(destination):
+        # Re-ingesting the raw file itself; unlinking or rewriting it would destroy the source.
+        return "in-place"
+    # Always replace rather than overwrite: an earlier RAW_STORAGE_MODE=link ingest
+    # may have left ``destination`` hardlinked to ``src_path``, and opening it for
+    # writing would truncate the source too.
+    destination.unlink(missing_ok=True)
+    if mode in {"link", "move"}:
+        try:
+            if mode == "link":
+                os.link(src_path, destination)
+            else:
+                os.replace(src_path, destination)
+            return mode
+        except OSError as exc:
+            # EXDEV (different filesystem) or no hardlink support: copy instead.
+            logger.debug("Cannot %s %s to %s (%s); copying instead", mode, src_path, destination, exc)
+    _fast_copy(src_path, destination)
+    if mode == "move":
+        src_path.unlink(missing_ok=True)
+    return "copy"
+
+
 def save_raw_path(src_path: Path, document_id: str) -> Path:
-    """Copy an existing file into raw storage."""
+    """Copy (or hardlink/move, see ``RAW_STORAGE_MODE``) an existing file into raw storage."""
 
     destination = _ensure_dir(settings.raw_storage_dir) / f"{document_id}_{src_path.name}"
     with log_timing(logger, f"Copying raw file for {document_id}"):
-        shutil.copy(src_path, destination)
-    logger.info("Copied raw path for %s from %s to %s", document_id, src_path, destination)
+        mode = _place_raw_file(src_path, destination)
+    logger.info("Stored raw path for %s from %s to %s (mode=%s)", document_id, src_path, destination, mode)
+    _link_raw_by_id(destination, document_id)
     _sync_to_minio(destination, "raw")
     return destination
 
@@ -152,8 +383,10 @@ def persist_intermediate(content: BinaryIO, target_dir: Path, file_name: str) ->
     target_dir = _ensure_dir(target_dir)
     target_path = target_dir / file_name
     with log_timing(logger, f"Persisting intermediate artifact {file_name}"):
-        with target_path.open("wb") as buffer:
-            shutil.copyfileobj(content, buffer)
+        if isinstance(content, BytesIO):
+            write_batch([(target_path, content.read())])
+        else:
+            _copy_stream(content, target_path)
     logger.debug("Persisted intermediate artifact %s", target_path)
     prefix = _relative_to_data_root(target_dir) or "intermediate"
     sync_artifact(target_path, prefix)
@@ -166,7 +399,7 @@ def persist_json(document_id: str, payload: dict) -> Path:
     final_dir = _ensure_dir(settings.final_instances_dir)
     target = final_dir / f"{document_id}.json"
     with log_timing(logger, f"Persisting final JSON for {document_id}"):
-        target.write_text(json.dumps(payload, ensure_ascii=False, indent=2))
+        _write_json(target, payload)
     logger.info("Persisted final schema artifact for %s at %s", document_id, target)
     _sync_to_minio(target, "final_instances")
     return target
@@ -182,6 +415,31 @@ def persist_auxiliary_json(document_id: str, payload: dict, category: str = "min
     return persist_intermediate(buffer, target_dir, f"{document_id}.json")
 
 
+def persist_intermediate_obj(obj: Any, target_dir: Path, name: str) -> Path:
+    """Persist a machine-only intermediate object as ``<name>.msgpack``.
+
+    Falls back to ``<name>.json`` when msgpack is not installed. Read it back
+    with :func:`load_intermediate_obj`.
+    """
+
+    if msgpack is None:
+        data, suffix = _dump_json_bytes(obj), ".json"
+    else:
+        data, suffix = msgpack.packb(obj, use_bin_type=True, default=_json_default), ".msgpack"
+    return persist_intermediate(BytesIO(data), target_dir, f"{name}{suffix}")
+
+
+def load_intermediate_obj(path: Path) -> Any:
+    """Load an intermediate object written by :func:`persist_intermediate_obj` (or plain JSON)."""
+
+    raw = Path(path).read_bytes()
+    if Path(path).suffix == ".msgpack":
+        if msgpack is None:
+            raise RuntimeError(f"msgpack is required to read {path}")
+        return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
 def persist_auxiliary_bytes(
     document_id: str,
     content: bytes,
@@ -2,12 +2,32 @@
 from __future__ import annotations
 
 import hashlib
-import random
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Sequence
+from typing import Any, Dict, List, Sequence, Tuple
 
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None  # type: ignore
+
+try:
+    import h2  # noqa: F401  # enables HTTP/2 in httpx
+    _HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    _HTTP2_AVAILABLE = False
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover - optional dependency
+    xxhash = None  # type: ignore
 
 from app.config import settings
 from app.logging_utils import get_pipeline_logger
@@ -15,6 +35,9 @@ from app.services.bailian import bailian_client
 
 logger = get_pipeline_logger("pipeline.vector")
 
+# Errors raised by ``raise_for_status`` of whichever HTTP client is in use.
+_HTTP_STATUS_ERRORS: Tuple[type, ...] = (requests.HTTPError,) + ((httpx.HTTPStatusError,) if httpx else ())
+
 
 @dataclass
 class VectorServiceConfig:
@@ -22,20 +45,28 @@ class VectorServiceConfig:
     dimension: int = settings.embedding_dimension
     ollama_url: str = settings.ollama_base_url.rstrip("/")
     ollama_timeout: int = settings.ollama_timeout
+    ollama_concurrency: int = settings.ollama_concurrency
+    ollama_batch_size: int = 64
     max_retries: int = 2
     deterministic_seed_bytes: int = 16
+    cache_size: int = 50_000
 
 
 class VectorService:
     def __init__(self, config: VectorServiceConfig) -> None:
         self.config = config
         self.provider = self._normalize_provider(config.provider)
-        self._session = requests.Session()
+        self._session = self._build_session(config)
+        self._executor: ThreadPoolExecutor | None = None
+        self._ollama_batch_supported = True
         self._metrics: Dict[str, Any] = {
             "requests": 0,
             "provider_failures": 0,
             "fallback_vectors": 0,
+            "cache_hits": 0,
         }
+        self._cache: "OrderedDict[Tuple[str, str, bytes], Tuple[float, ...]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
 
     # ------------------------- Public API -------------------------
     @property
@@ -53,10 +84,23 @@ class VectorService:
         self._metrics["requests"] += 1
         start = time.time()
         try:
-            vectors = self._dispatch_provider(texts)
-            if not vectors or any(len(vec) == 0 for vec in vectors):
-                raise RuntimeError("Provider returned empty vectors")
-            return [self._normalize_vector(vec) for vec in vectors]
+            resolved: Dict[str, Tuple[float, ...]] = {}
+            misses: List[str] = []
+            for text in dict.fromkeys(texts):
+                cached = self._cache_get(text)
+                if cached is None:
+                    misses.append(text)
+                else:
+                    resolved[text] = cached
+            self._metrics["cache_hits"] += len(resolved)
+            if misses:
+                vectors = self._dispatch_provider(misses)
+                if len(vectors) != len(misses) or any(len(vec) == 0 for vec in vectors):
+                    raise RuntimeError("Provider returned empty vectors")
+                for text, vec in zip(misses, vectors):
+                    resolved[text] = tuple(self._normalize_vector(vec))
+                    self._cache_put(text, resolved[text])
+            return [list(resolved[text]) for text in texts]
         except Exception as exc:  # pragma: no cover - network optional
             self._metrics["provider_failures"] += 1
             logger.warning("Vector provider %s failed: %s", self.provider, exc)
@@ -81,6 +125,45 @@ class VectorService:
         }
 
     # ------------------------- Internals -------------------------
+    @staticmethod
+    def _build_session(config: VectorServiceConfig) -> Any:
+        pool_size = max(16, config.ollama_concurrency)
+        if httpx is not None:
+            # HTTP/2 multiplexes the concurrent embedding calls over few
+            # connections when the endpoint speaks TLS; plain http stays on 1.1.
+            return httpx.Client(
+                http2=_HTTP2_AVAILABLE,
+                timeout=config.ollama_timeout,
+                limits=httpx.Limits(max_connections=max(32, pool_size), max_keepalive_connections=pool_size),
+            )
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _cache_key(self, text: str) -> Tuple[str, str, bytes]:
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        return self.provider, self.model_name, digest
+
+    def _cache_get(self, text: str) -> Tuple[float, ...] | None:
+        key = self._cache_key(text)
+        with self._cache_lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+            return vector
+
+    def _cache_put(self, text: str, vector: Tuple[float, ...]) -> None:
+        if self.config.cache_size <= 0:
+            return
+        key = self._cache_key(text)
+        with self._cache_lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.config.cache_size:
+                self._cache.popitem(last=False)
+
     def _dispatch_provider(self, texts: Sequence[str]) -> List[List[float]]:
         retries = max(0, self.config.max_retries)
         last_exc: Exception | None = None
@@ -105,31 +188,84 @@ class VectorService:
             raise last_exc
         return []
 
-    def _embed_via_ollama(self, texts: Sequence[str]) -> List[List[float]]:
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, self.config.ollama_concurrency),
+                thread_name_prefix="ollama-embed",
+            )
+        return self._executor
+
+    def _embed_one_via_ollama(self, text: str) -> List[float]:
         url = f"{self.config.ollama_url}/api/embeddings"
-        vectors: List[List[float]] = []
-        for text in texts:
-            payload = {"model": settings.ollama_embedding_model, "prompt": text}
-            response = self._session.post(url, json=payload, timeout=self.config.ollama_timeout)
-            response.raise_for_status()
-            data = response.json()
-            vectors.append(data.get("embedding", []))
-        return vectors
+        payload = {"model": settings.ollama_embedding_model, "prompt": text}
+        response = self._session.post(url, json=payload, timeout=self.config.ollama_timeout)
+        response.raise_for_status()
+        data = response.json()
+        return data.get("embedding", [])
+
+    def _embed_batch_via_ollama(self, texts: Sequence[str]) -> List[List[float]]:
+        url = f"{self.config.ollama_url}/api/embed"
+        payload = {"model": settings.ollama_embedding_model, "input": list(texts)}
+        timeout = self.config.ollama_timeout * max(1, len(texts) // 32)
+        response = self._session.post(url, json=payload, timeout=timeout)
+        response.raise_for_status()
+        embeddings = response.json().get("embeddings") or []
+        if len(embeddings) != len(texts):
+            raise RuntimeError(f"Ollama returned {len(embeddings)} embeddings for {len(texts)} inputs")
+        return embeddings
+
+    @staticmethod
+    def _is_missing_route(response: Any) -> bool:
+        """True for a 404 meaning the endpoint does not exist, not e.g. an unpulled model.
+
+        Ollama answers unknown routes with a plain-text "404 page not found", while
+        API errors such as ``model "x" not found`` come back as ``{"error": ...}``.
+        """
+        if response is None or response.status_code != 404:
+            return False
+        try:
+            body = response.json()
+        except ValueError:
+            return True
+        return not (isinstance(body, dict) and "error" in body)
+
+    def _embed_via_ollama(self, texts: Sequence[str]) -> List[List[float]]:
+        if self._ollama_batch_supported:
+            size = max(1, self.config.ollama_batch_size)
+            batches = [texts[idx : idx + size] for idx in range(0, len(texts), size)]
+            try:
+                if len(batches) == 1:
+                    return self._embed_batch_via_ollama(batches[0])
+                # executor.map preserves input order and re-raises the first worker error.
+                results = self._get_executor().map(self._embed_batch_via_ollama, batches)
+                return [vector for batch in results for vector in batch]
+            except _HTTP_STATUS_ERRORS as exc:
+                if not self._is_missing_route(exc.response):
+                    raise
+                # Ollama < 0.3 only exposes the single-prompt /api/embeddings endpoint.
+                logger.info("Ollama /api/embed unavailable, falling back to per-text requests")
+                self._ollama_batch_supported = False
+        if len(texts) <= 1 or self.config.ollama_concurrency <= 1:
+            return [self._embed_one_via_ollama(text) for text in texts]
+        return list(self._get_executor().map(self._embed_one_via_ollama, texts))
 
     def _normalize_vector(self, vector: Sequence[float]) -> List[float]:
-        vec = list(vector)
+        arr = np.asarray(vector, dtype=np.float32)
         dim = self.config.dimension
-        if len(vec) > dim:
-            return vec[:dim]
-        if len(vec) < dim:
-            vec.extend([0.0] * (dim - len(vec)))
-        return vec
+        if arr.size >= dim:
+            return arr[:dim].tolist()
+        return np.pad(arr, (0, dim - arr.size)).tolist()
 
     def _fallback_vector(self, text: str) -> List[float]:
-        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
-        seed = int(digest[: self.config.deterministic_seed_bytes], 16)
-        rnd = random.Random(seed)
-        return [rnd.uniform(-1, 1) for _ in range(self.config.dimension)]
+        encoded = text.encode("utf-8")
+        if xxhash is not None:
+            seed = xxhash.xxh128(encoded).intdigest()
+        else:
+            digest = hashlib.blake2b(encoded, digest_size=self.config.deterministic_seed_bytes).digest()
+            seed = int.from_bytes(digest, "big")
+        rng = np.random.Generator(np.random.PCG64(seed))
+        return rng.uniform(-1.0, 1.0, size=self.config.dimension).astype(np.float32).tolist()
 
     @staticmethod
     def _normalize_provider(provider: str) -> str:
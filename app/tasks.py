@@ -1,12 +1,33 @@
 from __future__ import annotations
 
+import json
 import threading
-from dataclasses import dataclass
-from typing import Dict, Optional
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
 
 from celery.result import AsyncResult
 
 from app.celery_app import celery_app
+from app.config import settings
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None  # type: ignore
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
+# Celery states (lower-cased) after which a task never changes again.
+_TERMINAL_STATES = frozenset({"success", "failure", "revoked"})
+# How long a polled Celery state is reused before asking the backend again.
+_STATE_TTL_SECONDS = 0.25
+# Upload fingerprints remembered by the in-process store (Redis expires its own).
+_CONTENT_INDEX_SIZE = 4096
 
 
 @dataclass
@@ -15,41 +36,76 @@ class TaskRecord:
     detail: Optional[str] = None
     result: Optional[dict] = None
     celery_id: Optional[str] = None
+    final: bool = False
+    # Wall-clock time of the last state change; drives the /tasks ETag.
+    updated_at: float = 0.0
+    # ``result`` serialized once for /tasks/{id}/result; reset whenever it changes.
+    result_json: Optional[bytes] = field(default=None, repr=False, compare=False)
+
+    @property
+    def done(self) -> bool:
+        return self.final or self.status in _TERMINAL_STATES
+
+
+def _dump_result(result: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(result, default=str)
+    return json.dumps(result, ensure_ascii=False, default=str).encode("utf-8")
 
 
 class TaskStore:
+    """In-process task registry; only visible to the API worker that created the task."""
+
     def __init__(self) -> None:
         self._lock = threading.Lock()
         self._tasks: Dict[str, TaskRecord] = {}
+        self._poll_deadlines: Dict[str, float] = {}
+        self._content_index: "OrderedDict[str, str]" = OrderedDict()
+
+    def _load(self, task_id: str) -> Optional[TaskRecord]:
+        return self._tasks.get(task_id)
+
+    def _save(self, task_id: str, record: TaskRecord) -> None:
+        self._tasks[task_id] = record
 
     def create(self, task_id: str) -> None:
         with self._lock:
-            self._tasks[task_id] = TaskRecord(status="pending")
+            self._save(task_id, TaskRecord(status="pending", updated_at=time.time()))
 
     def attach_celery(self, task_id: str, celery_id: str) -> None:
         with self._lock:
-            record = self._tasks.get(task_id)
+            record = self._load(task_id)
             if record is None:
                 record = TaskRecord(status="pending")
-                self._tasks[task_id] = record
             record.celery_id = celery_id
+            record.final = False
+            record.updated_at = time.time()
+            self._save(task_id, record)
 
     def update(self, task_id: str, status: str, detail: Optional[str] = None, result: Optional[dict] = None) -> None:
         with self._lock:
-            record = self._tasks.get(task_id)
+            record = self._load(task_id)
             if record is None:
                 record = TaskRecord(status=status)
-                self._tasks[task_id] = record
             record.status = status
             record.detail = detail
             record.result = result
+            record.result_json = None
+            record.updated_at = time.time()
+            self._save(task_id, record)
 
     def get(self, task_id: str) -> Optional[TaskRecord]:
-        with self._lock:
-            record = self._tasks.get(task_id)
-        if record is None or not record.celery_id:
+        # Reads need no lock: dict lookups are atomic and records are only
+        # ever replaced, never removed.
+        record = self._load(task_id)
+        if record is None or not record.celery_id or record.final:
+            return record
+        now = time.monotonic()
+        if self._poll_deadlines.get(record.celery_id, 0.0) > now:
             return record
+        self._poll_deadlines[record.celery_id] = now + _STATE_TTL_SECONDS
         async_result = AsyncResult(record.celery_id, app=celery_app)
+        previous_status = record.status
         record.status = async_result.state.lower()
         if async_result.failed():
             record.detail = str(async_result.info)
@@ -60,10 +116,137 @@ class TaskStore:
                 record.result = payload
             else:
                 record.result = {"data": payload}
+            record.result_json = None
             record.detail = None
-        with self._lock:
-            self._tasks[task_id] = record
+        if record.status in _TERMINAL_STATES:
+            record.final = True
+            self._poll_deadlines.pop(record.celery_id, None)
+        if record.status != previous_status or record.final:
+            record.updated_at = time.time()
+            return self._save_polled(task_id, record)
+        return record
+
+    def _save_polled(self, task_id: str, record: TaskRecord) -> TaskRecord:
+        """Persist a state change observed by :meth:`get`; return the record to hand out."""
+        self._save(task_id, record)
         return record
 
+    def remember_content(self, content_hash: str, task_id: str) -> None:
+        """Record which task ingested the upload fingerprinted as ``content_hash``."""
+        with self._lock:
+            self._content_index[content_hash] = task_id
+            self._content_index.move_to_end(content_hash)
+            while len(self._content_index) > _CONTENT_INDEX_SIZE:
+                self._content_index.popitem(last=False)
+
+    def find_by_content(self, content_hash: str) -> Optional[str]:
+        with self._lock:
+            task_id = self._content_index.get(content_hash)
+            if task_id is not None:
+                self._content_index.move_to_end(content_hash)
+            return task_id
+
+    def get_result_json(self, task_id: str) -> Optional[bytes]:
+        """Return the task result as JSON bytes, serializing it at most once per change."""
+        record = self.get(task_id)
+        if record is None or record.result is None:
+            return None
+        if record.result_json is None:
+            record.result_json = _dump_result(record.result)
+        return record.result_json
+
+
+# Writes the given field/value pairs unless the task was already finalized, so a
+# poller holding a stale state can never overwrite another worker's final result.
+# KEYS[1] = task hash; ARGV[1] = ttl seconds, ARGV[2..] = field, value, ...
+_SAVE_UNLESS_FINAL = """
+if redis.call('HGET', KEYS[1], 'final') == '1' then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+class RedisTaskStore(TaskStore):
+    """Task registry shared by every API worker through Redis hashes."""
+
+    def __init__(self, url: str, ttl_seconds: int) -> None:
+        super().__init__()
+        self._ttl_seconds = ttl_seconds
+        pool = redis.ConnectionPool.from_url(url, max_connections=64)
+        self._redis = redis.Redis(connection_pool=pool)
+        self._save_unless_final = self._redis.register_script(_SAVE_UNLESS_FINAL)
+
+    @staticmethod
+    def _key(task_id: str) -> str:
+        return f"pipeline:task:{task_id}"
+
+    def _load(self, task_id: str) -> Optional[TaskRecord]:
+        data = self._redis.hgetall(self._key(task_id))
+        if not data:
+            return None
+        fields = {key.decode(): value.decode("utf-8") for key, value in data.items()}
+        result = fields.get("result")
+        return TaskRecord(
+            status=fields.get("status") or "pending",
+            detail=fields.get("detail") or None,
+            result=(orjson.loads(result) if orjson is not None else json.loads(result)) if result else None,
+            celery_id=fields.get("celery_id") or None,
+            final=fields.get("final") == "1",
+            updated_at=float(fields.get("updated_at") or 0.0),
+        )
+
+    def _save(self, task_id: str, record: TaskRecord) -> None:
+        result = _dump_result(record.result) if record.result is not None else b""
+        key = self._key(task_id)
+        # Redis hashes cannot hold None; empty strings round-trip back to None.
+        mapping: Dict[str, Any] = {
+            "status": record.status,
+            "detail": record.detail or "",
+            "result": result,
+            "celery_id": record.celery_id or "",
+            "final": "1" if record.final else "0",
+            "updated_at": repr(record.updated_at),
+        }
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, self._ttl_seconds)
+        pipe.execute()
+
+    def _save_polled(self, task_id: str, record: TaskRecord) -> TaskRecord:
+        # Only the fields a poll can change; the result is written once, with final.
+        fields: list = ["status", record.status, "detail", record.detail or "", "updated_at", repr(record.updated_at)]
+        if record.final:
+            result = _dump_result(record.result) if record.result is not None else b""
+            fields += ["result", result, "final", "1"]
+        if self._save_unless_final(keys=[self._key(task_id)], args=[self._ttl_seconds, *fields]):
+            return record
+        # Another worker finalized the task first; its copy is authoritative.
+        return self._load(task_id) or record
+
+    def remember_content(self, content_hash: str, task_id: str) -> None:
+        self._redis.set(f"pipeline:content:{content_hash}", task_id, ex=self._ttl_seconds)
+
+    def find_by_content(self, content_hash: str) -> Optional[str]:
+        task_id = self._redis.get(f"pipeline:content:{content_hash}")
+        return task_id.decode() if task_id else None
+
+    def get_result_json(self, task_id: str) -> Optional[bytes]:
+        # The hash already holds the serialized result; hand it out without decoding.
+        final, result = self._redis.hmget(self._key(task_id), "final", "result")
+        if final != b"1":
+            if self.get(task_id) is None:
+                return None
+            result = self._redis.hget(self._key(task_id), "result")
+        return result or None
+
+
+def _build_task_store() -> TaskStore:
+    if settings.task_store_redis_url and redis is not None:
+        return RedisTaskStore(settings.task_store_redis_url, settings.task_store_ttl_seconds)
+    return TaskStore()
+
 
-task_store = TaskStore()
+task_store = _build_task_store()
@@ -1,80 +1,158 @@
 # Copyright (c) Opendatalab. All rights reserved.
 # Adapted from MinerU: https://github.com/opendatalab/MinerU
 
+import hashlib
 import json
 import logging
+import threading
+from collections import OrderedDict
 from io import BytesIO
 from pathlib import Path
 
-from pypdf import PdfReader, PdfWriter, PageObject
+import numpy as np
+from pypdf import PdfReader, PdfWriter
 from reportlab.pdfgen import canvas
 
+from app.config import settings
+from app.utils.io_uring_writer import write_batch
+
+try:
+    import pymupdf
+except ImportError:  # pragma: no cover - optional dependency
+    pymupdf = None  # type: ignore
+
 logger = logging.getLogger(__name__)
 
+# Overlay colors per layout category, as reportlab 0-1 RGB floats
+PALETTE = {
+    "table_body": (204 / 255, 204 / 255, 0.0),
+    "table_caption": (1.0, 1.0, 102 / 255),
+    "table_footnote": (229 / 255, 1.0, 204 / 255),
+    "image_body": (153 / 255, 1.0, 51 / 255),
+    "image_caption": (102 / 255, 178 / 255, 1.0),
+    "image_footnote": (1.0, 178 / 255, 102 / 255),
+    "title": (102 / 255, 102 / 255, 1.0),
+    "text": (153 / 255, 0.0, 76 / 255),
+    "interline_equation": (0.0, 1.0, 0.0),
+    "list": (40 / 255, 169 / 255, 92 / 255),
+    "list_item": (40 / 255, 169 / 255, 92 / 255),
+    "reading_order": (1.0, 0.0, 0.0),
+}
 
-def cal_canvas_rect(page, bbox):
-    """Calculate rectangle coordinates on canvas"""
-    page_width, page_height = float(page.cropbox[2]), float(page.cropbox[3])
-    
-    actual_width = page_width
-    actual_height = page_height
-    
+# Position of the reading-order label relative to its rect, per page rotation
+ROTATION_OFFSETS = {
+    0: lambda rect: (rect[0] + rect[2] + 2, rect[1] + rect[3] - 10),
+    90: lambda rect: (rect[0] + 10, rect[1] + rect[3] + 2),
+    180: lambda rect: (rect[0] - 2, rect[1] + 10),
+    270: lambda rect: (rect[0] + rect[2] - 10, rect[1] - 2),
+}
+
+# (bbox group, PALETTE key, filled) in drawing order: tables, images, text elements
+_OVERLAY_LAYERS = (
+    ("tables_body", "table_body", True),
+    ("tables_caption", "table_caption", True),
+    ("tables_footnote", "table_footnote", True),
+    ("imgs_body", "image_body", True),
+    ("imgs_caption", "image_caption", True),
+    ("imgs_footnote", "image_footnote", True),
+    ("titles", "title", True),
+    ("texts", "text", True),
+    ("interequations", "interline_equation", True),
+    ("lists", "list", True),
+    ("list_items", "list_item", False),
+)
+
+_READER_CACHE_SIZE = 8
+_reader_cache = OrderedDict()
+_reader_cache_lock = threading.Lock()
+
+
+def _page_rotation(page):
+    """Return the page's /Rotate value normalised to 0-359."""
     rotation_obj = page.get("/Rotate", 0)
     try:
-        rotation = int(rotation_obj) % 360
+        return int(rotation_obj) % 360
     except (ValueError, TypeError) as e:
         logger.warning(f"Invalid /Rotate value {rotation_obj!r}; defaulting to 0. Error: {e}")
-        rotation = 0
-    
-    if rotation in [90, 270]:
-        actual_width, actual_height = actual_height, actual_width
-        
-    x0, y0, x1, y1 = bbox
-    rect_w = abs(x1 - x0)
-    rect_h = abs(y1 - y0)
-    
+        return 0
+
+
+def _transform_rects(bboxes, page_width, page_height, rotation):
+    """Convert an (N, 4) array of ``x0, y0, x1, y1`` bboxes into canvas rects.
+
+    Returns an (N, 4) array of ``x, y, w, h`` in PDF user space.
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    x0, y0, x1, y1 = bboxes.T
+    rect_w = np.abs(x1 - x0)
+    rect_h = np.abs(y1 - y0)
+
     if rotation == 270:
-        rect_w, rect_h = rect_h, rect_w
-        x0 = actual_height - y1
-        y0 = actual_width - x1
-    elif rotation == 180:
-        x0 = page_width - x1
-    elif rotation == 90:
-        rect_w, rect_h = rect_h, rect_w
-        x0, y0 = y0, x0 
-    else:
-        # rotation == 0
-        y0 = page_height - y1
-    
-    rect = [x0, y0, rect_w, rect_h]
-    return rect
+        # actual width/height are swapped for 90/270 degree pages
+        return np.column_stack((page_width - y1, page_height - x1, rect_h, rect_w))
+    if rotation == 180:
+        return np.column_stack((page_width - x1, y0, rect_w, rect_h))
+    if rotation == 90:
+        return np.column_stack((y0, x0, rect_h, rect_w))
+    # rotation == 0
+    return np.column_stack((x0, page_height - y1, rect_w, rect_h))
+
+
+def _rects_for_page(page, bboxes):
+    """Canvas rects for all ``bboxes`` of a pypdf page.
+
+    Page size and rotation are read once per page and the transform is applied
+    to all bboxes at once.
+    """
+    page_width, page_height = float(page.cropbox[2]), float(page.cropbox[3])
+    return _transform_rects(bboxes, page_width, page_height, _page_rotation(page))
+
+
+def _resolve_rgb(rgb_config):
+    """Accept a PALETTE key or a 0-255 RGB triple and return reportlab floats."""
+    if isinstance(rgb_config, str):
+        return PALETTE[rgb_config]
+    return tuple(float(color) / 255 for color in rgb_config)
+
+
+def cal_canvas_rect(page, bbox):
+    """Calculate rectangle coordinates on canvas"""
+    return _rects_for_page(page, [bbox])[0].tolist()
 
 
 def draw_bbox_without_number(i, bbox_list, page, c, rgb_config, fill_config):
     """Draw bounding boxes without numbers"""
-    new_rgb = [float(color) / 255 for color in rgb_config]
+    new_rgb = _resolve_rgb(rgb_config)
     page_data = bbox_list[i]
+    if not page_data:
+        return c
+    rects = _rects_for_page(page, page_data)
 
-    for bbox in page_data:
-        rect = cal_canvas_rect(page, bbox)
-
-        if fill_config:  # filled rectangle
-            c.setFillColorRGB(new_rgb[0], new_rgb[1], new_rgb[2], 0.3)
-            c.rect(rect[0], rect[1], rect[2], rect[3], stroke=0, fill=1)
-        else:  # bounding box only
-            c.setStrokeColorRGB(new_rgb[0], new_rgb[1], new_rgb[2])
-            c.rect(rect[0], rect[1], rect[2], rect[3], stroke=1, fill=0)
+    if fill_config:  # filled rectangle
+        c.setFillColorRGB(new_rgb[0], new_rgb[1], new_rgb[2], 0.3)
+    else:  # bounding box only
+        c.setStrokeColorRGB(new_rgb[0], new_rgb[1], new_rgb[2])
+    for x, y, w, h in rects.tolist():
+        if fill_config:
+            c.rect(x, y, w, h, stroke=0, fill=1)
+        else:
+            c.rect(x, y, w, h, stroke=1, fill=0)
     return c
 
 
 def draw_bbox_with_number(i, bbox_list, page, c, rgb_config, fill_config, draw_bbox=True):
     """Draw bounding boxes with numbers"""
-    new_rgb = [float(color) / 255 for color in rgb_config]
+    new_rgb = _resolve_rgb(rgb_config)
     page_data = bbox_list[i]
     
-    for j, bbox in enumerate(page_data):
-        rect = cal_canvas_rect(page, bbox)
-        
+    if not page_data:
+        return c
+    rects = _rects_for_page(page, page_data).tolist()
+
+    rotation = _page_rotation(page)
+    offset_fn = ROTATION_OFFSETS.get(rotation)
+
+    for j, rect in enumerate(rects):
         if draw_bbox:
             if fill_config:
                 c.setFillColorRGB(*new_rgb, 0.3)
@@ -85,24 +163,15 @@ def draw_bbox_with_number(i, bbox_list, page, c, rgb_config, fill_config, draw_b
         
         c.setFillColorRGB(*new_rgb, 1.0)
         c.setFontSize(size=10)
-        
-        c.saveState()
-        rotation_obj = page.get("/Rotate", 0)
-        try:
-            rotation = int(rotation_obj) % 360
-        except (ValueError, TypeError):
-            logger.warning(f"Invalid /Rotate value: {rotation_obj!r}, defaulting to 0")
-            rotation = 0
 
+        dx, dy = offset_fn(rect) if offset_fn else (0, 0)
         if rotation == 0:
-            c.translate(rect[0] + rect[2] + 2, rect[1] + rect[3] - 10)
-        elif rotation == 90:
-            c.translate(rect[0] + 10, rect[1] + rect[3] + 2)
-        elif rotation == 180:
-            c.translate(rect[0] - 2, rect[1] + 10)
-        elif rotation == 270:
-            c.translate(rect[0] + rect[2] - 10, rect[1] - 2)
-            
+            # Upright pages need no transform, draw in absolute coordinates
+            c.drawString(dx, dy, str(j + 1))
+            continue
+
+        c.saveState()
+        c.translate(dx, dy)
         c.rotate(rotation)
         c.drawString(0, 0, str(j + 1))
         c.restoreState()
@@ -110,68 +179,69 @@ def draw_bbox_with_number(i, bbox_list, page, c, rgb_config, fill_config, draw_b
     return c
 
 
-def draw_layout_bbox_on_single_page(pdf_info_page, pdf_bytes, page_index, output_path):
-    """
-    Draw layout bboxes on a single PDF page
-    
-    Args:
-        pdf_info_page: Page info from middle.json pdf_info array
-        pdf_bytes: Original PDF bytes
-        page_index: 0-based page index
-        output_path: Output PDF file path
-    
-    Returns:
-        Output PDF file path
+def _get_reader(pdf_bytes):
+    """Return a cached ``(PdfReader, lock)`` pair for ``pdf_bytes``.
+
+    Paging through one document would otherwise re-parse the whole PDF on
+    every call. The lock serialises access to the reader's shared stream.
     """
-    # Extract bbox lists by type
-    tables_body, tables_caption, tables_footnote = [], [], []
-    imgs_body, imgs_caption, imgs_footnote = [], [], []
-    titles, texts, interequations, lists, list_items = [], [], [], [], []
-    
+    key = hashlib.blake2b(pdf_bytes, digest_size=16).digest()
+    with _reader_cache_lock:
+        entry = _reader_cache.get(key)
+        if entry is not None:
+            _reader_cache.move_to_end(key)
+            return entry
+    entry = (PdfReader(BytesIO(pdf_bytes)), threading.RLock())
+    with _reader_cache_lock:
+        entry = _reader_cache.setdefault(key, entry)
+        _reader_cache.move_to_end(key)
+        while len(_reader_cache) > _READER_CACHE_SIZE:
+            _reader_cache.popitem(last=False)
+    return entry
+
+
+def _collect_layout_bboxes(pdf_info_page):
+    """Group the bboxes of a middle.json page by layout category."""
+    groups = {
+        "tables_body": [], "tables_caption": [], "tables_footnote": [],
+        "imgs_body": [], "imgs_caption": [], "imgs_footnote": [],
+        "titles": [], "texts": [], "interequations": [], "lists": [], "list_items": [],
+    }
+    nested_targets = {
+        "table_body": groups["tables_body"],
+        "table_caption": groups["tables_caption"],
+        "table_footnote": groups["tables_footnote"],
+        "image_body": groups["imgs_body"],
+        "image_caption": groups["imgs_caption"],
+        "image_footnote": groups["imgs_footnote"],
+    }
+
     for block in pdf_info_page.get("para_blocks", []):
         bbox = block.get("bbox", [])
         block_type = block.get("type", "")
-        
-        if block_type == "table":
-            for nested_block in block.get("blocks", []):
-                nested_bbox = nested_block.get("bbox", [])
-                nested_type = nested_block.get("type", "")
-                if nested_type == "table_body":
-                    tables_body.append(nested_bbox)
-                elif nested_type == "table_caption":
-                    tables_caption.append(nested_bbox)
-                elif nested_type == "table_footnote":
-                    tables_footnote.append(nested_bbox)
-        elif block_type == "image":
+
+        if block_type in ("table", "image"):
             for nested_block in block.get("blocks", []):
-                nested_bbox = nested_block.get("bbox", [])
                 nested_type = nested_block.get("type", "")
-                if nested_type == "image_body":
-                    imgs_body.append(nested_bbox)
-                elif nested_type == "image_caption":
-                    imgs_caption.append(nested_bbox)
-                elif nested_type == "image_footnote":
-                    imgs_footnote.append(nested_bbox)
+                # Only table_* parts of tables and image_* parts of images count.
+                if nested_type.startswith(f"{block_type}_") and nested_type in nested_targets:
+                    nested_targets[nested_type].append(nested_block.get("bbox", []))
         elif block_type == "title":
-            titles.append(bbox)
+            groups["titles"].append(bbox)
         elif block_type in ["text", "reference"]:
-            texts.append(bbox)
+            groups["texts"].append(bbox)
         elif block_type == "equation":
-            interequations.append(bbox)
+            groups["interequations"].append(bbox)
         elif block_type == "list":
-            lists.append(bbox)
+            groups["lists"].append(bbox)
             for sub_block in block.get("blocks", []):
-                list_items.append(sub_block.get("bbox", []))
-    
-    # Create single-page PDF
-    pdf_bytes_io = BytesIO(pdf_bytes)
-    pdf_docs = PdfReader(pdf_bytes_io)
-    
-    if page_index >= len(pdf_docs.pages):
-        logger.error(f"Page index {page_index} out of range (total {len(pdf_docs.pages)} pages)")
-        return None
-    
-    page = pdf_docs.pages[page_index]
+                groups["list_items"].append(sub_block.get("bbox", []))
+    return groups
+
+
+def _render_overlay(pdf_info_page, page):
+    """Draw the layout overlay for ``page`` and return it as a one-page PdfReader."""
+    groups = _collect_layout_bboxes(pdf_info_page)
     page_width, page_height = float(page.cropbox[2]), float(page.cropbox[3])
     custom_page_size = (page_width, page_height)
 
@@ -179,49 +249,154 @@ def draw_layout_bbox_on_single_page(pdf_info_page, pdf_bytes, page_index, output
     c = canvas.Canvas(packet, pagesize=custom_page_size)
 
     # Draw各类型的 bbox (使用不同颜色)
-    # Tables
-    draw_bbox_without_number(0, [tables_body], page, c, [204, 204, 0], True)
-    draw_bbox_without_number(0, [tables_caption], page, c, [255, 255, 102], True)
-    draw_bbox_without_number(0, [tables_footnote], page, c, [229, 255, 204], True)
-    
-    # Images
-    draw_bbox_without_number(0, [imgs_body], page, c, [153, 255, 51], True)
-    draw_bbox_without_number(0, [imgs_caption], page, c, [102, 178, 255], True)
-    draw_bbox_without_number(0, [imgs_footnote], page, c, [255, 178, 102], True)
-    
-    # Text elements
-    draw_bbox_without_number(0, [titles], page, c, [102, 102, 255], True)
-    draw_bbox_without_number(0, [texts], page, c, [153, 0, 76], True)
-    draw_bbox_without_number(0, [interequations], page, c, [0, 255, 0], True)
-    draw_bbox_without_number(0, [lists], page, c, [40, 169, 92], True)
-    draw_bbox_without_number(0, [list_items], page, c, [40, 169, 92], False)
-    
+    for group, color, fill in _OVERLAY_LAYERS:
+        draw_bbox_without_number(0, [groups[group]], page, c, color, fill)
+
     # Draw reading order numbers
     page_block_list = []
     for block in pdf_info_page.get("para_blocks", []):
         page_block_list.append(block.get("bbox", []))
-    
-    draw_bbox_with_number(0, [page_block_list], page, c, [255, 0, 0], False, draw_bbox=False)
+
+    draw_bbox_with_number(0, [page_block_list], page, c, "reading_order", False, draw_bbox=False)
 
     c.save()
     packet.seek(0)
-    overlay_pdf = PdfReader(packet)
-
-    # Merge overlay with original page
-    if len(overlay_pdf.pages) > 0:
-        new_page = PageObject(pdf=None)
-        new_page.update(page)
-        page = new_page
-        page.merge_page(overlay_pdf.pages[0])
-    
-    # Write to output
+    return PdfReader(packet)
+
+
+def _draw_page_with_pymupdf(page, pdf_info_page):
+    """Draw the overlay for one middle.json page directly onto a PyMuPDF page."""
+    page_width, page_height = page.cropbox.x1, page.cropbox.y1
+    rotation = page.rotation
+    # Rects are computed in PDF user space (origin bottom-left, unrotated),
+    # exactly as for the reportlab overlay, then mapped to PyMuPDF space.
+    to_page = page.transformation_matrix
+
+    def _rect(x, y, w, h):
+        return pymupdf.Rect(x, y, x + w, y + h) * to_page
+
+    groups = _collect_layout_bboxes(pdf_info_page)
+    shape = page.new_shape()
+    for group, color, fill in _OVERLAY_LAYERS:
+        if not groups[group]:
+            continue
+        rgb = PALETTE[color]
+        for x, y, w, h in _transform_rects(groups[group], page_width, page_height, rotation).tolist():
+            shape.draw_rect(_rect(x, y, w, h))
+        if fill:
+            shape.finish(color=None, fill=rgb, fill_opacity=0.3, width=0)
+        else:
+            shape.finish(color=rgb, fill=None, width=1)
+
+    page_block_list = [block.get("bbox", []) for block in pdf_info_page.get("para_blocks", [])]
+    if page_block_list:
+        offset_fn = ROTATION_OFFSETS.get(rotation)
+        rects = _transform_rects(page_block_list, page_width, page_height, rotation).tolist()
+        for j, rect in enumerate(rects):
+            dx, dy = offset_fn(rect) if offset_fn else (0, 0)
+            shape.insert_text(
+                pymupdf.Point(dx, dy) * to_page,
+                str(j + 1),
+                fontsize=10,
+                fontname="helv",
+                color=PALETTE["reading_order"],
+                rotate=rotation,
+            )
+    shape.commit()
+
+
+def _draw_layout_with_pymupdf(pdf_info, pdf_bytes, page_indices):
+    """Draw overlays for ``page_indices`` with PyMuPDF and return the PDF bytes."""
+    doc = pymupdf.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        selected = []
+        for page_index in page_indices:
+            if page_index >= doc.page_count:
+                logger.error(f"Page index {page_index} out of range (total {doc.page_count} pages)")
+                continue
+            selected.append(page_index)
+        if not selected:
+            return None
+        doc.select(selected)
+        for page, page_index in zip(doc, selected):
+            _draw_page_with_pymupdf(page, pdf_info[page_index])
+        return doc.tobytes(garbage=3, deflate=True)
+    finally:
+        doc.close()
+
+
+def draw_layout_bbox_on_pages(pdf_info, pdf_bytes, page_indices, output_path, pdf_reader=None):
+    """
+    Draw layout bboxes on several PDF pages and write them into one PDF
+
+    Args:
+        pdf_info: middle.json pdf_info array, or any mapping from 0-based
+            page index to its page info
+        pdf_bytes: Original PDF bytes
+        page_indices: 0-based page indices, in output order
+        output_path: Output PDF file path
+        pdf_reader: Optional already-opened PdfReader for ``pdf_bytes``;
+            when omitted a cached reader is used
+
+    Returns:
+        Output PDF file path, or None when no requested page exists
+    """
+    if settings.use_pymupdf and pymupdf is not None:
+        data = _draw_layout_with_pymupdf(pdf_info, pdf_bytes, page_indices)
+        if data is None:
+            return None
+        output_path = Path(output_path)
+        write_batch([(output_path, data)])
+        return str(output_path)
+
+    if pdf_reader is not None:
+        pdf_docs, reader_lock = pdf_reader, threading.RLock()
+    else:
+        pdf_docs, reader_lock = _get_reader(pdf_bytes)
+
     output_pdf = PdfWriter()
-    output_pdf.add_page(page)
-    
+    with reader_lock:
+        for page_index in page_indices:
+            if page_index >= len(pdf_docs.pages):
+                logger.error(f"Page index {page_index} out of range (total {len(pdf_docs.pages)} pages)")
+                continue
+
+            page = pdf_docs.pages[page_index]
+            overlay_pdf = _render_overlay(pdf_info[page_index], page)
+
+            # add_page clones the page into the writer, so merging onto the
+            # returned page leaves the cached source page untouched
+            writer_page = output_pdf.add_page(page)
+            if len(overlay_pdf.pages) > 0:
+                writer_page.merge_page(overlay_pdf.pages[0])
+
+        if len(output_pdf.pages) == 0:
+            return None
+
+        buffer = BytesIO()
+        output_pdf.write(buffer)
+
     output_path = Path(output_path)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    write_batch([(output_path, buffer.getvalue())])
+
+    return str(output_path)
+
+
+def draw_layout_bbox_on_single_page(pdf_info_page, pdf_bytes, page_index, output_path, pdf_reader=None):
+    """
+    Draw layout bboxes on a single PDF page
     
-    with open(output_path, "wb") as f:
-        output_pdf.write(f)
+    Args:
+        pdf_info_page: Page info from middle.json pdf_info array
+        pdf_bytes: Original PDF bytes
+        page_index: 0-based page index
+        output_path: Output PDF file path
+        pdf_reader: Optional already-opened PdfReader for ``pdf_bytes``;
+            when omitted a cached reader is used
     
-    return str(output_path)
+    Returns:
+        Output PDF file path
+    """
+    return draw_layout_bbox_on_pages(
+        {page_index: pdf_info_page}, pdf_bytes, [page_index], output_path, pdf_reader=pdf_reader
+    )
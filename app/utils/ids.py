@@ -0,0 +1,48 @@
+"""Helpers for task identifiers embedded in stored file names."""
+from __future__ import annotations
+
+import re
+import uuid
+from pathlib import Path
+from typing import Optional
+
+_UUID_LENGTH = 36
+
+# Sub-directory of raw storage holding ``{task_id}{suffix}`` symlinks to the raw files.
+RAW_BY_ID_DIR = "by_id"
+
+# Client-chosen task ids (Idempotency-Key, metadata.document_id) end up in file
+# names, so they are limited to characters that cannot form a path.
+_TASK_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def is_valid_task_id(task_id: object) -> bool:
+    """True if ``task_id`` is safe to embed in a storage file name."""
+    return isinstance(task_id, str) and _TASK_ID_PATTERN.fullmatch(task_id) is not None
+
+
+def extract_task_id(name: str) -> Optional[str]:
+    """Return the leading task id of ``{task_id}_...`` file names, or None.
+
+    Only canonical lower-case hyphenated UUIDs (as produced by ``str(uuid4())``)
+    are accepted; ``uuid.UUID`` does the parsing instead of a regex.
+    """
+    candidate = name[:_UUID_LENGTH]
+    if len(candidate) != _UUID_LENGTH:
+        return None
+    try:
+        parsed = uuid.UUID(candidate)
+    except ValueError:
+        return None
+    return candidate if str(parsed) == candidate else None
+
+
+def find_raw_file(raw_dir: Path, task_id: str, suffix: str = ".pdf") -> Optional[Path]:
+    """Locate the raw ``{task_id}_*{suffix}`` file, via its by-id symlink when present.
+
+    Files stored before the symlinks existed are found with a directory glob.
+    """
+    try:
+        return (raw_dir / RAW_BY_ID_DIR / f"{task_id}{suffix}").resolve(strict=True)
+    except OSError:
+        return next(raw_dir.glob(f"{task_id}_*{suffix}"), None)
@@ -0,0 +1,151 @@
+"""Batched small-file writes via io_uring with a synchronous fallback."""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from app.logging_utils import get_pipeline_logger
+
+try:
+    import liburing
+except ImportError:  # pragma: no cover - optional dependency
+    liburing = None  # type: ignore
+
+logger = get_pipeline_logger("pipeline.io_uring")
+
+PathLike = Union[str, Path]
+
+_RING_ENTRIES = 256
+
+_ring: Optional[object] = None
+_ring_lock = threading.Lock()
+_ring_disabled = liburing is None or not sys.platform.startswith("linux")
+
+
+def _write_sync(path: Path, data: bytes, fsync: bool) -> None:
+    with open(path, "wb") as handle:
+        handle.write(data)
+        if fsync:
+            handle.flush()
+            os.fsync(handle.fileno())
+
+
+def _get_ring() -> Optional[object]:
+    """Return the shared ring, creating it on first use. Caller holds ``_ring_lock``."""
+    global _ring, _ring_disabled  # pylint: disable=global-statement
+    if _ring is not None or _ring_disabled:
+        return _ring
+    try:
+        ring = liburing.Ring()
+        liburing.io_uring_queue_init(_RING_ENTRIES, ring, 0)
+    except Exception as exc:  # pragma: no cover - kernel/seccomp without io_uring
+        logger.info("io_uring unavailable, using synchronous writes: %s", exc)
+        _ring_disabled = True
+        return None
+    _ring = ring
+    return _ring
+
+
+def _disable_ring() -> None:
+    """Stop using the ring after an unexpected error; it may hold stale completions."""
+    global _ring, _ring_disabled  # pylint: disable=global-statement
+    _ring_disabled = True
+    _ring = None
+
+
+def _reap(ring: object, expected: int) -> List[Tuple[int, int]]:
+    """Wait for ``expected`` completions and return ``(user_data, res)`` pairs."""
+    cqe = liburing.Cqe()
+    results: List[Tuple[int, int]] = []
+    while len(results) < expected:
+        liburing.io_uring_wait_cqe(ring, cqe)
+        ready = liburing.io_uring_cq_ready(ring)
+        for idx in range(ready):
+            entry = cqe[idx]
+            results.append((entry.user_data, entry.res))
+        liburing.io_uring_cq_advance(ring, ready)
+    return results
+
+
+def _submit_chunk(ring: object, chunk: Sequence[Tuple[Path, bytes]], fsync: bool) -> List[int]:
+    """Write one ring-sized chunk; return indexes that must be retried synchronously."""
+    fds: Dict[int, int] = {}
+    failed: List[int] = []
+    try:
+        for idx, (path, _) in enumerate(chunk):
+            try:
+                fds[idx] = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            except OSError:
+                # The synchronous retry raises the real error for the caller.
+                failed.append(idx)
+        if not fds:
+            return failed
+        for idx, fd in fds.items():
+            sqe = liburing.io_uring_get_sqe(ring)
+            liburing.io_uring_prep_write(sqe, fd, chunk[idx][1], 0)
+            sqe.user_data = idx
+        liburing.io_uring_submit(ring)
+        failed.extend(idx for idx, res in _reap(ring, len(fds)) if res != len(chunk[idx][1]))
+        if fsync:
+            for idx, fd in fds.items():
+                sqe = liburing.io_uring_get_sqe(ring)
+                liburing.io_uring_prep_fsync(sqe, fd, 0)
+                sqe.user_data = idx
+            liburing.io_uring_submit(ring)
+            failed.extend(idx for idx, res in _reap(ring, len(fds)) if res < 0 and idx not in failed)
+        return failed
+    finally:
+        for fd in fds.values():
+            os.close(fd)
+
+
+def write_batch(items: Sequence[Tuple[PathLike, bytes]], fsync: bool = False) -> List[Path]:
+    """Write every ``(path, data)`` pair, creating parent directories as needed.
+
+    On Linux with ``liburing`` installed the writes (and optional fsyncs) are
+    submitted to a shared io_uring so a batch costs a few syscalls instead of
+    one open/write/close round trip per file. Anything the ring cannot handle
+    is written synchronously.
+    """
+    entries = [(Path(path), bytes(data)) for path, data in items]
+    for parent in {path.parent for path, _ in entries}:
+        parent.mkdir(parents=True, exist_ok=True)
+
+    pending = entries
+    if not _ring_disabled and entries:
+        pending = []
+        with _ring_lock:
+            ring = _get_ring()
+            if ring is None:
+                pending = entries
+            else:
+                # Leave room for the fsync pass of the same chunk.
+                step = _RING_ENTRIES // 2
+                for start in range(0, len(entries), step):
+                    chunk = entries[start : start + step]
+                    try:
+                        failed = _submit_chunk(ring, chunk, fsync)
+                    except Exception as exc:  # pragma: no cover - binding/kernel mismatch
+                        logger.warning("io_uring batch failed, retrying synchronously: %s", exc)
+                        _disable_ring()
+                        pending.extend(entries[start:])
+                        break
+                    pending.extend(chunk[idx] for idx in failed)
+
+    for path, data in pending:
+        _write_sync(path, data, fsync)
+    return [path for path, _ in entries]
+
+
+def _reset_after_fork() -> None:
+    global _ring, _ring_lock  # pylint: disable=global-statement
+    # The parent's ring is not usable in the child; build a fresh one lazily.
+    _ring = None
+    _ring_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -5,18 +5,47 @@ from fastapi.responses import JSONResponse
 
 from app.api.routes_ingest import router as ingest_router
 from app.api.routes_logs import router as logs_router
+from app.api.routes_media import router as media_router
 from app.api.routes_query import router as query_router
 from app.api.schemas import ErrorEnvelope
+from app.config import settings
+from app.core.compression import RequestDecompressionMiddleware, ResponseCompressionMiddleware
 from app.core.errors import APIError
 from app.core.tracking import clear_context, new_context
 from app.logging_utils import configure_logging
+from app.services import storage
 
 configure_logging()
 
 app = FastAPI(title="Multimodal RAG Pipeline", version="0.1.0")
 app.include_router(ingest_router)
 app.include_router(logs_router)
+app.include_router(media_router)
 app.include_router(query_router)
+# Multipart overhead on top of the largest allowed batch.
+app.add_middleware(
+    RequestDecompressionMiddleware,
+    max_body_bytes=int(settings.upload_max_batch_mb * 1024 * 1024) + 1_048_576,
+)
+# Task results re-sent on every poll are mostly JSON text; small bodies go out as-is.
+# The NDJSON / SSE streams stay uncompressed so each line is delivered as it is written.
+app.add_middleware(
+    ResponseCompressionMiddleware,
+    minimum_size=1024,
+    uncompressed_paths=r"/query/stream|/tasks/[^/]+/events|/logs/[^/]+/stream",
+)
+
+
+@app.on_event("startup")
+def check_storage_backend() -> None:
+    # Fail loudly if a stale storage module without MinIO sync ever shadows the real one.
+    if not hasattr(storage, "_sync_to_minio"):
+        raise RuntimeError("app.services.storage is missing MinIO sync support")
+
+
+@app.on_event("shutdown")
+def flush_pending_uploads() -> None:
+    storage.flush_minio_uploads()
 
 
 @app.middleware("http")
@@ -11,6 +11,7 @@ UVICORN_PORT=${UVICORN_PORT:-8000}
 GRADIO_PORT=${GRADIO_PORT:-7860}
 CELERY_CPU_QUEUE=${CELERY_CPU_QUEUE:-ingest_cpu}
 CELERY_IO_QUEUE=${CELERY_IO_QUEUE:-ingest_io}
+CELERY_VIDEO_QUEUE=${CELERY_VIDEO_QUEUE:-}
 FLOWER_PORT=${FLOWER_PORT:-5555}
 
 SERVICE_MATRIX=(
@@ -20,6 +21,9 @@ SERVICE_MATRIX=(
   "celery_io|Celery IO (${CELERY_IO_QUEUE})||${LOG_DIR}/celery_io.log"
   "flower|Flower Dashboard|${FLOWER_PORT}|${LOG_DIR}/flower.log"
 )
+if [[ -n "$CELERY_VIDEO_QUEUE" ]]; then
+  SERVICE_MATRIX+=("celery_video|Celery Video (${CELERY_VIDEO_QUEUE})||${LOG_DIR}/celery_video.log")
+fi
 
 read_pid() {
   local file=$1
@@ -10,9 +10,15 @@ GRADIO_PORT=${GRADIO_PORT:-7860}
 HEALTH_RETRIES=${HEALTH_RETRIES:-30}
 CELERY_CPU_QUEUE=${CELERY_CPU_QUEUE:-ingest_cpu}
 CELERY_IO_QUEUE=${CELERY_IO_QUEUE:-ingest_io}
+CELERY_VIDEO_QUEUE=${CELERY_VIDEO_QUEUE:-}
 HOSTNAME_CMD=$(hostname 2>/dev/null || echo "localhost")
 CELERY_CPU_NAME=${CELERY_CPU_NAME:-ingest_cpu@${HOSTNAME_CMD}}
 CELERY_IO_NAME=${CELERY_IO_NAME:-ingest_io@${HOSTNAME_CMD}}
+CELERY_VIDEO_NAME=${CELERY_VIDEO_NAME:-${CELERY_VIDEO_QUEUE}@${HOSTNAME_CMD}}
+CPU_COUNT=$(getconf _NPROCESSORS_ONLN 2>/dev/null || echo 4)
+CELERY_CPU_CONCURRENCY=${CELERY_CPU_CONCURRENCY:-$CPU_COUNT}
+CELERY_IO_CONCURRENCY=${CELERY_IO_CONCURRENCY:-$((CPU_COUNT * 2))}
+CELERY_VIDEO_CONCURRENCY=${CELERY_VIDEO_CONCURRENCY:-2}
 START_CELERY=${START_CELERY:-true}
 FLOWER_PORT=${FLOWER_PORT:-5555}
 START_FLOWER=${START_FLOWER:-true}
@@ -167,6 +173,7 @@ UVICORN_LOG="$LOG_DIR/uvicorn.log"
 GRADIO_LOG="$LOG_DIR/gradio.log"
 CELERY_CPU_LOG="$LOG_DIR/celery_cpu.log"
 CELERY_IO_LOG="$LOG_DIR/celery_io.log"
+CELERY_VIDEO_LOG="$LOG_DIR/celery_video.log"
 FLOWER_LOG="$LOG_DIR/flower.log"
 
 # Start FastAPI (Uvicorn) in the background with log redirection.
@@ -192,11 +199,16 @@ if [[ $START_GRADIO -eq 1 ]]; then
 fi
 
 if [[ $START_CELERY_ENABLED -eq 1 ]]; then
-  ("$VENV_BIN/celery" -A app.celery_app worker -Q "$CELERY_CPU_QUEUE" -n "$CELERY_CPU_NAME" -l info >"$CELERY_CPU_LOG" 2>&1 & echo $! >"$RUN_DIR/celery_cpu.pid")
-  echo "Celery CPU worker started on queue ${CELERY_CPU_QUEUE}. Logs: $CELERY_CPU_LOG"
+  ("$VENV_BIN/celery" -A app.celery_app worker -Q "$CELERY_CPU_QUEUE" -n "$CELERY_CPU_NAME" -c "$CELERY_CPU_CONCURRENCY" -l info >"$CELERY_CPU_LOG" 2>&1 & echo $! >"$RUN_DIR/celery_cpu.pid")
+  echo "Celery CPU worker started on queue ${CELERY_CPU_QUEUE} (concurrency ${CELERY_CPU_CONCURRENCY}). Logs: $CELERY_CPU_LOG"
 
-  ("$VENV_BIN/celery" -A app.celery_app worker -Q "$CELERY_IO_QUEUE" -n "$CELERY_IO_NAME" -l info >"$CELERY_IO_LOG" 2>&1 & echo $! >"$RUN_DIR/celery_io.pid")
-  echo "Celery IO worker started on queue ${CELERY_IO_QUEUE}. Logs: $CELERY_IO_LOG"
+  ("$VENV_BIN/celery" -A app.celery_app worker -Q "$CELERY_IO_QUEUE" -n "$CELERY_IO_NAME" -c "$CELERY_IO_CONCURRENCY" -l info >"$CELERY_IO_LOG" 2>&1 & echo $! >"$RUN_DIR/celery_io.pid")
+  echo "Celery IO worker started on queue ${CELERY_IO_QUEUE} (concurrency ${CELERY_IO_CONCURRENCY}). Logs: $CELERY_IO_LOG"
+
+  if [[ -n "$CELERY_VIDEO_QUEUE" ]]; then
+    ("$VENV_BIN/celery" -A app.celery_app worker -Q "$CELERY_VIDEO_QUEUE" -n "$CELERY_VIDEO_NAME" -c "$CELERY_VIDEO_CONCURRENCY" -l info >"$CELERY_VIDEO_LOG" 2>&1 & echo $! >"$RUN_DIR/celery_video.pid")
+    echo "Celery video worker started on queue ${CELERY_VIDEO_QUEUE} (concurrency ${CELERY_VIDEO_CONCURRENCY}). Logs: $CELERY_VIDEO_LOG"
+  fi
 fi
 
 if [[ $START_FLOWER_ENABLED -eq 1 ]]; then
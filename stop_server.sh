@@ -59,7 +59,7 @@ if [[ $STOP_GRADIO -eq 1 ]]; then
   PIDS+=(gradio)
 fi
 if [[ $STOP_CELERY_ENABLED -eq 1 ]]; then
-  PIDS+=(celery_cpu celery_io)
+  PIDS+=(celery_cpu celery_io celery_video)
 fi
 if [[ $STOP_FLOWER_ENABLED -eq 1 ]]; then
   PIDS+=(flower)
@@ -80,26 +80,23 @@ def test_bbox_drawing():
     filename = filename.replace('_middle', '')  # Remove _middle suffix
     # Now we have {task_id}_{filename}
     # Task ID is UUID format: 8-4-4-4-12 characters
-    import re
-    uuid_pattern = r'^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})'
-    match = re.match(uuid_pattern, filename)
+    from app.utils.ids import extract_task_id, find_raw_file
+    task_id = extract_task_id(filename)
     
-    if not match:
+    if not task_id:
         print(f"❌ Could not extract task_id from filename: {filename}")
         return False
     
-    task_id = match.group(1)
     print(f"✅ Extracted task_id: {task_id}")
     
     # Look for PDF in data/raw with matching task_id
     raw_dir = Path("/home/mm-rag/data/raw")
-    pdf_files = list(raw_dir.glob(f"{task_id}_*.pdf"))
+    pdf_path = find_raw_file(raw_dir, task_id)
     
-    if not pdf_files:
+    if not pdf_path:
         print(f"❌ No PDF found for task_id {task_id} in {raw_dir}")
         return False
     
-    pdf_path = pdf_files[0]
     print(f"✅ Found PDF: {pdf_path.name}")
     
     try:
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Verify the async MinerU submission builds a valid multipart request (no MinerU server needed)"""
+
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+import httpx
+
+from app.services.pdf_parsers.mineru import MinerUPdfParser
+
+print("=" * 70)
+print("MinerU async submission - MockTransport test")
+print("=" * 70)
+
+captured = {}
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    captured["content_type"] = request.headers.get("content-type", "")
+    captured["body"] = request.read()
+    return httpx.Response(200, json={"results": {}, "backend": "pipeline"})
+
+
+async def submit(pdf_path: Path):
+    parser = MinerUPdfParser()
+    options = {"lang_list": ["ch", "en"], "backend": "pipeline", "return_md": True, "start_page_id": 0}
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        return await parser._parse_async(client, asyncio.Semaphore(1), pdf_path, "doc-async-test", options)
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    pdf_path = Path(tmp) / "sample.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4\n%%EOF\n")
+    try:
+        payload, extras = asyncio.run(submit(pdf_path))
+    except Exception as e:
+        print(f"  ❌ Submission failed: {e!r}")
+        sys.exit(1)
+
+body = captured["body"]
+checks = [
+    ("multipart request", captured["content_type"].startswith("multipart/form-data")),
+    ("both lang_list values sent", body.count(b'name="lang_list"') == 2 and b"\r\nch\r\n" in body and b"\r\nen\r\n" in body),
+    ("scalar fields sent", b'name="backend"' in body and b'name="return_md"' in body),
+    ("pdf attached as files", b'name="files"; filename="sample.pdf"' in body),
+    ("response decoded", payload.get("backend") == "pipeline"),
+]
+failed = False
+for label, ok in checks:
+    print(f"  {'✅' if ok else '❌'} {label}")
+    failed |= not ok
+
+print("\n📦 Response payload:", json.dumps(payload, ensure_ascii=False))
+sys.exit(1 if failed else 0)
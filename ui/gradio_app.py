@@ -1,28 +1,131 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
 import os
 from pathlib import Path, PurePosixPath
-import base64
-from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import shutil
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
 import html
+import threading
 import time
 import json
 import zipfile
+import zlib
 import mimetypes
 import re
+import struct
+import tempfile
+import traceback
 
 import gradio as gr
+import numpy as np
 from gradio_pdf import PDF
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover - optional dependency
+    xxhash = None  # type: ignore
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional dependency
+    ijson = None  # type: ignore
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - optional dependency (Windows, minimal installs)
+    uvloop = None  # type: ignore
 
 API_BASE_URL = os.environ.get("API_BASE_URL", "http://localhost:8000")
 DEFAULT_TIMEOUT = float(os.environ.get("API_TIMEOUT", "90"))
+# Connecting to the API is fast or not happening; don't let it eat the whole read budget.
+API_CONNECT_TIMEOUT = float(os.environ.get("API_CONNECT_TIMEOUT", "3.05"))
 API_APP_ID = os.environ.get("API_APP_ID")
 API_APP_KEY = os.environ.get("API_APP_KEY")
+# "gzip" compresses uploads of uncompressed media on the wire; "none" sends them as-is.
+UPLOAD_COMPRESSION = os.environ.get("UPLOAD_COMPRESSION", "gzip").strip().lower()
 
 _AUTH_HEADERS = {"X-Appid": API_APP_ID, "X-Key": API_APP_KEY} if (API_APP_ID and API_APP_KEY) else {}
-
-_MINERU_ZIP_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+# Line-streamed responses must not be compressed: a gzip layer may hold lines back until it flushes.
+_STREAM_HEADERS = {"Accept-Encoding": "identity"}
+
+# Shared async client so concurrent sessions wait on the API without blocking Gradio's event loop.
+_HTTP: Optional[httpx.AsyncClient] = None
+
+# Files already copied into the Gradio temp dir, keyed by content/stat digest -> served URL.
+_PUBLISHED_FILES: "OrderedDict[str, str]" = OrderedDict()
+_PUBLISHED_FILES_SIZE = 1024
+# Previews publishing from worker threads share the LRU.
+_PUBLISHED_FILES_LOCK = threading.Lock()
+
+# Uncompressed formats worth gzipping; MP4/MOV/MP3/PDF payloads are already compressed.
+_COMPRESSIBLE_SUFFIXES = frozenset({".wav", ".wave", ".aif", ".aiff", ".pcm"})
+
+# Decoded MinerU bundles keyed by path -> ((mtime_ns, size), payload, approximate bytes held).
+_MINERU_ZIP_CACHE: "OrderedDict[str, Tuple[Tuple[int, int], Dict[str, Any], int]]" = OrderedDict()
+_MINERU_ZIP_CACHE_SIZE = int(os.environ.get("MINERU_ZIP_CACHE_MAX", "8"))
+_MINERU_ZIP_CACHE_MAX_BYTES = int(os.environ.get("MINERU_ZIP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+_MINERU_ZIP_CACHE_BYTES = 0
+# Preview builders run in worker threads (asyncio.to_thread).
+_MINERU_ZIP_CACHE_LOCK = threading.Lock()
+# Per-bundle locks so concurrent previews of one bundle decode it only once;
+# dropped with the bundle's cache entry so the map stays as bounded as the cache.
+_MINERU_ZIP_DECODE_LOCKS: Dict[str, threading.Lock] = {}
+
+# /query hits keyed by normalized query text and top_k; short TTL because indexing is asynchronous.
+_QUERY_CACHE: "OrderedDict[Tuple[str, int], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+_QUERY_CACHE_SIZE = 256
+_QUERY_CACHE_TTL_SECONDS = 60.0
+# Identical queries already on the wire; later callers await the same request.
+_QUERY_INFLIGHT: Dict[Tuple[str, int], "asyncio.Future[Optional[List[Dict[str, Any]]]]"] = {}
+
+# Finished task payloads reused across page turns; a finished task no longer changes.
+_DONE_TASK_CACHE: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_DONE_TASK_CACHE_SIZE = 32
+_DONE_TASK_CACHE_TTL_SECONDS = 60.0
+_DONE_TASK_CACHE_LOCK = threading.Lock()
+
+# Annotated single-page PDFs are rendered on a small shared pool; renders of the
+# same output file already under way are joined rather than started twice.
+_PDF_RENDER_POOL = ThreadPoolExecutor(
+    max_workers=max(1, int(os.environ.get("PDF_RENDER_WORKERS", "2"))), thread_name_prefix="pdf-render"
+)
+_PDF_RENDER_TIMEOUT_SECONDS = 30.0
+# Full tracebacks in the preview panel are opt-in; by default errors stay one line.
+_PDF_RENDER_DEBUG = os.environ.get("PDF_RENDER_DEBUG") == "1"
+# Neighbouring pages rendered ahead of a page turn.
+_PDF_PREFETCH_PAGES = max(0, int(os.environ.get("PDF_PREFETCH_PAGES", "1")))
+# Opening a preview queues the first few pages, which are the ones read next.
+_PDF_FIRST_LOAD_PREFETCH_PAGES = max(_PDF_PREFETCH_PAGES, 4)
+_PDF_RENDER_INFLIGHT: "Dict[str, Future[Optional[str]]]" = {}
+_PDF_RENDER_LOCK = threading.Lock()
+
+# Rendered poll output per task, reused while (status, detail, updated_at) is unchanged.
+_POLL_RENDER_CACHE: "OrderedDict[str, Tuple[Tuple[Any, ...], Tuple[str, str, str, Dict[str, Optional[str]]]]]" = OrderedDict()
+_POLL_RENDER_CACHE_SIZE = 64
+
+# Chat turns kept per session; older messages drop off the front.
+_CHAT_HISTORY_LIMIT = 200
+
+# Task polling starts fast and backs off while the status stays the same.
+_POLL_MIN_SECONDS = 1.0
+_POLL_MAX_SECONDS = 15.0
+_POLL_BACKOFF = 1.5
+_TERMINAL_STATUSES = frozenset({"success", "failure", "revoked", "completed", "failed"})
 
 _MARKDOWN_IMAGE_PATTERN = re.compile(r"!\[([^\]]*)\]\(([^)]+)\)")
 
@@ -131,15 +234,57 @@ UI_CSS = """
 }
 """
 
-def _headers() -> Dict[str, str]:
-    return dict(_AUTH_HEADERS)
+def _json_loads(data: bytes | str) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _json_dumps(obj: Any, indent: bool = False) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2 if indent else 0).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, default=str, indent=2 if indent else None)
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update(_AUTH_HEADERS)
+    # GETs are retried on connection errors and on a restarting API behind a proxy (502-504).
+    retry = Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Keep-alive pool for the synchronous calls (render_pdf_page runs in Gradio's worker threads).
+_SESSION = _build_session()
+atexit.register(_SESSION.close)
+
+
+def _api_timeout(seconds: float) -> httpx.Timeout:
+    return httpx.Timeout(seconds, connect=min(API_CONNECT_TIMEOUT, seconds))
+
+
+# Long-lived line streams: no read deadline, but a dead API still fails fast.
+_STREAM_TIMEOUT = httpx.Timeout(DEFAULT_TIMEOUT, connect=API_CONNECT_TIMEOUT, read=None)
+
+
+def _http() -> httpx.AsyncClient:
+    global _HTTP  # pylint: disable=global-statement
+    if _HTTP is None:
+        _HTTP = httpx.AsyncClient(
+            base_url=API_BASE_URL,
+            headers=_AUTH_HEADERS,
+            timeout=_api_timeout(DEFAULT_TIMEOUT),
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        )
+    return _HTTP
 
 
 def _format_request_error(exc: Exception) -> str:
     message = str(exc)
-    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+    if isinstance(exc, (requests.HTTPError, httpx.HTTPStatusError)) and exc.response is not None:
         try:
-            payload = exc.response.json()
+            payload = _json_loads(exc.response.content)
         except Exception:  # pylint: disable=broad-except
             payload = None
         if isinstance(payload, dict):
@@ -172,56 +317,283 @@ def _resolve_local_path(file_obj: Any) -> Path | None:
     return None
 
 
-def _file_tuple(file_obj: Any) -> Tuple[str, bytes]:
+def _open_upload(file_obj: Any) -> Tuple[str, BinaryIO]:
+    """Open the upload for streaming; httpx reads it chunk by chunk into the multipart body."""
     path = _resolve_local_path(file_obj)
     if path is None:
         raise FileNotFoundError("无法读取文件: 未找到本地路径")
-    content = path.read_bytes()
-    return path.name, content
+    return path.name, path.open("rb")
+
+
+def _fingerprint_upload(handle: BinaryIO, media_type: str, proc_opts_json: str) -> str:
+    """Hash the upload together with the options that change how it is processed."""
+    if xxhash is not None:
+        hasher, algo = xxhash.xxh3_128(), "xxh3_128"
+    else:
+        hasher, algo = hashlib.blake2b(digest_size=16), "blake2b"
+    for block in iter(lambda: handle.read(1 << 20), b""):
+        hasher.update(block)
+    handle.seek(0)
+    hasher.update(f"|{media_type}|{proc_opts_json}".encode("utf-8"))
+    return f"{algo}:{hasher.hexdigest()}"
+
+
+async def _gzip_stream(stream: Any):
+    # Level 1: WAV gains little from higher levels and the console must keep up with the link.
+    compressor = zlib.compressobj(1, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in stream:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _build_upload_request(filename: str, files: Dict[str, Any], data: Dict[str, Any]) -> httpx.Request:
+    """Build the /ingest/upload request, gzipping the whole multipart body for uncompressed media."""
+    client = _http()
+    request = client.build_request("POST", "/ingest/upload", files=files, data=data)
+    if UPLOAD_COMPRESSION != "gzip" or Path(filename).suffix.lower() not in _COMPRESSIBLE_SUFFIXES:
+        return request
+    headers = {name: value for name, value in request.headers.items() if name.lower() != "content-length"}
+    headers["Content-Encoding"] = "gzip"
+    return client.build_request("POST", "/ingest/upload", content=_gzip_stream(request.stream), headers=headers)
+
+
+async def _find_existing_task(content_hash: str) -> Optional[Dict[str, Any]]:
+    try:
+        response = await _http().get("/ingest/exists", params={"hash": content_hash}, timeout=_api_timeout(10))
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+    return _json_loads(response.content)
+
+
+def _gradio_temp_dir() -> Path:
+    return Path(os.environ.get("GRADIO_TEMP_DIR", "/tmp/gradio"))
+
+
+def _gradio_file_route() -> str:
+    # Gradio 5 moved the file route under /gradio_api.
+    try:
+        major = int(str(gr.__version__).split(".", 1)[0])
+    except (AttributeError, ValueError):
+        major = 4
+    return "/gradio_api/file=" if major >= 5 else "/file="
+
+
+def _publish_to_gradio_files(source: bytes | Path, suffix: str) -> Optional[str]:
+    """Place ``source`` in the Gradio temp dir once and return its ``/file=`` URL.
+
+    The browser then fetches it over HTTP (with Range requests for PDFs) instead
+    of receiving a base64 data URI inside every HTML/Markdown update. Bytes are
+    keyed by their full hash, files by path/size/mtime.
+    """
+    hasher = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    if isinstance(source, Path):
+        try:
+            stat = source.stat()
+        except OSError:
+            return None
+        hasher.update(f"{source.resolve()}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8"))
+    else:
+        hasher.update(source)
+    key = f"{hasher.hexdigest()}{suffix.lower()}"
+    with _PUBLISHED_FILES_LOCK:
+        url = _PUBLISHED_FILES.get(key)
+        if url is not None:
+            _PUBLISHED_FILES.move_to_end(key)
+            return url
+    temp_dir = _gradio_temp_dir() / "published"
+    target = temp_dir / key
+    if not target.exists():
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(f".{key}.{os.getpid()}.{threading.get_ident()}.part")
+        try:
+            if isinstance(source, Path):
+                shutil.copyfile(source, partial)
+            else:
+                partial.write_bytes(source)
+            os.replace(partial, target)
+        except OSError:
+            partial.unlink(missing_ok=True)
+            return None
+    url = f"{_gradio_file_route()}{target}"
+    with _PUBLISHED_FILES_LOCK:
+        _PUBLISHED_FILES[key] = url
+        _PUBLISHED_FILES.move_to_end(key)
+        while len(_PUBLISHED_FILES) > _PUBLISHED_FILES_SIZE:
+            _PUBLISHED_FILES.popitem(last=False)
+    return url
 
 
 def _pdf_viewer_html(file_obj: Any) -> str:
     path = _resolve_local_path(file_obj)
     if path is None:
         return "<div class='pdf-preview-placeholder'>等待 PDF 预览</div>"
-    try:
-        data = path.read_bytes()
-    except OSError:
+    url = _publish_to_gradio_files(path, ".pdf")
+    if url is None:
         return "<div class='pdf-preview-placeholder'>PDF 预览加载失败</div>"
-    b64 = base64.b64encode(data).decode("ascii")
     return (
-        "<iframe title='pdf-preview' src='data:application/pdf;base64,"
-        f"{b64}' style='width:100%;height:640px;' frameborder='0'></iframe>"
+        f"<iframe title='pdf-preview' src='{html.escape(url, quote=True)}' "
+        "style='width:100%;height:640px;' frameborder='0'></iframe>"
     )
 
 
-def _decode_mineru_zip(zip_path: Path) -> Dict[str, Any] | None:
+_ZIP_IMAGE_EXTENSIONS = frozenset({"jpg", "jpeg", "png", "gif", "webp"})
+# Decoded image bytes kept per bundle; images past this are re-read from the archive.
+_ZIP_IMAGE_MEMO_BYTES = 32 * 1024 * 1024
+
+
+# middle.json page keys read by the overlay builders and app.utils.draw_bbox.
+_MIDDLE_JSON_PAGE_KEYS = ("page_idx", "page_size", "preproc_blocks", "para_blocks")
+# Above this size middle.json is streamed page by page when ijson is installed.
+_MIDDLE_JSON_STREAM_BYTES = 5_000_000
+
+
+def _trim_middle_page(page: Any) -> Any:
+    if not isinstance(page, dict):
+        return page
+    return {key: page[key] for key in _MIDDLE_JSON_PAGE_KEYS if key in page}
+
+
+def _load_middle_json(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> Dict[str, Any]:
+    """Parse middle.json keeping only ``pdf_info`` and the page keys the UI reads."""
+    if ijson is not None and info.file_size > _MIDDLE_JSON_STREAM_BYTES:
+        # Streams from the archive so neither the raw bytes nor the dropped keys stay resident.
+        with archive.open(info) as handle:
+            pages = [_trim_middle_page(page) for page in ijson.items(handle, "pdf_info.item", use_float=True)]
+        return {"pdf_info": pages}
+    data = _json_loads(archive.read(info))
+    if not isinstance(data, dict):
+        return data
+    pdf_info = data.get("pdf_info")
+    if not isinstance(pdf_info, list):
+        return data
+    return {"pdf_info": [_trim_middle_page(page) for page in pdf_info]}
+
+
+# Bumped whenever the layout of the on-disk bundle index changes.
+_MINERU_INDEX_FORMAT = 2
+
+
+def _mineru_index_path(zip_path: Path, stat: os.stat_result) -> Path:
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(struct.pack("<qqq", _MINERU_INDEX_FORMAT, stat.st_size, stat.st_mtime_ns))
+    hasher.update(str(zip_path).encode("utf-8"))
+    return _gradio_temp_dir() / "mineru_cache" / f"{hasher.hexdigest()}.json"
+
+
+def _load_mineru_index(index_path: Path | None) -> Dict[str, Any] | None:
+    if index_path is None:
+        return None
+    try:
+        # Plain JSON: the cache dir may be writable by others, so it must never hold code (no pickle).
+        index = _json_loads(index_path.read_bytes())
+    except Exception:  # pylint: disable=broad-except
+        return None
+    return index if isinstance(index, dict) else None
+
+
+def _store_mineru_index(index_path: Path | None, index: Dict[str, Any]) -> None:
+    if index_path is None:
+        return
+    partial = index_path.with_name(f".{index_path.stem}.{os.getpid()}.part")
+    try:
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        if orjson is not None:
+            data = orjson.dumps(index)
+        else:
+            data = json.dumps(index, ensure_ascii=False).encode("utf-8")
+        partial.write_bytes(data)
+        os.replace(partial, index_path)
+    except Exception:  # pylint: disable=broad-except
+        partial.unlink(missing_ok=True)
+
+
+def _index_mineru_zip(archive: zipfile.ZipFile) -> Dict[str, Any]:
+    """Parse the markdown and JSON members and list the PDF/image members of a bundle."""
+    index: Dict[str, Any] = {"images": [], "pdf_member": None}
+    pdf_members: List[Tuple[str, str]] = []
+    for info in archive.infolist():
+        member = info.filename
+        lower = member.lower()
+        ext = lower.rsplit(".", 1)[-1]
+        if ext == "md":
+            index["md"] = archive.read(info).decode("utf-8", errors="ignore")
+            index["__md_entry"] = member
+        elif ext == "json" and lower.endswith("middle.json"):
+            index["middle_json"] = _load_middle_json(archive, info)
+        elif ext == "json" and lower.endswith("content_list.json"):
+            index["content_list"] = _json_loads(archive.read(info))
+        elif ext in _ZIP_IMAGE_EXTENSIONS:
+            index["images"].append(member)
+        elif ext == "pdf":
+            pdf_members.append((member, lower))
+    if pdf_members:
+        # Prefer the MinerU layout PDF, then the shortest name.
+        index["pdf_member"] = min(
+            pdf_members, key=lambda item: (0 if item[1].endswith("_layout.pdf") else 1, len(item[0]))
+        )[0]
+    return index
+
+
+def _decode_mineru_zip(zip_path: Path, index_path: Path | None = None) -> Dict[str, Any] | None:
+    """Read the markdown, JSON and preview PDF of a MinerU bundle in one pass.
+
+    The parsed markdown/JSON and the member names are mirrored to ``index_path``
+    so a restarted UI skips the decompression and JSON parsing. Images are only
+    indexed here; ``_read_zip_image`` decompresses them when a markdown
+    reference asks for one, from the archive kept open on the payload.
+    """
     if not zip_path.exists():
         return None
     try:
-        with zipfile.ZipFile(zip_path) as archive:
-            result: Dict[str, Any] = {}
-            image_map: Dict[str, bytes] = {}
-            md_entry: Optional[str] = None
-            for member in archive.namelist():
-                lower = member.lower()
-                data = archive.read(member)
-                if lower.endswith(".md"):
-                    result["md"] = data.decode("utf-8", errors="ignore")
-                    md_entry = member
-                elif lower.endswith("middle.json"):
-                    result["middle_json"] = json.loads(data.decode("utf-8"))
-                elif lower.endswith("content_list.json"):
-                    result["content_list"] = json.loads(data.decode("utf-8"))
-                elif lower.endswith((".jpg", ".jpeg", ".png", ".gif", ".webp")):
-                    image_map[member] = data
-            if image_map:
-                result["__image_map"] = image_map
-            if md_entry:
-                result["__md_entry"] = md_entry
-            return result
+        archive = zipfile.ZipFile(zip_path)
+    except Exception:  # pylint: disable=broad-except
+        return None
+    try:
+        index = _load_mineru_index(index_path)
+        if index is None:
+            index = _index_mineru_zip(archive)
+            _store_mineru_index(index_path, index)
+        result: Dict[str, Any] = {
+            key: index[key] for key in ("md", "middle_json", "content_list", "__md_entry") if key in index
+        }
+        if index.get("pdf_member"):
+            result["__pdf_bytes"] = archive.read(index["pdf_member"])
+        image_map = {member: archive.getinfo(member) for member in index.get("images") or ()}
     except Exception:  # pylint: disable=broad-except
+        archive.close()
         return None
+    if image_map:
+        # The archive closes when the payload is evicted and garbage-collected.
+        result["__image_map"] = image_map
+        result["__zip_archive"] = archive
+        result["__image_memo"] = OrderedDict()
+    else:
+        archive.close()
+    return result
+
+
+def _read_zip_image(zip_payload: Dict[str, Any], info: zipfile.ZipInfo) -> Optional[bytes]:
+    memo: "OrderedDict[str, bytes]" = zip_payload["__image_memo"]
+    with _MINERU_ZIP_CACHE_LOCK:
+        data = memo.get(info.filename)
+        if data is not None:
+            memo.move_to_end(info.filename)
+            return data
+    try:
+        data = zip_payload["__zip_archive"].read(info)
+    except Exception:  # pylint: disable=broad-except
+        return None
+    with _MINERU_ZIP_CACHE_LOCK:
+        memo[info.filename] = data
+        held = sum(len(value) for value in memo.values())
+        while len(memo) > 1 and held > _ZIP_IMAGE_MEMO_BYTES:
+            _name, evicted = memo.popitem(last=False)
+            held -= len(evicted)
+    return data
 
 
 def _guess_mime(path: str) -> str:
@@ -232,112 +604,167 @@ def _guess_mime(path: str) -> str:
 def _find_markdown_file(asset_dir: Path | None) -> Optional[Path]:
     if not asset_dir or not asset_dir.exists():
         return None
-    candidates = sorted(asset_dir.rglob("*.md"))
-    for candidate in candidates:
-        if candidate.is_file():
-            return candidate
+    # Shallowest first, sorted within each directory; stops at the first hit
+    # instead of collecting every per-page markdown under the asset root.
+    for root, dirnames, filenames in os.walk(asset_dir):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.endswith(".md"):
+                return Path(root) / name
     return None
 
 
-def _inline_markdown_images(
-    markdown_text: str,
-    *,
-    asset_root: Path | None = None,
-    zip_payload: Dict[str, Any] | None = None,
-) -> str:
-    if not markdown_text:
-        return ""
-    image_map = (zip_payload or {}).get("__image_map") if zip_payload else None
-    md_entry = (zip_payload or {}).get("__md_entry") if zip_payload else None
-    md_parent = str(PurePosixPath(md_entry).parent) if md_entry else None
+class _ImageReplacer:
+    """``re.sub`` callback publishing each markdown image and rewriting its URL."""
+
+    __slots__ = ("image_map", "zip_payload", "md_parent", "md_parent_prefix", "asset_root")
+
+    def __init__(self, asset_root: Path | None, zip_payload: Dict[str, Any] | None) -> None:
+        self.asset_root = asset_root
+        self.zip_payload = zip_payload
+        self.image_map = zip_payload.get("__image_map") if zip_payload else None
+        md_entry = zip_payload.get("__md_entry") if zip_payload else None
+        self.md_parent = PurePosixPath(md_entry).parent if md_entry else None
+        self.md_parent_prefix = f"{str(self.md_parent).rstrip('/')}/" if self.md_parent else ""
 
-    def _lookup_zip_image(rel_path: str) -> Optional[bytes]:
+    def _lookup_zip_image(self, rel_path: str) -> Optional[bytes]:
+        image_map = self.image_map
         if not image_map:
             return None
         normalized = rel_path.replace("\\", "/").lstrip("./")
         candidate_keys = [normalized]
-        if md_parent:
-            candidate_keys.append(f"{md_parent.rstrip('/')}/{normalized}")
-            candidate_keys.append(str(PurePosixPath(md_parent) / normalized))
+        if self.md_parent:
+            candidate_keys.append(self.md_parent_prefix + normalized)
+            candidate_keys.append(str(self.md_parent / normalized))
         for key in candidate_keys:
             if key in image_map:
-                return image_map[key]
+                return _read_zip_image(self.zip_payload, image_map[key])
         return None
 
-    def _replacer(match: re.Match[str]) -> str:
-        alt_text = match.group(1) or ""
-        rel_path = (match.group(2) or "").strip()
+    def __call__(self, match: re.Match[str]) -> str:
+        alt_text, rel_path = match.groups()
+        rel_path = (rel_path or "").strip()
         if not rel_path:
             return match.group(0)
-        data: Optional[bytes] = None
-        mime: Optional[str] = None
-        if asset_root is not None:
-            file_path = (asset_root / rel_path).resolve()
-            try:
-                if file_path.is_file():
-                    data = file_path.read_bytes()
-                    mime = _guess_mime(file_path.name)
-            except OSError:
-                data = None
-        if data is None:
-            data = _lookup_zip_image(rel_path)
+        url: Optional[str] = None
+        suffix = PurePosixPath(rel_path).suffix
+        if self.asset_root is not None:
+            file_path = (self.asset_root / rel_path).resolve()
+            if file_path.is_file():
+                url = _publish_to_gradio_files(file_path, suffix)
+        if url is None:
+            data = self._lookup_zip_image(rel_path)
             if data:
-                mime = _guess_mime(rel_path)
-        if data is None:
+                url = _publish_to_gradio_files(data, suffix)
+        if url is None:
             return match.group(0)
-        encoded = base64.b64encode(data).decode("ascii")
-        return f"![{alt_text}](data:{mime};base64,{encoded})"
+        return f"![{alt_text or ''}]({url})"
+
 
-    return _MARKDOWN_IMAGE_PATTERN.sub(_replacer, markdown_text)
+def _inline_markdown_images(
+    markdown_text: str,
+    *,
+    asset_root: Path | None = None,
+    zip_payload: Dict[str, Any] | None = None,
+) -> str:
+    if not markdown_text:
+        return ""
+    # Most chunks carry no images; skip the regex scan entirely.
+    if "![" not in markdown_text:
+        return markdown_text
+    return _MARKDOWN_IMAGE_PATTERN.sub(_ImageReplacer(asset_root, zip_payload), markdown_text)
 
 
 def _read_file_bytes(file_path: Path) -> Optional[bytes]:
+    # Keyed by mtime so paging through one document reads the PDF once.
     try:
-        return file_path.read_bytes()
+        mtime = file_path.stat().st_mtime
     except OSError:
         return None
+    return _read_file_bytes_at(str(file_path), mtime)
 
 
-def _extract_pdf_from_zip(zip_path: Path) -> Optional[bytes]:
-    if not zip_path.exists():
-        return None
+@lru_cache(maxsize=8)
+def _read_file_bytes_at(path: str, mtime: float) -> Optional[bytes]:
     try:
-        with zipfile.ZipFile(zip_path) as archive:
-            pdf_members = [name for name in archive.namelist() if name.lower().endswith(".pdf")]
-            if not pdf_members:
-                return None
-            pdf_members.sort(key=lambda name: (0 if name.lower().endswith("_layout.pdf") else 1, len(name)))
-            return archive.read(pdf_members[0])
-    except Exception:  # pylint: disable=broad-except
+        return Path(path).read_bytes()
+    except OSError:
         return None
 
 
+def _payload_nbytes(payload: Dict[str, Any]) -> int:
+    image_map = payload.get("__image_map") or {}
+    # Images are decoded lazily; count what the per-bundle memo may grow to.
+    image_bytes = min(sum(info.file_size for info in image_map.values()), _ZIP_IMAGE_MEMO_BYTES)
+    return len(payload.get("__pdf_bytes") or b"") + len(payload.get("md") or "") + image_bytes
+
+
 def _get_mineru_zip_payload(zip_path: Path) -> Dict[str, Any]:
+    """Decode a MinerU bundle, reusing the result until the file's mtime or size changes.
+
+    The cache is bounded by entry count and by the bytes the payloads hold.
+    """
     cache_key = str(zip_path)
     try:
-        mtime = zip_path.stat().st_mtime
+        stat = zip_path.stat()
     except OSError:
         return {}
-    cached = _MINERU_ZIP_CACHE.get(cache_key)
-    if cached and cached[0] == mtime:
-        return cached[1]
-    payload = _decode_mineru_zip(zip_path) or {}
-    payload["__pdf_bytes"] = _extract_pdf_from_zip(zip_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _MINERU_ZIP_CACHE_LOCK:
+        cached = _MINERU_ZIP_CACHE.get(cache_key)
+        if cached and cached[0] == version:
+            _MINERU_ZIP_CACHE.move_to_end(cache_key)
+            return cached[1]
+        decode_lock = _MINERU_ZIP_DECODE_LOCKS.setdefault(cache_key, threading.Lock())
+    with decode_lock:
+        with _MINERU_ZIP_CACHE_LOCK:
+            cached = _MINERU_ZIP_CACHE.get(cache_key)
+            if cached and cached[0] == version:
+                # Decoded by the thread this one was waiting on.
+                return cached[1]
+        return _decode_and_cache_mineru_zip(zip_path, stat, version)
+
+
+def _decode_and_cache_mineru_zip(zip_path: Path, stat: os.stat_result, version: Tuple[int, int]) -> Dict[str, Any]:
+    global _MINERU_ZIP_CACHE_BYTES  # pylint: disable=global-statement
+    cache_key = str(zip_path)
+    payload = _decode_mineru_zip(zip_path, _mineru_index_path(zip_path, stat)) or {}
     payload["__cached_at"] = time.time()
-    _MINERU_ZIP_CACHE[cache_key] = (mtime, payload)
+    nbytes = _payload_nbytes(payload)
+    with _MINERU_ZIP_CACHE_LOCK:
+        stale = _MINERU_ZIP_CACHE.pop(cache_key, None)
+        if stale:
+            _MINERU_ZIP_CACHE_BYTES -= stale[2]
+        _MINERU_ZIP_CACHE[cache_key] = (version, payload, nbytes)
+        _MINERU_ZIP_CACHE_BYTES += nbytes
+        # Always keep the newest entry, even if it alone exceeds the byte cap.
+        while len(_MINERU_ZIP_CACHE) > 1 and (
+            len(_MINERU_ZIP_CACHE) > _MINERU_ZIP_CACHE_SIZE or _MINERU_ZIP_CACHE_BYTES > _MINERU_ZIP_CACHE_MAX_BYTES
+        ):
+            evicted_key, (_version, _payload, evicted) = _MINERU_ZIP_CACHE.popitem(last=False)
+            _MINERU_ZIP_CACHE_BYTES -= evicted
+            _MINERU_ZIP_DECODE_LOCKS.pop(evicted_key, None)
     return payload
 
 
 def _extract_block_text(block: Dict[str, Any]) -> str:
-    lines = block.get("lines") or []
+    lines = block.get("lines")
+    if not lines:
+        return ""
     pieces: List[str] = []
+    pieces_append = pieces.append
     for line in lines:
-        spans = line.get("spans") or []
+        spans = line.get("spans")
+        if not spans:
+            continue
         for span in spans:
             text = span.get("content") or span.get("text")
             if text:
-                pieces.append(str(text))
-    return "\n".join(piece.strip() for piece in pieces if str(piece).strip()).strip()
+                # Strip once; non-string contents (numbers) are stringified first.
+                piece = text.strip() if isinstance(text, str) else str(text).strip()
+                if piece:
+                    pieces_append(piece)
+    return "\n".join(pieces).strip()
 
 
 def _normalize_page_size(raw: Any) -> Optional[Tuple[float, float]]:
@@ -392,14 +819,49 @@ def _normalize_bbox_coords(raw: Any) -> Optional[Tuple[float, float, float, floa
     return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
 
 
-def _infer_vertical_origin(bbox_list: List[Tuple[float, float, float, float]], page_height: float) -> str:
-    if not bbox_list or page_height <= 0:
+def _infer_vertical_origin(bboxes: "np.ndarray", page_height: float) -> str:
+    """Guess the y-axis origin from the mean vertical midpoint of an (N, 4) bbox array."""
+    if not len(bboxes) or page_height <= 0:
         return "top-left"
-    mids = [((bbox[1] + bbox[3]) / 2.0) / page_height for bbox in bbox_list]
-    avg_mid = sum(mids) / len(mids)
+    avg_mid = float((((bboxes[:, 1] + bboxes[:, 3]) / 2.0) / page_height).mean())
     return "bottom-left" if avg_mid > 0.6 else "top-left"
 
 
+def _is_plain_bbox(raw: Any) -> bool:
+    return isinstance(raw, (list, tuple)) and len(raw) == 4 and all(isinstance(val, (int, float)) for val in raw)
+
+
+def _normalize_page_bboxes(raw_bboxes: List[Any]) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Normalize a page's bboxes to (x_min, y_min, x_max, y_max) rows plus a validity mask.
+
+    Plain ``[x0, y0, x1, y1]`` lists (the usual MinerU shape) are handled as one
+    array; dict, point-pair and polygon shapes go through ``_normalize_bbox_coords``.
+    """
+    count = len(raw_bboxes)
+    out = np.zeros((count, 4), dtype=np.float64)
+    valid = np.zeros(count, dtype=bool)
+    plain_idx = [idx for idx, raw in enumerate(raw_bboxes) if _is_plain_bbox(raw)]
+    if plain_idx:
+        arr = np.asarray([raw_bboxes[idx] for idx in plain_idx], dtype=np.float64)
+        out[plain_idx] = np.column_stack(
+            (
+                np.minimum(arr[:, 0], arr[:, 2]),
+                np.minimum(arr[:, 1], arr[:, 3]),
+                np.maximum(arr[:, 0], arr[:, 2]),
+                np.maximum(arr[:, 1], arr[:, 3]),
+            )
+        )
+        valid[plain_idx] = (arr[:, 0] != arr[:, 2]) & (arr[:, 1] != arr[:, 3])
+    for idx, raw in enumerate(raw_bboxes):
+        if raw is None or _is_plain_bbox(raw):
+            continue
+        bbox = _normalize_bbox_coords(raw)
+        if bbox:
+            out[idx] = bbox
+            valid[idx] = True
+    return out, valid
+
+
 def _prepare_overlay_payload(zip_payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     middle_json = zip_payload.get("middle_json")
     if not isinstance(middle_json, dict):
@@ -422,24 +884,19 @@ def _prepare_overlay_payload(zip_payload: Dict[str, Any]) -> Optional[Dict[str,
         raw_blocks = info.get("preproc_blocks") or []
         if not isinstance(raw_blocks, list):
             continue
-        normalized_blocks: List[Dict[str, Any]] = []
-        bbox_samples: List[Tuple[float, float, float, float]] = []
-        for block in raw_blocks:
-            if not isinstance(block, dict):
-                continue
-            bbox = _normalize_bbox_coords(block.get("bbox"))
-            if not bbox:
-                continue
-            bbox_samples.append(bbox)
-            normalized_blocks.append(
-                {
-                    "bbox": bbox,
-                    "text": block.get("text") or _extract_block_text(block),
-                    "type": block.get("type"),
-                }
-            )
-        if not normalized_blocks:
+        dict_blocks = [block for block in raw_blocks if isinstance(block, dict)]
+        bboxes, valid = _normalize_page_bboxes([block.get("bbox") for block in dict_blocks])
+        if not valid.any():
             continue
+        bboxes = bboxes[valid]
+        normalized_blocks = [
+            {
+                "bbox": tuple(bbox),
+                "text": block.get("text") or _extract_block_text(block),
+                "type": block.get("type"),
+            }
+            for block, bbox in zip((block for block, ok in zip(dict_blocks, valid) if ok), bboxes.tolist())
+        ]
         page_number = int(info.get("page_idx", idx - 1)) + 1
         overlay_pages.append(
             {
@@ -448,7 +905,9 @@ def _prepare_overlay_payload(zip_payload: Dict[str, Any]) -> Optional[Dict[str,
                 "height": height,
                 "ratio": page_ratio,
                 "blocks": normalized_blocks,
-                "origin": _infer_vertical_origin(bbox_samples, height),
+                # Rows line up with ``blocks``.
+                "bboxes_arr": bboxes,
+                "origin": _infer_vertical_origin(bboxes, height),
             }
         )
         total_ratio += page_ratio
@@ -457,14 +916,42 @@ def _prepare_overlay_payload(zip_payload: Dict[str, Any]) -> Optional[Dict[str,
     return {"pages": overlay_pages, "total_ratio": total_ratio}
 
 
+def _get_overlay_payload(zip_payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return the overlay data for a bundle, deriving it once per cached zip payload."""
+    if "__overlay_payload" not in zip_payload:
+        overlay_payload = _prepare_overlay_payload(zip_payload)
+        if overlay_payload:
+            overlay_payload["page_index"] = {page["page_number"]: page for page in overlay_payload["pages"]}
+        zip_payload["__overlay_payload"] = overlay_payload
+    return zip_payload["__overlay_payload"]
+
+
+# MinerU block types, escaped once for the overlay labels.
+_ESCAPED_LABELS = {
+    label: html.escape(label)
+    for label in ("block", "text", "title", "table", "image", "equation", "interline_equation", "list", "reference")
+}
+_OVERLAY_BOX_TEMPLATE = (
+    "<div class='pdf-overlay-box' style='left:{left:.3f}%;top:{top:.3f}%;width:{width:.3f}%;"
+    "height:{height:.3f}%;' title='{title}'>{label}</div>"
+)
+
+
 def _build_overlay_markup(zip_payload: Dict[str, Any]) -> Tuple[Optional[str], Optional[float]]:
-    overlay_payload = _prepare_overlay_payload(zip_payload)
+    """Full-document overlay HTML; built once per cached bundle."""
+    cached = zip_payload.get("__overlay_html_full")
+    if cached is not None:
+        return cached
+    overlay_payload = _get_overlay_payload(zip_payload)
     if not overlay_payload:
         return None, None
     pages = overlay_payload["pages"]
     total_ratio = overlay_payload["total_ratio"]
+    html_escape = html.escape
+    box_format = _OVERLAY_BOX_TEMPLATE.format
     cumulative = 0.0
     parts = ["<div class='pdf-overlay-canvas'>"]
+    parts_append = parts.append
     for page in pages:
         page_ratio = page["ratio"]
         page_height_percent = (page_ratio / total_ratio) * 100.0
@@ -483,71 +970,81 @@ def _build_overlay_markup(zip_payload: Dict[str, Any]) -> Tuple[Optional[str], O
             left_pct, top_pct, width_pct, height_pct = style
             label = block.get("type") or "block"
             tooltip = block.get("text") or label
-            parts.append(
-                (
-                    "<div class='pdf-overlay-box' style='"
-                    f"left:{left_pct:.3f}%;top:{top_pct:.3f}%;width:{width_pct:.3f}%;"
-                    f"height:{height_pct:.3f}%;' title='{html.escape(tooltip[:240])}'>" 
-                    f"{html.escape(label)}"
-                    "</div>"
+            parts_append(
+                box_format(
+                    left=left_pct,
+                    top=top_pct,
+                    width=width_pct,
+                    height=height_pct,
+                    title=html_escape(tooltip[:240]),
+                    label=_ESCAPED_LABELS.get(label) or html_escape(label),
                 )
             )
         parts.append("</div>")
         cumulative += page_ratio
     parts.append("</div>")
-    return "".join(parts), total_ratio
+    zip_payload["__overlay_html_full"] = ("".join(parts), total_ratio)
+    return zip_payload["__overlay_html_full"]
 
 
 def _build_single_page_overlay(zip_payload: Dict[str, Any], page_num: int) -> Tuple[Optional[str], int]:
     """Build overlay for a single page, returns HTML and total page count."""
-    overlay_payload = _prepare_overlay_payload(zip_payload)
+    page_cache: Dict[int, Tuple[Optional[str], int]] = zip_payload.setdefault("__overlay_html_pages", {})
+    cached = page_cache.get(page_num)
+    if cached is not None:
+        return cached
+    page_cache[page_num] = _render_single_page_overlay(zip_payload, page_num)
+    return page_cache[page_num]
+
+
+def _render_single_page_overlay(zip_payload: Dict[str, Any], page_num: int) -> Tuple[Optional[str], int]:
+    overlay_payload = _get_overlay_payload(zip_payload)
     if not overlay_payload:
         return None, 0
-    pages = overlay_payload["pages"]
-    total_pages = len(pages)
-    target_page = None
-    for page in pages:
-        if page["page_number"] == page_num:
-            target_page = page
-            break
+    total_pages = len(overlay_payload["pages"])
+    target_page = overlay_payload["page_index"].get(page_num)
     if not target_page:
         return None, total_pages
     parts = ["<div class='pdf-overlay-canvas' style='position:relative;width:100%;height:100%;'>"]
-    for block in target_page["blocks"]:
-        bbox = block["bbox"]
-        width = float(target_page.get("width") or 0)
-        height = float(target_page.get("height") or 0)
-        if width <= 0 or height <= 0:
-            continue
-        x0, y0, x1, y1 = bbox
-        frac_space = max(abs(v) for v in bbox) <= 1.2
-        if frac_space:
-            left_pct = min(x0, x1) * 100.0
-            width_pct = abs(x1 - x0) * 100.0
-            top_pct = min(y0, y1) * 100.0
-            height_pct = abs(y1 - y0) * 100.0
+    width = float(target_page.get("width") or 0)
+    height = float(target_page.get("height") or 0)
+    if width > 0 and height > 0:
+        # Percent geometry for every block at once; rows follow target_page["blocks"].
+        arr = target_page["bboxes_arr"]
+        x0, y0, x1, y1 = arr[:, 0], arr[:, 1], arr[:, 2], arr[:, 3]
+        frac_space = np.abs(arr).max(axis=1) <= 1.2
+        html_escape = html.escape
+        box_format = _OVERLAY_BOX_TEMPLATE.format
+        parts_append = parts.append
+        x_min, y_min, y_max = np.minimum(x0, x1), np.minimum(y0, y1), np.maximum(y0, y1)
+        x_span, y_span = np.abs(x1 - x0), np.abs(y1 - y0)
+        if (target_page.get("origin") or "top-left") == "bottom-left":
+            page_top = (1.0 - y_max / height) * 100.0
         else:
-            left_pct = (min(x0, x1) / width) * 100.0
-            width_pct = (abs(x1 - x0) / width) * 100.0
-            origin = target_page.get("origin") or "top-left"
-            if origin == "bottom-left":
-                top_pct = (1.0 - max(y0, y1) / height) * 100.0
-            else:
-                top_pct = (min(y0, y1) / height) * 100.0
-            height_pct = (abs(y1 - y0) / height) * 100.0
-        left_pct = max(0.0, min(left_pct, 100.0))
-        width_pct = max(0.2, min(width_pct, 100.0))
-        top_pct = max(0.0, min(top_pct, 100.0))
-        height_pct = max(0.2, min(height_pct, 100.0))
-        label = block.get("type") or "block"
-        tooltip = block.get("text") or label
-        parts.append(
-            f"<div class='pdf-overlay-box' style='left:{left_pct:.3f}%;top:{top_pct:.3f}%;"
-            f"width:{width_pct:.3f}%;height:{height_pct:.3f}%;' "
-            f"title='{html.escape(tooltip[:240])}'>{html.escape(label)}</div>"
-        )
+            page_top = (y_min / height) * 100.0
+        left = np.clip(np.where(frac_space, x_min * 100.0, (x_min / width) * 100.0), 0.0, 100.0)
+        box_width = np.clip(np.where(frac_space, x_span * 100.0, (x_span / width) * 100.0), 0.2, 100.0)
+        top = np.clip(np.where(frac_space, y_min * 100.0, page_top), 0.0, 100.0)
+        box_height = np.clip(np.where(frac_space, y_span * 100.0, (y_span / height) * 100.0), 0.2, 100.0)
+        for block, left_pct, top_pct, width_pct, height_pct in zip(
+            target_page["blocks"], left.tolist(), top.tolist(), box_width.tolist(), box_height.tolist()
+        ):
+            label = block.get("type") or "block"
+            tooltip = block.get("text") or label
+            parts_append(
+                box_format(
+                    left=left_pct,
+                    top=top_pct,
+                    width=width_pct,
+                    height=height_pct,
+                    title=html_escape(tooltip[:240]),
+                    label=_ESCAPED_LABELS.get(label) or html_escape(label),
+                )
+            )
     parts.append("</div>")
     return "".join(parts), total_pages
+
+
 def _compute_block_style(
     bbox: Tuple[float, float, float, float],
     page: Dict[str, Any],
@@ -613,29 +1110,25 @@ def _build_remote_pdf_preview(task: Dict[str, Any]) -> str | None:
     result = task.get("result") or {}
     if not pdf_path:
         pdf_path = result.get("pdf_preview_path")
-    pdf_bytes = _read_file_bytes(Path(pdf_path)) if pdf_path else None
+    pdf_url = _publish_to_gradio_files(Path(pdf_path), ".pdf") if pdf_path else None
     zip_payload: Optional[Dict[str, Any]] = None
     zip_path = artifacts.get("mineru_bundle_path") or artifacts.get("mineru_zip_path")
     if zip_path:
         zip_payload = _get_mineru_zip_payload(Path(zip_path))
-        if not pdf_bytes and zip_payload:
-            pdf_bytes = zip_payload.get("__pdf_bytes")  # type: ignore[assignment]
-    if not pdf_bytes:
+        if not pdf_url and zip_payload and zip_payload.get("__pdf_bytes"):
+            pdf_url = _publish_to_gradio_files(zip_payload["__pdf_bytes"], ".pdf")
+    if not pdf_url:
         return "<div class='pdf-preview-placeholder'>未找到 PDF 预览资源</div>"
     overlay_html = None
     total_ratio = None
     if zip_payload:
         overlay_html, total_ratio = _build_overlay_markup(zip_payload)
-    b64 = base64.b64encode(pdf_bytes).decode("ascii")
     classes = ["pdf-preview-stack"]
     sizer = ""
     if overlay_html and total_ratio:
         classes.append("has-overlay")
         sizer = "<div class='pdf-preview-sizer'></div>"
-    iframe_tag = (
-        "<iframe class='pdf-preview-frame' title='pdf-preview' src='data:application/pdf;base64,"
-        f"{b64}'></iframe>"
-    )
+    iframe_tag = f"<iframe class='pdf-preview-frame' title='pdf-preview' src='{html.escape(pdf_url, quote=True)}'></iframe>"
     style_attr = f" style='--pdf-total-ratio:{total_ratio:.6f};'" if total_ratio else ""
     parts = [f"<div class='{' '.join(classes)}'{style_attr}>", sizer, iframe_tag]
     if overlay_html:
@@ -644,6 +1137,17 @@ def _build_remote_pdf_preview(task: Dict[str, Any]) -> str | None:
     return "".join(parts)
 
 
+@lru_cache(maxsize=64)
+def _render_markdown_file(path: str, mtime_ns: int) -> Tuple[str, str]:
+    """Read and render a markdown file once per modification time."""
+    md_path = Path(path)
+    try:
+        md_text = md_path.read_text(encoding="utf-8")
+    except UnicodeDecodeError:
+        md_text = md_path.read_text(encoding="utf-8", errors="ignore")
+    return _inline_markdown_images(md_text, asset_root=md_path.parent), md_text
+
+
 def _build_mineru_markdown_preview(task: Dict[str, Any]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
     if not isinstance(task, dict):
         return None, None, None
@@ -663,19 +1167,25 @@ def _build_mineru_markdown_preview(task: Dict[str, Any]) -> Tuple[Optional[str],
     zip_payload = None
     if bundle_path:
         zip_payload = _get_mineru_zip_payload(Path(bundle_path))
+        # Rendered once per cached bundle; the asset dir is written by the same ingest run.
+        cached = zip_payload.get("__md_rendered")
+        if cached is not None and cached[0] == asset_dir_value:
+            return cached[1], cached[2], bundle_path
     md_path = _find_markdown_file(asset_dir)
     md_text: Optional[str] = None
     md_rendered: Optional[str] = None
     if md_path:
         try:
-            md_text = md_path.read_text(encoding="utf-8")
-        except UnicodeDecodeError:
-            md_text = md_path.read_text(encoding="utf-8", errors="ignore")
-        md_rendered = _inline_markdown_images(md_text, asset_root=md_path.parent)
+            mtime_ns = md_path.stat().st_mtime_ns
+        except OSError:
+            mtime_ns = 0
+        md_rendered, md_text = _render_markdown_file(str(md_path), mtime_ns)
     elif zip_payload and isinstance(zip_payload.get("md"), str):
         md_text = zip_payload.get("md")  # type: ignore[assignment]
     if md_text and not md_rendered:
         md_rendered = _inline_markdown_images(md_text, asset_root=asset_dir, zip_payload=zip_payload)
+    if zip_payload:
+        zip_payload["__md_rendered"] = (asset_dir_value, md_rendered, md_text)
     return md_rendered, md_text, bundle_path
 
 
@@ -683,32 +1193,125 @@ def _save_pdf_to_temp(pdf_bytes: bytes, task_id: str) -> str:
     """Save PDF to Gradio temp directory and return relative path."""
     temp_dir = Path(os.environ.get("GRADIO_TEMP_DIR", "/tmp/gradio"))
     temp_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Use task_id as filename to enable caching
-    pdf_file = temp_dir / f"pdf_{task_id}.pdf"
-    
-    # Only write if file doesn't exist or is different
-    if not pdf_file.exists() or pdf_file.stat().st_size != len(pdf_bytes):
-        pdf_file.write_bytes(pdf_bytes)
-    
+
+    # Named by content so a regenerated PDF of the same size never reuses stale bytes.
+    hasher = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    hasher.update(pdf_bytes)
+    pdf_file = temp_dir / f"pdf_{task_id}_{hasher.hexdigest()[:24]}.pdf"
+    if pdf_file.exists():
+        return str(pdf_file)
+
+    # Write-then-rename so concurrent requests never observe a torn file.
+    with tempfile.NamedTemporaryFile(dir=temp_dir, prefix=f".pdf_{task_id}.", suffix=".part", delete=False) as tmp:
+        tmp.write(pdf_bytes)
+    try:
+        os.replace(tmp.name, pdf_file)
+    except OSError:
+        os.unlink(tmp.name)
+        raise
     return str(pdf_file)
 
 
+def _fetch_task(task_id: str) -> Dict[str, Any]:
+    """GET /tasks/{task_id} over the pooled session; finished tasks are served from a short-lived cache."""
+    now = time.monotonic()
+    with _DONE_TASK_CACHE_LOCK:
+        cached = _DONE_TASK_CACHE.get(task_id)
+        if cached is not None and now - cached[0] < _DONE_TASK_CACHE_TTL_SECONDS:
+            _DONE_TASK_CACHE.move_to_end(task_id)
+            return cached[1]
+    resp = _SESSION.get(f"{API_BASE_URL}/tasks/{task_id}", timeout=(API_CONNECT_TIMEOUT, 15))
+    resp.raise_for_status()
+    task = _json_loads(resp.content)
+    if task.get("status") in _TERMINAL_STATUSES:
+        with _DONE_TASK_CACHE_LOCK:
+            _DONE_TASK_CACHE[task_id] = (now, task)
+            _DONE_TASK_CACHE.move_to_end(task_id)
+            while len(_DONE_TASK_CACHE) > _DONE_TASK_CACHE_SIZE:
+                _DONE_TASK_CACHE.popitem(last=False)
+    return task
+
+
+def _render_version(*paths: Optional[str]) -> str:
+    """Short digest of the inputs' stat, so re-ingested bundles render to new files."""
+    hasher = hashlib.blake2b(digest_size=8)
+    for value in paths:
+        if not value:
+            continue
+        try:
+            stat = os.stat(value)
+        except OSError:
+            continue
+        hasher.update(f"{value}\0{stat.st_mtime_ns}\0{stat.st_size}\0".encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def _draw_annotated_page(pdf_info_page: Dict[str, Any], pdf_bytes: bytes, page_index: int, output_path: Path) -> Optional[str]:
+    if output_path.exists():
+        return str(output_path)
+    # Add parent directory to path for app imports
+    import sys
+    project_root = Path(__file__).parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+    from app.utils.draw_bbox import draw_layout_bbox_on_single_page
+
+    partial = output_path.with_name(f".{output_path.stem}.{os.getpid()}.{threading.get_ident()}.part")
+    try:
+        rendered = draw_layout_bbox_on_single_page(
+            pdf_info_page=pdf_info_page,
+            pdf_bytes=pdf_bytes,
+            page_index=page_index,
+            output_path=str(partial),
+        )
+        if not rendered or not partial.exists():
+            return None
+        os.replace(partial, output_path)
+    finally:
+        partial.unlink(missing_ok=True)
+    return str(output_path)
+
+
+def _submit_page_render(
+    pdf_info_page: Dict[str, Any], pdf_bytes: bytes, page_index: int, output_path: Path
+) -> "Future[Optional[str]]":
+    """Queue a page render on the shared pool, joining one already running for ``output_path``."""
+    key = str(output_path)
+    with _PDF_RENDER_LOCK:
+        future = _PDF_RENDER_INFLIGHT.get(key)
+        if future is None:
+            future = _PDF_RENDER_POOL.submit(_draw_annotated_page, pdf_info_page, pdf_bytes, page_index, output_path)
+            _PDF_RENDER_INFLIGHT[key] = future
+            future.add_done_callback(lambda _done: _PDF_RENDER_INFLIGHT.pop(key, None))
+    return future
+
+
+def _render_error(title: str, exc: Exception) -> str:
+    if _PDF_RENDER_DEBUG:
+        return f"{title}: {exc}\n\n```\n{traceback.format_exc()}\n```"
+    return f"{title}: {type(exc).__name__}: {exc}"
+
+
 def render_pdf_page(
     task_id: str,
     page_num: int,
+    prefetch: Optional[int] = None,
 ) -> Tuple[Optional[str], str, int, int]:
-    """Render a single PDF page with MinerU bbox overlays. Returns (pdf_file_path, overlay_info_md, current_page, total_pages)."""
+    """Render a single PDF page with MinerU bbox overlays. Returns (pdf_file_path, overlay_info_md, current_page, total_pages).
+
+    ``prefetch`` overrides how many pages on each side are rendered ahead (``PDF_PREFETCH_PAGES``).
+    """
     if not task_id:
         return None, "⚠️ 等待任务", 1, 1
     try:
-        resp = requests.get(f"{API_BASE_URL}/tasks/{task_id}", headers=_headers(), timeout=15)
-        resp.raise_for_status()
-        task = resp.json()
+        task = _fetch_task(task_id)
     except Exception as exc:  # pylint: disable=broad-except
-        import traceback
-        error_detail = f"❌ 加载失败: {exc}\n\n```\n{traceback.format_exc()}\n```"
-        return None, error_detail, 1, 1
+        return None, _render_error("❌ 加载失败", exc), 1, 1
+    
+    status = task.get("status")
+    if status and status not in _TERMINAL_STATUSES:
+        return None, "⏳ 任务处理中", 1, 1
     
     # Check task structure - artifacts can be at multiple levels
     result = task.get("result") or {}
@@ -740,6 +1343,7 @@ def render_pdf_page(
         return None, debug_info, 1, 1
     zip_payload = _get_mineru_zip_payload(Path(bundle_path))
     pdf_bytes = zip_payload.get("__pdf_bytes")
+    pdf_path_value = None
     if not pdf_bytes:
         pdf_path_value = artifacts.get("mineru_layout_pdf_path") or artifacts.get("pdf_source_path")
         if pdf_path_value:
@@ -769,27 +1373,27 @@ def render_pdf_page(
     
     # Generate annotated PDF with bbox overlays using MinerU's approach
     try:
-        # Add parent directory to path for app imports
-        import sys
-        project_root = Path(__file__).parent.parent
-        if str(project_root) not in sys.path:
-            sys.path.insert(0, str(project_root))
-        
-        from app.utils.draw_bbox import draw_layout_bbox_on_single_page
-        
         temp_dir = Path(os.environ.get("GRADIO_TEMP_DIR", "/tmp/gradio"))
         temp_dir.mkdir(parents=True, exist_ok=True)
         
-        output_filename = f"pdf_{task_id}_page{current_page}_layout.pdf"
+        # Versioned by the bundle/PDF stat: revisiting a page reuses the file on disk.
+        render_version = _render_version(bundle_path, pdf_path_value)
+        output_filename = f"pdf_{task_id}_page{current_page}_{render_version}_layout.pdf"
         output_path = temp_dir / output_filename
         
-        annotated_pdf_path = draw_layout_bbox_on_single_page(
-            pdf_info_page=pdf_info_page,
-            pdf_bytes=pdf_bytes,
-            page_index=page_index,
-            output_path=str(output_path)
+        annotated_pdf_path = _submit_page_render(pdf_info_page, pdf_bytes, page_index, output_path).result(
+            timeout=_PDF_RENDER_TIMEOUT_SECONDS
         )
         
+        # Pages are usually read in order; render the neighbours while this one is viewed.
+        for offset in range(1, (_PDF_PREFETCH_PAGES if prefetch is None else prefetch) + 1):
+            for neighbour in (current_page + offset, current_page - offset):
+                if not 1 <= neighbour <= total_pages:
+                    continue
+                neighbour_path = temp_dir / f"pdf_{task_id}_page{neighbour}_{render_version}_layout.pdf"
+                if not neighbour_path.exists():
+                    _submit_page_render(pdf_info[neighbour - 1], pdf_bytes, neighbour - 1, neighbour_path)
+        
         if not annotated_pdf_path or not Path(annotated_pdf_path).exists():
             return None, f"❌ 生成带标注的 PDF 失败", current_page, total_pages
         
@@ -827,24 +1431,36 @@ def render_pdf_page(
         return annotated_pdf_path, overlay_info, current_page, total_pages
         
     except Exception as exc:  # pylint: disable=broad-except
-        import traceback
-        error_detail = f"❌ 生成 bbox 标注失败: {exc}\n\n```\n{traceback.format_exc()}\n```"
-        return None, error_detail, current_page, total_pages
+        return None, _render_error("❌ 生成 bbox 标注失败", exc), current_page, total_pages
 
 
-def submit_ingest(
+def _frame_options(frame_strategy: str, frame_interval: float, scene_threshold: float) -> Dict[str, Any]:
+    return {
+        "frame_strategy": frame_strategy,
+        "frame_interval_seconds": frame_interval,
+        "scene_threshold": scene_threshold,
+    }
+
+
+@lru_cache(maxsize=64)
+def _frame_options_json(frame_strategy: str, frame_interval: float, scene_threshold: float) -> str:
+    # The frame settings rarely change between submits; encode each combination once.
+    return _json_dumps(_frame_options(frame_strategy, frame_interval, scene_threshold))
+
+
+async def submit_ingest(
     file_obj: Any,
     media_type: str,
     title: str,
     description: str,
     tags_text: str,
-    frame_strategy: str,
-    frame_interval: float,
-    scene_threshold: float,
+    frame_strategy: str = "interval",
+    frame_interval: float = 1.0,
+    scene_threshold: float = 0.3,
     pdf_options: Dict[str, Any] | None = None,
 ) -> Tuple[str, str, Dict[str, Any]]:
     try:
-        filename, payload = _file_tuple(file_obj)
+        filename, handle = _open_upload(file_obj)
     except Exception as exc:  # pylint: disable=broad-except
         return f"❌ 上传失败: {exc}", "", {}
 
@@ -853,32 +1469,42 @@ def submit_ingest(
         "description": description or None,
         "tags": _normalize_tags(tags_text),
     }
-    proc_opts = {
-        "frame_strategy": frame_strategy,
-        "frame_interval_seconds": frame_interval,
-        "scene_threshold": scene_threshold,
-    }
     if pdf_options:
-        proc_opts.update(pdf_options)
-    files = {"file": (filename, payload)}
+        # Frame extraction does not apply to PDFs; the API fills in its defaults.
+        proc_opts_json = _json_dumps(pdf_options)
+    else:
+        proc_opts_json = _frame_options_json(frame_strategy, frame_interval, scene_threshold)
+    try:
+        # Hashing runs at local disk speed; resending a file the API already has costs far more.
+        content_hash = await asyncio.to_thread(_fingerprint_upload, handle, media_type, proc_opts_json)
+    except OSError as exc:
+        handle.close()
+        return f"❌ 上传失败: {exc}", "", {}
+    existing = await _find_existing_task(content_hash)
+    if existing is not None:
+        handle.close()
+        task_id = existing.get("task_id", "")
+        message = f"♻️ 相同文件已提交过，复用任务 {task_id}，当前状态：{existing.get('status', 'pending')}"
+        return message, task_id, existing
+
+    files = {"file": (filename, handle, "application/octet-stream")}
     data = {
         "media_type": media_type,
-        "metadata": json.dumps(metadata, ensure_ascii=False),
-        "processing_options": json.dumps(proc_opts, ensure_ascii=False),
+        "metadata": _json_dumps(metadata),
+        "processing_options": proc_opts_json,
+        "content_hash": content_hash,
     }
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/ingest/upload",
-            files=files,
-            data=data,
-            headers=_headers(),
-            timeout=DEFAULT_TIMEOUT,
-        )
+        response = await _http().send(_build_upload_request(filename, files, data))
         response.raise_for_status()
     except Exception as exc:  # pylint: disable=broad-except
         return f"❌ 创建任务失败: {_format_request_error(exc)}", "", {}
+    finally:
+        handle.close()
 
-    payload = response.json()
+    # New content is on its way into the index; stop serving cached hits.
+    _QUERY_CACHE.clear()
+    payload = _json_loads(response.content)
     task_id = payload.get("task_id", "")
     status = payload.get("status", "pending")
     message = f"✅ 任务 {task_id} 已创建，当前状态：{status}"
@@ -941,7 +1567,7 @@ def _build_pdf_options(
     return {"mineru": options}
 
 
-def submit_pdf_pipeline(
+async def submit_pdf_pipeline(
     file_obj: Any,
     title: str,
     description: str,
@@ -982,112 +1608,198 @@ def submit_pdf_pipeline(
         )
     except ValueError as exc:
         return f"❌ 参数错误：{exc}", "", {}
-    return submit_ingest(
+    return await submit_ingest(
         file_obj=file_obj,
         media_type="pdf",
         title=title,
         description=description,
         tags_text=tags_text,
-        frame_strategy="interval",
-        frame_interval=1.0,
-        scene_threshold=0.3,
         pdf_options=pdf_options,
     )
 
 
 def format_hits(hits: List[Dict[str, Any]]) -> str:
-    if not hits:
-        return "暂无匹配结果"
-    blocks: List[str] = []
+    parts: List[str] = []
+    append = parts.append
     for idx, hit in enumerate(hits, start=1):
-        lines = [f"**结果 {idx}**"]
-        title = hit.get("title") or hit.get("document_id")
-        media_path = hit.get("path")
-        lines.append(f"标题：{title}")
-        if media_path:
-            lines.append(f"来源：`{media_path}`")
-        snippet = hit.get("content")
+        get = hit.get
+        path = get("path")
+        snippet = get("content")
         if isinstance(snippet, str):
             snippet = snippet[:500]
-        lines.append(f"内容：{snippet}")
-        temporal = hit.get("temporal")
+        if idx > 1:
+            append("")
+        append(f"**结果 {idx}**\n标题：{get('title') or get('document_id')}")
+        if path:
+            append(f"来源：`{path}`")
+        append(f"内容：{snippet}")
+        temporal = get("temporal")
         if temporal:
-            start = temporal.get("start_time")
-            end = temporal.get("end_time")
-            lines.append(f"时间段：{start:.2f}s - {end:.2f}s")
-        video_path = hit.get("video_path") or hit.get("path")
+            append(f"时间段：{temporal.get('start_time'):.2f}s - {temporal.get('end_time'):.2f}s")
+        video_path = get("video_path") or path
         if video_path:
-            lines.append(f"视频：`{video_path}`")
-        audio_path = hit.get("audio_path")
+            append(f"视频：`{video_path}`")
+        audio_path = get("audio_path")
         if audio_path:
-            lines.append(f"音频：`{audio_path}`")
-        blocks.append("\n".join(lines))
-    return "\n\n".join(blocks)
+            append(f"音频：`{audio_path}`")
+    return "\n".join(parts) if parts else "暂无匹配结果"
+
+
+async def _post_query(query: str, top_k: int) -> List[Dict[str, Any]]:
+    response = await _http().post("/query", json={"query": query.strip(), "top_k": top_k}, timeout=_api_timeout(30))
+    response.raise_for_status()
+    return _json_loads(response.content).get("hits", [])
+
+
+def _query_key(query: str, top_k: int) -> Tuple[str, int]:
+    return " ".join(query.split()).casefold(), int(top_k)
 
 
-def run_query(query: str, top_k: int) -> str:
+def _cached_hits(key: Tuple[str, int]) -> Optional[List[Dict[str, Any]]]:
+    cached = _QUERY_CACHE.get(key)
+    if cached is None or time.monotonic() - cached[0] >= _QUERY_CACHE_TTL_SECONDS:
+        return None
+    _QUERY_CACHE.move_to_end(key)
+    return cached[1]
+
+
+def _cache_hits(key: Tuple[str, int], issued_at: float, hits: List[Dict[str, Any]]) -> None:
+    _QUERY_CACHE[key] = (issued_at, hits)
+    _QUERY_CACHE.move_to_end(key)
+    while len(_QUERY_CACHE) > _QUERY_CACHE_SIZE:
+        _QUERY_CACHE.popitem(last=False)
+
+
+async def _query_api(query: str, top_k: int) -> List[Dict[str, Any]]:
+    """POST /query, answering repeats of the same normalized query from a short-lived LRU.
+
+    Concurrent identical queries share one in-flight request.
+    """
+    key = _query_key(query, top_k)
+    now = time.monotonic()
+    cached = _cached_hits(key)
+    if cached is not None:
+        return cached
+    task = _QUERY_INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_post_query(query, top_k))
+        _QUERY_INFLIGHT[key] = task
+        task.add_done_callback(lambda _done: _QUERY_INFLIGHT.pop(key, None))
+    # shield: one caller going away must not cancel the request the others await.
+    hits = await asyncio.shield(task)
+    if hits is None:
+        # The streaming request we waited on failed or was abandoned; ask on our own.
+        hits = await _post_query(query, top_k)
+    _cache_hits(key, now, hits)
+    return hits
+
+
+async def _stream_query(query: str, top_k: int):
+    """Yield the growing hit list from POST /query/stream as NDJSON lines arrive.
+
+    Cached and already in-flight queries yield their full result once. While
+    streaming, identical ``_query_api`` calls wait for this request instead of
+    sending their own.
+    """
+    key = _query_key(query, top_k)
+    cached = _cached_hits(key)
+    if cached is not None:
+        yield cached
+        return
+    if key in _QUERY_INFLIGHT:
+        yield await _query_api(query, top_k)
+        return
+    now = time.monotonic()
+    shared: "asyncio.Future[Optional[List[Dict[str, Any]]]]" = asyncio.get_running_loop().create_future()
+    _QUERY_INFLIGHT[key] = shared
+    hits: List[Dict[str, Any]] = []
+    try:
+        async with _http().stream(
+            "POST", "/query/stream", json={"query": query.strip(), "top_k": top_k}, headers=_STREAM_HEADERS, timeout=_api_timeout(30)
+        ) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if line:
+                    hits.append(_json_loads(line))
+                    yield hits
+        if not hits:
+            yield hits
+        _cache_hits(key, now, hits)
+        shared.set_result(hits)
+    finally:
+        _QUERY_INFLIGHT.pop(key, None)
+        if not shared.done():
+            shared.set_result(None)
+
+
+async def run_query(query: str, top_k: int) -> str:
     if not query.strip():
         return "请输入查询语句"
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/query",
-            json={"query": query, "top_k": top_k},
-            headers=_headers(),
-            timeout=30,
-        )
-        response.raise_for_status()
+        hits = await _query_api(query, top_k)
     except Exception as exc:  # pylint: disable=broad-except
         return f"查询失败：{_format_request_error(exc)}"
-    data = response.json()
-    hits = data.get("hits", [])
     return format_hits(hits)
 
 
-def run_pdf_query(query: str, top_k: int) -> str:
+async def run_pdf_query(query: str, top_k: int) -> str:
     if not query.strip():
         return "请输入查询语句"
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/query",
-            json={"query": query, "top_k": top_k},
-            headers=_headers(),
-            timeout=30,
-        )
-        response.raise_for_status()
+        hits = await _query_api(query, top_k)
     except Exception as exc:  # pylint: disable=broad-except
         return f"查询失败：{_format_request_error(exc)}"
-    hits = response.json().get("hits", [])
     pdf_hits = [hit for hit in hits if hit.get("media_type") == "pdf"]
     if not pdf_hits:
         return "暂无 PDF 匹配结果"
     return format_hits(pdf_hits)
 
 
-def _append_message(messages: List[Dict[str, Any]], role: str, text: str) -> None:
+def _append_message(messages: "deque[Dict[str, Any]]", role: str, text: str) -> None:
     messages.append({"role": role, "content": [{"type": "text", "text": text}]})
 
 
-def handle_query(query: str, top_k: int, history: List[Dict[str, Any]] | None):
-    history = history or []
-    messages = history.copy()
+def _existing_files(paths: List[str]) -> set:
+    """Return the subset of ``paths`` that exist, listing each shared directory once."""
+    by_dir: Dict[str, List[str]] = {}
+    for path in dict.fromkeys(paths):
+        by_dir.setdefault(os.path.dirname(path) or ".", []).append(path)
+    found = set()
+    for directory, members in by_dir.items():
+        if len(members) == 1:
+            if os.path.exists(members[0]):
+                found.add(members[0])
+            continue
+        try:
+            with os.scandir(directory) as entries:
+                names = {entry.name for entry in entries}
+        except OSError:
+            continue
+        found.update(path for path in members if os.path.basename(path) in names)
+    return found
+
+
+async def handle_query(query: str, top_k: int, history: "deque[Dict[str, Any]] | None"):
+    """Stream the answer into the chat as hits arrive, then fill the media previews."""
+    # The session's history is appended in place; only the Chatbot gets a list copy.
+    messages = history if isinstance(history, deque) else deque(history or [], maxlen=_CHAT_HISTORY_LIMIT)
     user_query = query.strip()
     if not user_query:
-        return messages, messages, None, None, []
+        yield messages, list(messages), None, None, []
+        return
     _append_message(messages, "user", user_query)
+    _append_message(messages, "assistant", "检索中…")
+    hits: List[Dict[str, Any]] = []
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/query",
-            json={"query": user_query, "top_k": top_k},
-            headers=_headers(),
-            timeout=30,
-        )
-        response.raise_for_status()
-        hits = response.json().get("hits", [])
-        answer = format_hits(hits)
+        async for hits in _stream_query(user_query, top_k):
+            messages.pop()
+            _append_message(messages, "assistant", format_hits(hits))
+            # Media previews wait for the final hit list.
+            yield messages, list(messages), gr.update(), gr.update(), gr.update()
     except Exception as exc:  # pylint: disable=broad-except
-        answer = f"查询失败：{_format_request_error(exc)}"
+        messages.pop()
+        _append_message(messages, "assistant", f"查询失败：{_format_request_error(exc)}")
         hits = []
-    _append_message(messages, "assistant", answer)
     video_path = None
     audio_path = None
     gallery: List[str] = []
@@ -1095,62 +1807,147 @@ def handle_query(query: str, top_k: int, history: List[Dict[str, Any]] | None):
         first_hit = hits[0]
         video_path = first_hit.get("video_path") or first_hit.get("path")
         audio_path = first_hit.get("audio_path")
+        # Browser-cacheable API URLs first; bare local paths only for hits the API cannot serve.
+        local = [hit["thumbnail"] for hit in hits if hit.get("thumbnail") and not hit.get("thumbnail_url")]
+        existing = await asyncio.to_thread(_existing_files, local) if local else set()
         for hit in hits:
-            thumb = hit.get("thumbnail")
-            if thumb and os.path.exists(thumb):
-                gallery.append(thumb)
-    return messages, messages, video_path, audio_path, gallery
-
-
-def _fetch_logs(task_id: str, lines: int = 200) -> str:
-    endpoints = [
-        (f"{API_BASE_URL}/logs/{task_id}", {"lines": lines}),
-        (f"{API_BASE_URL}/logs/tail", {"lines": lines}),
-    ]
-    for url, params in endpoints:
-        try:
-            resp = requests.get(url, params=params, headers=_headers(), timeout=15)
-            if resp.status_code == 404:
-                continue
-            resp.raise_for_status()
-            data = resp.json()
-            return "\n".join(data.get("lines", []))
-        except Exception:  # pylint: disable=broad-except
-            continue
-    return ""
+            if hit.get("thumbnail_url"):
+                gallery.append(f"{API_BASE_URL}{hit['thumbnail_url']}")
+            elif hit.get("thumbnail") in existing:
+                gallery.append(hit["thumbnail"])
+    yield messages, list(messages), video_path, audio_path, gallery
 
 
-def _poll_task_core(task_id: str) -> Tuple[str, str, str, str, Dict[str, Optional[str]]]:
-    empty = {"md_render": None, "md_text": None, "bundle_path": None}
+async def _poll_task_core(task_id: str, log_lines: int = 200) -> Tuple[str, str, str, str, Dict[str, Optional[str]]]:
+    empty = {"md_render": None, "md_text": None, "bundle_path": None, "status": None}
     if not task_id:
         return "等待任务", "", "", "", empty
     try:
-        resp = requests.get(f"{API_BASE_URL}/tasks/{task_id}", headers=_headers(), timeout=15)
+        # One call returns status, result and the task's log lines.
+        resp = await _http().get(f"/tasks/{task_id}/poll", params={"log_lines": log_lines}, timeout=_api_timeout(15))
         resp.raise_for_status()
-        task = resp.json()
+        task = _json_loads(resp.content)
     except Exception as exc:  # pylint: disable=broad-except
         return f"任务查询失败：{_format_request_error(exc)}", "", "", "", empty
 
-    status_line = f"状态：{task.get('status')}"
+    log_text = "\n".join(task.get("logs") or [])
     detail = task.get("detail")
+    render_key = (task.get("status"), detail, task.get("updated_at"))
+    cached = _POLL_RENDER_CACHE.get(task_id)
+    if cached is not None and cached[0] == render_key and render_key[2] is not None:
+        # Unchanged since the last tick: only the log lines are new.
+        _POLL_RENDER_CACHE.move_to_end(task_id)
+        status_line, result_block, remote_preview, extras = cached[1]
+        return status_line, result_block, log_text, remote_preview, extras
+
+    status_line = f"状态：{task.get('status')}"
     if detail:
         status_line += f"\n说明：{detail}"
     result_payload = task.get("result") or {}
-    result_block = json.dumps(result_payload, ensure_ascii=False, indent=2) if result_payload else ""
-    log_text = _fetch_logs(task_id)
-    remote_preview = _build_remote_pdf_preview(task) or ""
-    md_render, md_text, bundle_path = _build_mineru_markdown_preview(task)
-    extras = {"md_render": md_render, "md_text": md_text, "bundle_path": bundle_path}
+    result_block = _json_dumps(result_payload, indent=True) if result_payload else ""
+    # Bundle decoding and publishing preview files are file/CPU work; keep them off the
+    # event loop and build both previews side by side (the bundle is decoded once).
+    remote_preview, (md_render, md_text, bundle_path) = await asyncio.gather(
+        asyncio.to_thread(_build_remote_pdf_preview, task),
+        asyncio.to_thread(_build_mineru_markdown_preview, task),
+    )
+    remote_preview = remote_preview or ""
+    extras = {"md_render": md_render, "md_text": md_text, "bundle_path": bundle_path, "status": task.get("status")}
+    _POLL_RENDER_CACHE[task_id] = (render_key, (status_line, result_block, remote_preview, extras))
+    _POLL_RENDER_CACHE.move_to_end(task_id)
+    while len(_POLL_RENDER_CACHE) > _POLL_RENDER_CACHE_SIZE:
+        _POLL_RENDER_CACHE.popitem(last=False)
     return status_line, result_block, log_text, remote_preview, extras
 
 
-def poll_basic_task(task_id: str) -> Tuple[str, str, str]:
-    status_line, result_block, log_text, _preview, _extras = _poll_task_core(task_id)
-    return status_line, result_block, log_text
+def _next_poll(task_id: str, status: Optional[str], poll_state: Dict[str, Any] | None) -> Tuple[Dict[str, Any], Any]:
+    """Return the new poll state and a Timer update: back off while unchanged, stop when done."""
+    poll_state = poll_state or {}
+    if not task_id:
+        return {}, gr.Timer(active=False)
+    if status in _TERMINAL_STATUSES:
+        # Remember the terminal state so a late tick never reaches the API again.
+        return {"status": status, "done": True}, gr.Timer(active=False)
+    interval = poll_state.get("interval") or _POLL_MIN_SECONDS
+    if status == poll_state.get("status"):
+        interval = min(interval * _POLL_BACKOFF, _POLL_MAX_SECONDS)
+    else:
+        interval = _POLL_MIN_SECONDS
+    return {"status": status, "interval": interval}, gr.Timer(value=interval, active=True)
+
+
+def _start_polling() -> Tuple[Dict[str, Any], Any]:
+    return {}, gr.Timer(value=_POLL_MIN_SECONDS, active=True)
+
+
+async def _follow_task(task_id: str):
+    """Re-read the task on every ``/tasks/{task_id}/events`` status event.
+
+    Yields ``(poll_core_output, poll_state, timer_update)``; nothing is polled
+    while the stream is open. If the stream is unavailable or ends before a
+    terminal status, the last item (with no poll output) starts the adaptive
+    poll timer instead.
+    """
+    if not task_id:
+        return
+    try:
+        async with _http().stream(
+            "GET", f"/tasks/{task_id}/events", headers=_STREAM_HEADERS, timeout=_STREAM_TIMEOUT
+        ) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                polled = await _poll_task_core(task_id, log_lines=0)
+                status = polled[4].get("status")
+                if status in _TERMINAL_STATUSES:
+                    yield polled, {"status": status, "done": True}, gr.Timer(active=False)
+                    return
+                yield polled, {"status": status}, gr.Timer(active=False)
+    except Exception:  # pylint: disable=broad-except
+        pass
+    poll_state, timer = _start_polling()
+    yield None, poll_state, timer
+
+
+async def follow_basic_task(task_id: str):
+    async for polled, poll_state, timer in _follow_task(task_id):
+        if polled is None:
+            yield gr.update(), gr.update(), poll_state, timer
+        else:
+            yield polled[0], polled[1], poll_state, timer
+
 
+async def stream_task_logs(task_id: str):
+    """Follow ``/logs/{task_id}/stream`` and yield the accumulated log text as lines arrive."""
+    if not task_id:
+        return
+    lines: deque = deque(maxlen=200)
+    try:
+        async with _http().stream(
+            "GET", f"/logs/{task_id}/stream", headers=_STREAM_HEADERS, timeout=_STREAM_TIMEOUT
+        ) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if line.startswith("data: "):
+                    lines.append(line[len("data: "):])
+                    yield "\n".join(lines)
+    except Exception as exc:  # pylint: disable=broad-except
+        lines.append(f"日志流中断：{_format_request_error(exc)}")
+        yield "\n".join(lines)
 
-def poll_pdf_task(task_id: str) -> Tuple[str, str, str, str, str, str, Optional[str]]:
-    status_line, result_block, log_text, preview, extras = _poll_task_core(task_id)
+
+async def poll_basic_task(task_id: str, poll_state: Dict[str, Any] | None = None):
+    if (poll_state or {}).get("done"):
+        return gr.update(), gr.update(), poll_state, gr.Timer(active=False)
+    # Logs arrive through stream_task_logs; the poll only carries status and result.
+    status_line, result_block, _logs, _preview, extras = await _poll_task_core(task_id, log_lines=0)
+    poll_state, timer = _next_poll(task_id, extras.get("status"), poll_state)
+    return status_line, result_block, poll_state, timer
+
+
+async def poll_pdf_task(task_id: str) -> Tuple[str, str, str, str, str, str, Optional[str]]:
+    status_line, result_block, log_text, preview, extras = await _poll_task_core(task_id)
     return (
         status_line,
         result_block,
@@ -1167,8 +1964,10 @@ def build_interface() -> gr.Blocks:
         gr.HTML(f"<style>{UI_CSS}</style>")
         gr.Markdown("# 多模态 RAG 控制台\n上传音/视频/PDF，查看任务进展，并进行混合检索。")
         task_state = gr.State("")
-        chat_history = gr.State([])
+        chat_history = gr.State(deque(maxlen=_CHAT_HISTORY_LIMIT))
         pdf_task_state = gr.State("")
+        poll_state = gr.State({})
+        pdf_poll_state = gr.State({})
 
         with gr.Tabs():
             with gr.Tab("上传处理"):
@@ -1329,14 +2128,14 @@ def build_interface() -> gr.Blocks:
                         gallery = gr.Gallery(label="关键帧", columns=2, height=200)
 
         # 先定义 Timer，避免 UnboundLocalError
-        poll_timer = gr.Timer(value=2.0, active=False)  # 默认不激活
+        poll_timer = gr.Timer(value=_POLL_MIN_SECONDS, active=False)  # 默认不激活，间隔随状态自适应
         poll_timer.tick(
             fn=poll_basic_task,
-            inputs=[task_state],
-            outputs=[status_panel, result_panel, log_panel],
+            inputs=[task_state, poll_state],
+            outputs=[status_panel, result_panel, poll_state, poll_timer],
         )
 
-        submit_btn.click(
+        ingest_submitted = submit_btn.click(
             fn=submit_ingest,
             inputs=[
                 file_input,
@@ -1349,10 +2148,20 @@ def build_interface() -> gr.Blocks:
                 scene_threshold,
             ],
             outputs=[ingest_status, task_state, task_payload],
-        ).then(
-            fn=lambda: gr.Timer(active=True),
-            inputs=None,
-            outputs=[poll_timer],
+        )
+        # Status follows the task's SSE events (the timer only takes over if they are
+        # unavailable); logs stream alongside. Both are long-lived and mostly idle.
+        ingest_submitted.then(
+            fn=follow_basic_task,
+            inputs=[task_state],
+            outputs=[status_panel, result_panel, poll_state, poll_timer],
+            concurrency_limit=None,
+        )
+        ingest_submitted.then(
+            fn=stream_task_logs,
+            inputs=[task_state],
+            outputs=[log_panel],
+            concurrency_limit=None,
         )
 
         pdf_file.change(
@@ -1363,34 +2172,56 @@ def build_interface() -> gr.Blocks:
 
         # PDF 任务轮询 - 只更新状态、日志、Markdown，不影响预览区域
         # 先定义 Timer，避免 UnboundLocalError
-        pdf_poll_timer = gr.Timer(value=3.0, active=False)  # 默认不激活
+        pdf_poll_timer = gr.Timer(value=_POLL_MIN_SECONDS, active=False)  # 默认不激活，间隔随状态自适应
         
-        def _poll_pdf_status_only(task_id: str):
-            """只轮询状态和日志，不更新预览区域"""
-            status_line, result_block, log_text, _preview, extras = _poll_task_core(task_id)
+        async def _poll_pdf_status_only(task_id: str, state: Dict[str, Any] | None):
+            """只轮询状态与结果（日志由 stream_task_logs 推送），不更新预览区域"""
+            if (state or {}).get("done"):
+                return (gr.update(),) * 5 + (state, gr.Timer(active=False))
+            status_line, result_block, _logs, _preview, extras = await _poll_task_core(task_id, log_lines=0)
+            state, timer = _next_poll(task_id, extras.get("status"), state)
             return (
                 status_line,
                 result_block,
-                log_text,
                 extras.get("md_render") or "",
                 extras.get("md_text") or "",
                 extras.get("bundle_path"),
+                state,
+                timer,
             )
         
+        async def _follow_pdf_status_only(task_id: str):
+            """按任务 SSE 事件刷新状态与结果；事件流不可用时交给轮询 Timer"""
+            async for polled, state, timer in _follow_task(task_id):
+                if polled is None:
+                    yield (gr.update(),) * 5 + (state, timer)
+                    continue
+                status_line, result_block, _logs, _preview, extras = polled
+                yield (
+                    status_line,
+                    result_block,
+                    extras.get("md_render") or "",
+                    extras.get("md_text") or "",
+                    extras.get("bundle_path"),
+                    state,
+                    timer,
+                )
+        
         pdf_poll_timer.tick(
             fn=_poll_pdf_status_only,
-            inputs=[pdf_task_state],
+            inputs=[pdf_task_state, pdf_poll_state],
             outputs=[
                 pdf_status_panel,
                 pdf_result_panel,
-                pdf_log_panel,
                 pdf_markdown_render,
                 pdf_markdown_text,
                 pdf_bundle_file,
+                pdf_poll_state,
+                pdf_poll_timer,
             ],
         )
 
-        pdf_submit.click(
+        pdf_submitted = pdf_submit.click(
             fn=submit_pdf_pipeline,
             inputs=[
                 pdf_file,
@@ -1414,10 +2245,26 @@ def build_interface() -> gr.Blocks:
                 pdf_end_page,
             ],
             outputs=[pdf_status, pdf_task_state, pdf_payload],
-        ).then(
-            fn=lambda: gr.Timer(active=True),
-            inputs=None,
-            outputs=[pdf_poll_timer],
+        )
+        pdf_submitted.then(
+            fn=_follow_pdf_status_only,
+            inputs=[pdf_task_state],
+            outputs=[
+                pdf_status_panel,
+                pdf_result_panel,
+                pdf_markdown_render,
+                pdf_markdown_text,
+                pdf_bundle_file,
+                pdf_poll_state,
+                pdf_poll_timer,
+            ],
+            concurrency_limit=None,
+        )
+        pdf_submitted.then(
+            fn=stream_task_logs,
+            inputs=[pdf_task_state],
+            outputs=[pdf_log_panel],
+            concurrency_limit=None,
         )
         
         # 手动加载 MinerU 预览（避免自动触发导致卡顿）
@@ -1430,12 +2277,13 @@ def build_interface() -> gr.Blocks:
                     gr.Slider(value=1, maximum=100)
                 )
             try:
-                pdf_file, overlay_info, current, total = render_pdf_page(task_id, 1)
+                pdf_file, overlay_info, current, total = render_pdf_page(
+                    task_id, 1, prefetch=_PDF_FIRST_LOAD_PREFETCH_PAGES
+                )
                 slider_update = gr.Slider(value=current, maximum=max(total, 1), minimum=1, step=1)
                 return pdf_file, overlay_info, slider_update
             except Exception as exc:  # pylint: disable=broad-except
-                import traceback
-                error_msg = f"预览加载失败: {exc}\n\n{traceback.format_exc()}"
+                error_msg = _render_error("预览加载失败", exc)
                 return (
                     None,
                     error_msg,
@@ -1458,8 +2306,7 @@ def build_interface() -> gr.Blocks:
                 slider_update = gr.Slider(value=safe_current, maximum=safe_total, minimum=1, step=1)
                 return pdf_file, overlay_info, slider_update
             except Exception as exc:  # pylint: disable=broad-except
-                import traceback
-                error_msg = f"⚠️ 翻页失败: {exc}\n\n```\n{traceback.format_exc()}\n```"
+                error_msg = _render_error("⚠️ 翻页失败", exc)
                 # 保持当前页码，不改变 slider
                 return (
                     None,
@@ -1481,16 +2328,19 @@ def build_interface() -> gr.Blocks:
             outputs=[mineru_pdf_viewer, mineru_overlay_viewer, mineru_page_slider],
         )
 
+        # trigger_mode="once": repeated clicks while a query is running are ignored.
         pdf_query_btn.click(
             fn=run_pdf_query,
             inputs=[pdf_query, pdf_topk],
             outputs=[pdf_hits_panel],
+            trigger_mode="once",
         )
 
         query_btn.click(
             handle_query,
             inputs=[query_box, topk_slider, chat_history],
             outputs=[chat_history, chatbot, video_preview, audio_preview, gallery],
+            trigger_mode="once",
         )
 
     return demo
@@ -1501,9 +2351,14 @@ def main() -> None:
     gradio_temp = Path("/home/mm-rag/data/gradio_temp")
     gradio_temp.mkdir(parents=True, exist_ok=True)
     os.environ["GRADIO_TEMP_DIR"] = str(gradio_temp)
+
+    # uvloop ships with uvicorn[standard]; make every loop Gradio starts use it.
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     
     demo = build_interface()
-    demo.queue().launch(server_port=7861)
+    # Previews are served from the temp dir through Gradio's file route.
+    demo.queue().launch(server_port=7861, allowed_paths=[str(gradio_temp)])
 
 
 if __name__ == "__main__":
@@ -1,185 +1,458 @@
 #!/usr/bin/env python3
-"""Quick verification of the complete MinerU bbox rendering pipeline"""
+"""Quick verification of the complete MinerU bbox rendering pipeline
 
+Usage: python verify_bbox_pipeline.py [--no-cache] [--warm] [--tasks ID,ID,... [--concurrent N]]
+       python verify_bbox_pipeline.py --watch ID [--watch-timeout SECONDS]
+"""
+
+import argparse
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+from itertools import islice
+import os
+from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import sys
 
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional dependency
+    ijson = None  # type: ignore
+
 API_BASE = "http://localhost:8000"
 GRADIO_BASE = "http://localhost:7861"
 
-def check_services():
+
+def _mount_pool(session, maxsize):
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+# One keep-alive connection per host (API + Gradio) for every probe below;
+# --tasks batches widen the pool to the worker count
+SESSION = requests.Session()
+SESSION.headers.update({"Accept": "application/json"})
+_mount_pool(SESSION, 4)
+atexit.register(SESSION.close)
+
+# Re-runs while debugging reuse earlier lookups; pass --no-cache to bypass
+# Per-user and private (0700): a shared dir like /tmp would let others plant entries
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "verify_bbox"
+USE_CACHE = True
+
+# Statuses the API reports once a task has stopped changing
+_TERMINAL_STATUSES = frozenset({"success", "failure", "revoked", "completed", "failed"})
+_SUCCESS_STATUSES = frozenset({"success", "completed"})
+
+# Artifact keys that point at the MinerU output bundle, newest name first
+_BUNDLE_KEYS = ("mineru_bundle_path", "mineru_zip_path")
+
+_RENDERER = None
+_RENDERER_ERR = None
+
+
+def _cache_path(key):
+    return CACHE_DIR / f"{hashlib.sha1(repr(key).encode('utf-8')).hexdigest()}.json"
+
+
+def _cache_get(key, ttl=None):
+    """Return the cached value for key, or None if missing/expired (ttl in seconds)"""
+    if not USE_CACHE:
+        return None
+    path = _cache_path(key)
+    try:
+        if ttl is not None and time.time() - path.stat().st_mtime > ttl:
+            return None
+        # Plain JSON (a task list or a path), never pickle: loading must not run code
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+
+def _cache_put(key, value):
+    if not USE_CACHE:
+        return
+    try:
+        CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        os.chmod(CACHE_DIR, 0o700)
+        path = _cache_path(key)
+        partial = path.with_suffix(f".{os.getpid()}.part")
+        partial.write_text(json.dumps(value), encoding="utf-8")
+        os.replace(partial, path)
+    except Exception:
+        pass
+
+
+class Section:
+    """Collects one step's output lines and writes them to stdout in a single call"""
+
+    def __init__(self):
+        self.lines = []
+
+    def p(self, line):
+        self.lines.append(line)
+
+    def flush(self):
+        if self.lines:
+            sys.stdout.write("\n".join(self.lines) + "\n")
+            sys.stdout.flush()
+            self.lines.clear()
+
+
+def _run(step, *args):
+    """Run a verification step with its own Section, flushing even if it raises"""
+    sec = Section()
+    try:
+        return step(*args, sec)
+    finally:
+        sec.flush()
+
+
+def _probe(url):
+    """HEAD the url (headers only); fall back to a body-less GET if HEAD is not allowed"""
+    resp = SESSION.head(url, allow_redirects=False, timeout=(2, 3))
+    if resp.status_code == 405:
+        # stream=True + close() hands the connection back without reading the body
+        resp = SESSION.get(url, stream=True, timeout=(2, 3))
+        resp.close()
+    return resp
+
+
+def _nonempty_lines(text):
+    """Yield the non-blank lines of text, scanning only as far as the caller reads"""
+    start = 0
+    while start <= len(text):
+        end = text.find("\n", start)
+        if end == -1:
+            end = len(text)
+        line = text[start:end]
+        if line.strip():
+            yield line
+        start = end + 1
+
+
+def _load_renderer():
+    """Import ui.gradio_app's render_pdf_page once and keep it (or the import error)"""
+    global _RENDERER, _RENDERER_ERR
+    if _RENDERER is None and _RENDERER_ERR is None:
+        sys.path.insert(0, '/home/mm-rag')
+        try:
+            from ui.gradio_app import render_pdf_page
+            _RENDERER = render_pdf_page
+        except Exception as e:
+            _RENDERER_ERR = e
+    return _RENDERER
+
+
+def check_services(sec):
     """Check if required services are running"""
-    print("🔍 Checking services...")
+    sec.p("🔍 Checking services...")
+    
+    # Both probes are independent: issue them together, then report in order
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        fastapi_probe = pool.submit(_probe, f"{API_BASE}/health")
+        gradio_probe = pool.submit(_probe, GRADIO_BASE)
     
     # Check FastAPI
     try:
-        resp = requests.get(f"{API_BASE}/health", timeout=5)
-        if resp.status_code == 200:
-            print("✅ FastAPI is running on port 8000")
+        resp = fastapi_probe.result()
+        if 200 <= resp.status_code < 400:
+            sec.p("✅ FastAPI is running on port 8000")
         else:
-            print(f"⚠️  FastAPI responded with status {resp.status_code}")
+            sec.p(f"⚠️  FastAPI responded with status {resp.status_code}")
     except Exception as e:
-        print(f"❌ FastAPI not accessible: {e}")
+        sec.p(f"❌ FastAPI not accessible: {e}")
         return False
     
     # Check Gradio
     try:
-        resp = requests.get(GRADIO_BASE, timeout=5)
-        if resp.status_code == 200:
-            print("✅ Gradio is running on port 7861")
+        resp = gradio_probe.result()
+        if 200 <= resp.status_code < 400:
+            sec.p("✅ Gradio is running on port 7861")
         else:
-            print(f"⚠️  Gradio responded with status {resp.status_code}")
+            sec.p(f"⚠️  Gradio responded with status {resp.status_code}")
     except Exception as e:
-        print(f"❌ Gradio not accessible: {e}")
+        sec.p(f"❌ Gradio not accessible: {e}")
         return False
     
     return True
 
 
-def find_recent_task():
+def find_recent_task(sec):
     """Find a recent completed PDF task"""
-    print("\n🔍 Looking for recent PDF tasks...")
+    sec.p("\n🔍 Looking for recent PDF tasks...")
     
     try:
-        resp = requests.get(f"{API_BASE}/tasks", timeout=10)
-        resp.raise_for_status()
-        tasks = resp.json()
-        
-        # Find completed PDF tasks
-        pdf_tasks = [
-            t for t in tasks 
-            if t.get("status") == "completed" 
-            and t.get("media_type") == "pdf"
-        ]
+        tasks = _cache_get("recent_pdf_task", ttl=30)
+        if tasks is None:
+            # Ask the server for just the newest completed PDF task
+            params = {"status": "completed", "media_type": "pdf", "limit": 1, "sort": "-created_at"}
+            with SESSION.get(f"{API_BASE}/tasks", params=params, stream=True, timeout=10) as resp:
+                resp.raise_for_status()
+                # Servers that ignore the filter return everything: with ijson
+                # the list is reduced while parsing instead of loaded whole
+                if ijson is not None:
+                    # resp.raw is the undecoded socket stream; the API gzips bodies over 1 KB
+                    resp.raw.decode_content = True
+                    stream = ijson.items(resp.raw, "item")
+                else:
+                    stream = resp.json()
+                latest = None
+                for t in stream:
+                    if t.get("status") == "completed" and t.get("media_type") == "pdf":
+                        if latest is None or t.get("created_at", "") > latest.get("created_at", ""):
+                            latest = t
+            tasks = [latest] if latest is not None else []
+            _cache_put("recent_pdf_task", tasks)
         
-        if not pdf_tasks:
-            print("❌ No completed PDF tasks found")
+        if not tasks:
+            sec.p("❌ No completed PDF tasks found")
             return None
         
-        # Get the most recent one
-        latest = max(pdf_tasks, key=lambda x: x.get("created_at", ""))
+        latest = tasks[0]
         task_id = latest.get("task_id")
         
-        print(f"✅ Found task: {task_id}")
-        print(f"   Title: {latest.get('metadata', {}).get('title', 'N/A')}")
-        print(f"   Status: {latest.get('status')}")
+        sec.p(f"✅ Found task: {task_id}")
+        sec.p(f"   Title: {latest.get('metadata', {}).get('title', 'N/A')}")
+        sec.p(f"   Status: {latest.get('status')}")
         
         return task_id
         
     except Exception as e:
-        print(f"❌ Failed to fetch tasks: {e}")
+        sec.p(f"❌ Failed to fetch tasks: {e}")
         return None
 
 
-def verify_artifacts(task_id):
+def wait_for_task(task_id, timeout, sec):
+    """Block until task_id reaches a terminal status; return it (None on timeout)
+
+    Follows the /tasks/{task_id}/events SSE stream so nothing is polled while the
+    task runs, and only falls back to polling /tasks/{task_id} if the stream is
+    unavailable or closes early.
+    """
+    sec.p(f"\n⏳ Waiting for task {task_id} to finish...")
+    deadline = time.monotonic() + timeout
+    status = None
+    try:
+        # The server sends a keepalive every 15s, so a longer read timeout means the stream is gone
+        with SESSION.get(
+            f"{API_BASE}/tasks/{task_id}/events",
+            headers={"Accept": "text/event-stream", "Accept-Encoding": "identity"},
+            stream=True,
+            timeout=(2, 30),
+        ) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines(decode_unicode=True):
+                if line and line.startswith("data: "):
+                    status = json.loads(line[len("data: "):]).get("status")
+                    if status in _TERMINAL_STATUSES:
+                        break
+                if time.monotonic() >= deadline:
+                    break
+    except Exception as e:
+        sec.p(f"⚠️  Event stream unavailable ({e}), polling instead")
+    
+    while status not in _TERMINAL_STATUSES and time.monotonic() < deadline:
+        try:
+            resp = SESSION.get(f"{API_BASE}/tasks/{task_id}", timeout=10)
+            resp.raise_for_status()
+            status = resp.json().get("status")
+        except Exception as e:
+            sec.p(f"⚠️  Status check failed: {e}")
+        if status not in _TERMINAL_STATUSES:
+            time.sleep(2)
+    
+    if status in _TERMINAL_STATUSES:
+        sec.p(f"{'✅' if status in _SUCCESS_STATUSES else '❌'} Task finished with status: {status}")
+        return status
+    sec.p(f"❌ Task still '{status}' after {timeout:.0f}s")
+    return None
+
+
+def verify_artifacts(task_id, sec):
     """Verify task has required artifacts"""
-    print(f"\n🔍 Checking artifacts for task {task_id}...")
+    sec.p(f"\n🔍 Checking artifacts for task {task_id}...")
+    
+    # A completed task's artifacts never change, so a found bundle is cached without TTL
+    bundle_path = _cache_get(("task", task_id))
+    if bundle_path:
+        sec.p(f"✅ Found MinerU bundle: {bundle_path} (cached)")
+        return True
     
     try:
-        resp = requests.get(f"{API_BASE}/tasks/{task_id}", timeout=10)
+        resp = SESSION.get(f"{API_BASE}/tasks/{task_id}", timeout=10)
         resp.raise_for_status()
         task = resp.json()
         
-        result = task.get("result", {})
-        extras = result.get("extras", {})
-        artifacts = extras.get("artifacts", {})
-        
-        # Fallback checks
-        if not artifacts:
-            artifacts = result.get("artifacts", {})
-        if not artifacts:
-            task_extras = task.get("extras", {})
-            artifacts = task_extras.get("artifacts", {})
-        
-        bundle_path = artifacts.get("mineru_bundle_path") or artifacts.get("mineru_zip_path")
+        result = task.get("result") or {}
+        # result.extras first, then the older result-level and task-level locations
+        artifacts = (
+            (result.get("extras") or {}).get("artifacts")
+            or result.get("artifacts")
+            or (task.get("extras") or {}).get("artifacts")
+            or {}
+        )
+        bundle_path = next((artifacts[k] for k in _BUNDLE_KEYS if artifacts.get(k)), None)
         
         if bundle_path:
-            print(f"✅ Found MinerU bundle: {bundle_path}")
+            sec.p(f"✅ Found MinerU bundle: {bundle_path}")
+            _cache_put(("task", task_id), bundle_path)
             return True
         else:
-            print("❌ No MinerU bundle found in artifacts")
-            print(f"   Available artifact keys: {list(artifacts.keys())}")
+            sec.p("❌ No MinerU bundle found in artifacts")
+            sec.p(f"   Available artifact keys: {list(artifacts.keys())}")
             return False
             
     except Exception as e:
-        print(f"❌ Failed to fetch task details: {e}")
+        sec.p(f"❌ Failed to fetch task details: {e}")
         return False
 
 
-def test_bbox_rendering(task_id):
+def test_bbox_rendering(task_id, sec):
     """Test bbox rendering via Gradio render function"""
-    print(f"\n🎨 Testing bbox rendering for task {task_id}...")
+    sec.p(f"\n🎨 Testing bbox rendering for task {task_id}...")
     
     # This simulates what Gradio does
-    from pathlib import Path
-    import sys
-    sys.path.insert(0, '/home/mm-rag')
+    render_pdf_page = _load_renderer()
+    if render_pdf_page is None:
+        sec.p(f"❌ Import failed: {_RENDERER_ERR}")
+        return False
     
     try:
-        # Import the render function
-        from ui.gradio_app import render_pdf_page
-        
         # Try to render page 1
+        started = time.perf_counter()
         result = render_pdf_page(task_id=task_id, page_num=1)
+        elapsed = time.perf_counter() - started
         pdf_path, info_md, current_page, total_pages = result
         
-        if pdf_path and Path(pdf_path).exists():
-            size = Path(pdf_path).stat().st_size
-            print(f"✅ Generated annotated PDF: {Path(pdf_path).name}")
-            print(f"   Size: {size / 1024:.1f} KB")
-            print(f"   Pages: {current_page} / {total_pages}")
-            print(f"\n📊 Info:")
-            for line in info_md.split('\n')[:10]:
-                if line.strip():
-                    print(f"   {line}")
+        try:
+            st = os.stat(pdf_path)
+        except (TypeError, OSError):
+            st = None
+        
+        if st:
+            sec.p(f"✅ Generated annotated PDF: {os.path.basename(pdf_path)}")
+            sec.p(f"   Size: {st.st_size / 1024:.1f} KB")
+            sec.p(f"   Pages: {current_page} / {total_pages}")
+            sec.p(f"   Render time: {elapsed:.2f}s")
+            sec.p(f"\n📊 Info:")
+            for line in islice(_nonempty_lines(info_md), 10):
+                sec.p(f"   {line}")
             return True
         else:
-            print(f"❌ Failed to generate PDF")
-            print(f"   Info: {info_md[:500]}")
+            sec.p(f"❌ Failed to generate PDF")
+            sec.p(f"   Info: {info_md[:500]}")
             return False
             
     except Exception as e:
-        print(f"❌ Error during rendering: {e}")
+        sec.p(f"❌ Error during rendering: {e}")
         import traceback
+        sec.flush()
         traceback.print_exc()
         return False
 
 
+def verify_task(task_id):
+    """Steps 3 and 4 for one task; True when both pass"""
+    return _run(verify_artifacts, task_id) and _run(test_bbox_rendering, task_id)
+
+
+def verify_tasks(task_ids, workers):
+    """Verify many tasks on a thread pool that shares SESSION and the loaded renderer"""
+    sec = Section()
+    _mount_pool(SESSION, max(4, workers))
+    # Import once up front rather than racing the workers into it
+    _load_renderer()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(zip(task_ids, pool.map(verify_task, task_ids)))
+    
+    failed = [task_id for task_id, ok in results if not ok]
+    sec.p("\n" + "=" * 70)
+    sec.p(f"📋 {len(results) - len(failed)} / {len(results)} tasks passed")
+    for task_id in failed:
+        sec.p(f"   ❌ {task_id}")
+    sec.p("=" * 70)
+    sec.flush()
+    return 1 if failed else 0
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Verify the MinerU bbox rendering pipeline")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and skip the on-disk lookup cache")
+    parser.add_argument("--warm", action="store_true", help="import the Gradio app before timing the render")
+    parser.add_argument("--tasks", help="comma-separated task ids to verify instead of the newest PDF task")
+    parser.add_argument("--concurrent", type=int, default=4, help="worker threads for --tasks (default: 4)")
+    parser.add_argument("--watch", metavar="TASK_ID", help="wait for this task to finish, then verify it")
+    parser.add_argument(
+        "--watch-timeout", type=float, default=600.0, help="seconds to wait with --watch (default: 600)"
+    )
+    return parser.parse_args(argv)
+
+
 def main():
-    print("=" * 70)
-    print("MinerU Bbox Rendering Pipeline Verification")
-    print("=" * 70)
+    global USE_CACHE
+    args = _parse_args()
+    USE_CACHE = not args.no_cache
+    
+    sec = Section()
+    sec.p("=" * 70)
+    sec.p("MinerU Bbox Rendering Pipeline Verification")
+    sec.p("=" * 70)
+    sec.flush()
+    
+    if args.warm:
+        _load_renderer()
     
     # Step 1: Check services
-    if not check_services():
-        print("\n❌ Required services are not running")
-        print("   Please start FastAPI and Gradio services")
+    if not _run(check_services):
+        sec.p("\n❌ Required services are not running")
+        sec.p("   Please start FastAPI and Gradio services")
+        sec.flush()
         return 1
     
-    # Step 2: Find a recent task
-    task_id = find_recent_task()
+    if args.tasks:
+        task_ids = [task_id.strip() for task_id in args.tasks.split(",") if task_id.strip()]
+        return verify_tasks(task_ids, max(1, args.concurrent))
+    
+    # Step 2: Find a recent task, or wait for the one being watched
+    if args.watch:
+        task_id = args.watch
+        if _run(wait_for_task, task_id, args.watch_timeout) not in _SUCCESS_STATUSES:
+            sec.p("\n❌ Watched task did not complete successfully")
+            sec.flush()
+            return 1
+    else:
+        task_id = _run(find_recent_task)
     if not task_id:
-        print("\n⚠️  No recent PDF tasks found")
-        print("   Please upload a PDF via Gradio to test the pipeline")
+        sec.p("\n⚠️  No recent PDF tasks found")
+        sec.p("   Please upload a PDF via Gradio to test the pipeline")
+        sec.flush()
         return 1
     
     # Step 3: Verify artifacts
-    if not verify_artifacts(task_id):
-        print("\n❌ Task doesn't have required MinerU artifacts")
+    if not _run(verify_artifacts, task_id):
+        sec.p("\n❌ Task doesn't have required MinerU artifacts")
+        sec.flush()
         return 1
     
     # Step 4: Test bbox rendering
-    if not test_bbox_rendering(task_id):
-        print("\n❌ Bbox rendering failed")
+    if not _run(test_bbox_rendering, task_id):
+        sec.p("\n❌ Bbox rendering failed")
+        sec.flush()
         return 1
     
-    print("\n" + "=" * 70)
-    print("✅ All checks passed! MinerU bbox rendering is working correctly")
-    print("=" * 70)
-    print(f"\n🌐 Access Gradio at: {GRADIO_BASE}")
-    print("   Navigate to 'PDF 管道' tab")
-    print("   Upload a PDF and click '🔄 加载分页预览' to see bbox annotations")
+    sec.p("\n" + "=" * 70)
+    sec.p("✅ All checks passed! MinerU bbox rendering is working correctly")
+    sec.p("=" * 70)
+    sec.p(f"\n🌐 Access Gradio at: {GRADIO_BASE}")
+    sec.p("   Navigate to 'PDF 管道' tab")
+    sec.p("   Upload a PDF and click '🔄 加载分页预览' to see bbox annotations")
+    sec.flush()
     
     return 0
 